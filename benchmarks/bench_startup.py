@@ -0,0 +1,66 @@
+"""Startup benchmark: time from interpreter start until the REPL could show its prompt.
+
+Each scenario runs in a fresh interpreter, so module caches do not leak between
+runs. ``lazy`` is what ``cli-app --no-web`` does today; ``eager`` additionally
+imports Flask/aiohttp and instantiates every command, as the old startup did.
+
+    python benchmarks/bench_startup.py [--runs 10]
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+SNIPPET = """
+import time
+t0 = time.perf_counter()
+import main
+from command_processor import CommandProcessor
+from config import Configuration
+proc = CommandProcessor(Configuration({config!r}))
+if {eager}:
+    import flask, aiohttp
+    proc.commands.load_all()
+print(time.perf_counter() - t0)
+"""
+
+
+def _run(eager: bool) -> tuple:
+    code = SNIPPET.format(config=os.path.join(ROOT, 'config.ini'), eager=eager)
+    started = time.perf_counter()
+    out = subprocess.run(
+        [sys.executable, '-c', code],
+        cwd=ROOT, capture_output=True, text=True, check=True,
+    ).stdout
+    wall = time.perf_counter() - started
+    return wall, float(out.strip().splitlines()[-1])
+
+
+def measure(runs: int) -> dict:
+    results = {}
+    for name, eager in (('lazy', False), ('eager', True)):
+        _run(eager)  # warm the manifest cache and the OS page cache
+        samples = [_run(eager) for _ in range(runs)]
+        results[name] = {
+            "wall_ms_median": round(statistics.median(s[0] for s in samples) * 1000, 2),
+            "import_and_init_ms_median": round(statistics.median(s[1] for s in samples) * 1000, 2),
+            "runs": runs,
+        }
+    return results
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--runs', type=int, default=10)
+    args = parser.parse_args(argv)
+    print(json.dumps({"startup": measure(args.runs)}, indent=2))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,346 @@
+"""Hot-path benchmarks against in-process stand-ins for every service.
+
+Scenarios (see ``stand_ins.py`` for the services they talk to):
+
+- ``process``: ``CommandProcessor.process`` latency per command,
+- ``policy``: policy round trip, uncached and answered from the client cache,
+  plus in-process evaluation (``[Policy] mode = embedded``),
+- ``ingest``: flight-record throughput of the storage writer, the batch
+  endpoint and the shipper end to end,
+- ``repl``: end-to-end command latency as in the REPL (policy check,
+  command, flight record),
+- ``startup`` (only with ``--startup-runs``): see ``bench_startup.py``.
+
+Results are printed (and with ``--output`` written) as JSON. With
+``--baseline`` they are compared against a stored run; the exit code is 1 if
+a metric got worse by more than ``--tolerance``. Median latencies should go
+down, throughputs (``*_per_s``) up; p95 and counts are informational only.
+
+    python benchmarks/bench_suite.py [--runs 200] [--output results.json]
+    python benchmarks/bench_suite.py --baseline benchmarks/baseline.json
+    python benchmarks/bench_suite.py --save-baseline benchmarks/baseline.json
+"""
+import argparse
+import asyncio
+import copy
+import json
+import os
+import platform
+import statistics
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime, timezone
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path[:0] = [ROOT, os.path.dirname(os.path.abspath(__file__))]
+
+from stand_ins import StandIns  # noqa: E402
+
+DEFAULT_TOLERANCE = 0.2
+# Latency differences below this are measurement noise, whatever the ratio
+NOISE_FLOOR_MS = 0.05
+
+TEXT = "Der schnelle braune Fuchs springt über den faulen Hund. " * 200
+
+
+def summarize(samples) -> dict:
+    ordered = sorted(samples)
+    p95 = ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))]
+    return {
+        "median_ms": round(statistics.median(ordered) * 1000, 4),
+        "p95_ms": round(p95 * 1000, 4),
+        "runs": len(ordered),
+    }
+
+
+async def sample(fn, runs: int, warmup: int = 5, before=None) -> dict:
+    """Times ``runs`` awaits of ``fn()``; ``before()`` runs untimed ahead of each one."""
+    for _ in range(warmup):
+        if before is not None:
+            before()
+        await fn()
+    samples = []
+    for _ in range(runs):
+        if before is not None:
+            before()
+        started = time.perf_counter()
+        await fn()
+        samples.append(time.perf_counter() - started)
+    return summarize(samples)
+
+
+def throughput(records: int, seconds: float) -> dict:
+    return {"records_per_s": round(records / seconds, 1), "records": records}
+
+
+async def bench_process(proc, workdir: str, runs: int) -> dict:
+    path = os.path.join(workdir, 'bench.txt')
+    with open(path, 'w', encoding='utf-8') as fp:
+        fp.write(TEXT)
+
+    def wetter_uncached():
+        proc.commands.get('wetter').cache.clear()
+
+    commands = {
+        "zeit": ("Zeit:", None),
+        "hilfe": ("Hilfe:", None),
+        "rechner": ("Rechner: 2**10 + sqrt(2) * pi", None),
+        "rechner_batch": ("Rechner: x**2 + 1; x=0..100000", None),
+        "analyse_text": (f"Analyse: {TEXT[:2000]}", None),
+        "lesen": (f"Lesen:{path}", None),
+        "speichern": (f"Speichern:{os.path.join(workdir, 'out.txt')}:{TEXT[:1000]}", None),
+        "wetter_cached": ("Wetter: Berlin", None),
+        "wetter_uncached": ("Wetter: Berlin", wetter_uncached),
+        "unknown": ("Unbekannt: x", None),
+    }
+    results = {}
+    for name, (command, before) in commands.items():
+        first = await proc.process(command)
+        if first.get("status") != "success" and name != "unknown":
+            raise RuntimeError(f"{name}: {first.get('result')}")
+        results[name] = await sample(lambda: proc.process(command), runs, before=before)
+    return results
+
+
+async def bench_policy(proc, runs: int) -> dict:
+    from policy_client import PolicyClient
+
+    context = {"user_role": "cli_user", "user_id": "bench"}
+
+    async def check():
+        allowed, data = await proc.policy.check("Zeit:", context)
+        if not allowed:
+            raise RuntimeError(f"policy: {data}")
+
+    results = {
+        "uncached": await sample(check, runs, before=proc.policy.cache.clear),
+        "cached": await sample(check, runs),
+    }
+
+    # In-process evaluation ([Policy] mode = embedded) with the service's rule file
+    config = copy.copy(proc.config)
+    config.policy_mode = "embedded"
+    embedded = PolicyClient(config, proc.http)
+
+    async def check_embedded():
+        allowed, data = await embedded.check("Zeit:", context)
+        if not allowed:
+            raise RuntimeError(f"policy: {data}")
+
+    results["embedded"] = await sample(check_embedded, runs)
+    await embedded.close()
+    return results
+
+
+async def bench_ingest(proc, services: StandIns, records: int) -> dict:
+    import recorder_storage
+    from flight_recorder_shipper import FlightRecorderShipper
+
+    def entry(i: int) -> dict:
+        return {
+            "timestamp": datetime.now(timezone.utc).isoformat().replace("+00:00", "Z"),
+            "command": f"Rechner: {i} + 1",
+            "policy_status": "approved",
+            "result": f"Ergebnis: {i + 1}",
+            "metadata": {"source": "bench"},
+        }
+
+    results = {}
+
+    # Storage writer: many request threads appending one record each (group commit)
+    with tempfile.TemporaryDirectory(prefix="bench-storage-") as directory:
+        writer = recorder_storage.SegmentWriter(recorder_storage.StorageConfig(directory, fsync="interval"))
+        threads, per_thread = 8, max(1, records // 8)
+
+        def append(offset: int) -> None:
+            for i in range(per_thread):
+                writer.append([entry(offset + i)])
+
+        workers = [threading.Thread(target=append, args=(t * per_thread,)) for t in range(threads)]
+        started = time.perf_counter()
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+        elapsed = time.perf_counter() - started
+        writer.close()
+        results["storage"] = dict(throughput(threads * per_thread, elapsed), commits=writer.commits)
+
+    # Batch endpoint: NDJSON batches as the shipper sends them
+    batch_size = 500
+    bodies = []
+    for start in range(0, records, batch_size):
+        count = min(batch_size, records - start)
+        bodies.append(''.join(json.dumps(entry(start + i)) + '\n' for i in range(count)).encode('utf-8'))
+    url = services.url('flight_recorder') + '/flight_record/batch'
+    started = time.perf_counter()
+    for body in bodies:
+        async with proc.http.post(url, data=body, headers={'Content-Type': 'application/x-ndjson'}) as resp:
+            if resp.status != 200:
+                raise RuntimeError(f"batch endpoint: HTTP {resp.status}")
+    results["batch_endpoint"] = throughput(records, time.perf_counter() - started)
+
+    # Shipper: submit until everything is spooled and accepted by the service
+    config = copy.copy(proc.config)
+    config.flight_recorder_spool = os.path.join(services.workdir, 'bench_shipper.log')
+    shipper = FlightRecorderShipper(config, proc.http)
+    started = time.perf_counter()
+    for i in range(records):
+        shipper.submit(entry(i))
+    await shipper.close(timeout=60)
+    elapsed = time.perf_counter() - started
+    if shipper.shipped < records:
+        raise RuntimeError(f"shipper: only {shipper.shipped}/{records} records shipped")
+    results["shipper"] = throughput(records, elapsed)
+    return results
+
+
+async def bench_repl(proc, runs: int) -> dict:
+    from main import execute_command
+
+    commands = {
+        "zeit": "Zeit:",
+        "rechner": "Rechner: 2**10 + sqrt(2) * pi",
+        "wetter_cached": "Wetter: Berlin",
+    }
+    results = {}
+    for name, command in commands.items():
+        results[name] = await sample(lambda: execute_command(proc, command), runs)
+        results[name + "_policy_uncached"] = await sample(
+            lambda: execute_command(proc, command), runs, before=proc.policy.cache.clear)
+    return results
+
+
+async def run_suite(services: StandIns, runs: int, records: int, only=None) -> dict:
+    from command_processor import CommandProcessor
+    from config import Configuration
+
+    proc = CommandProcessor(Configuration(services.write_config()))
+    results = {}
+    try:
+        if not only or "process" in only:
+            results["process"] = await bench_process(proc, services.workdir, runs)
+        if not only or "policy" in only:
+            results["policy"] = await bench_policy(proc, runs)
+        if not only or "ingest" in only:
+            results["ingest"] = await bench_ingest(proc, services, records)
+        if not only or "repl" in only:
+            results["repl"] = await bench_repl(proc, runs)
+    finally:
+        await proc.close()
+    return results
+
+
+def flatten(results: dict, prefix: str = "") -> dict:
+    flat = {}
+    for key, value in results.items():
+        name = f"{prefix}.{key}" if prefix else key
+        if isinstance(value, dict):
+            flat.update(flatten(value, name))
+        elif isinstance(value, (int, float)) and not isinstance(value, bool):
+            flat[name] = value
+    return flat
+
+
+def _lower_is_better(metric: str):
+    """True for medians, False for throughputs, None for values that are not compared (p95 is too noisy)."""
+    leaf = metric.rsplit(".", 1)[-1]
+    if leaf == "median_ms" or leaf.endswith("_ms_median"):
+        return True
+    if leaf.endswith("_per_s"):
+        return False
+    return None
+
+
+def compare(current: dict, baseline: dict, tolerance: float = DEFAULT_TOLERANCE) -> dict:
+    """Compares two result sets; returns ``{"regressions": [...], "improvements": [...]}``.
+
+    Each entry is ``(metric, baseline, current, relative change)``. Metrics
+    that only exist on one side are ignored.
+    """
+    now, before = flatten(current.get("results", current)), flatten(baseline.get("results", baseline))
+    regressions, improvements = [], []
+    for metric in sorted(now.keys() & before.keys()):
+        lower = _lower_is_better(metric)
+        old, new = before[metric], now[metric]
+        if lower is None or not old:
+            continue
+        change = (new - old) / old
+        worse = change > tolerance if lower else change < -tolerance
+        better = change < -tolerance if lower else change > tolerance
+        if lower and abs(new - old) < NOISE_FLOOR_MS:
+            continue
+        if worse:
+            regressions.append((metric, old, new, round(change, 3)))
+        elif better:
+            improvements.append((metric, old, new, round(change, 3)))
+    return {"regressions": regressions, "improvements": improvements}
+
+
+def report(comparison: dict, tolerance: float, out=sys.stderr) -> None:
+    for title, key in (("Regressions", "regressions"), ("Improvements", "improvements")):
+        rows = comparison[key]
+        if not rows:
+            continue
+        print(f"{title} (tolerance {tolerance:.0%}):", file=out)
+        for metric, old, new, change in rows:
+            print(f"  {metric}: {old} -> {new} ({change:+.1%})", file=out)
+    if not comparison["regressions"]:
+        print("No regressions against the baseline.", file=out)
+
+
+def parse_args(argv=None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--runs', type=int, default=200, help="timed runs per latency scenario")
+    parser.add_argument('--records', type=int, default=5000, help="records per ingest scenario")
+    parser.add_argument('--weather-latency', type=float, default=0.02,
+                        help="simulated OpenWeatherMap response time in seconds")
+    parser.add_argument('--only', action='append', choices=("process", "policy", "ingest", "repl"),
+                        help="run only these scenarios (repeatable)")
+    parser.add_argument('--startup-runs', type=int, default=0, help="also measure startup (bench_startup.py)")
+    parser.add_argument('--output', help="write the results to this JSON file")
+    parser.add_argument('--baseline', help="compare against this results file")
+    parser.add_argument('--tolerance', type=float, default=DEFAULT_TOLERANCE,
+                        help="allowed relative slowdown before a metric counts as regression")
+    parser.add_argument('--save-baseline', metavar='PATH', help="store the results as new baseline")
+    return parser.parse_args(argv)
+
+
+def main(argv=None) -> int:
+    args = parse_args(argv)
+    with StandIns(weather_latency=args.weather_latency) as services:
+        results = asyncio.run(run_suite(services, args.runs, args.records, args.only))
+    if args.startup_runs:
+        import bench_startup
+        results["startup"] = bench_startup.measure(args.startup_runs)
+
+    document = {
+        "meta": {
+            "created": datetime.now(timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "runs": args.runs,
+            "records": args.records,
+            "weather_latency": args.weather_latency,
+        },
+        "results": results,
+    }
+    text = json.dumps(document, indent=2, ensure_ascii=False)
+    print(text)
+    for path in filter(None, (args.output, args.save_baseline)):
+        with open(path, 'w', encoding='utf-8') as fp:
+            fp.write(text + "\n")
+
+    if args.baseline:
+        with open(args.baseline, 'r', encoding='utf-8') as fp:
+            baseline = json.load(fp)
+        comparison = compare(document, baseline, args.tolerance)
+        report(comparison, args.tolerance)
+        return 1 if comparison["regressions"] else 0
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
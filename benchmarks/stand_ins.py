@@ -0,0 +1,165 @@
+"""In-process stand-ins for the services the CLI talks to.
+
+``policy_service`` and ``flight_recorder_service`` are the real Flask apps,
+served from a background thread on an ephemeral port, so a benchmark measures
+the same request handling as production minus the network. OpenWeatherMap is
+replaced by a small fake that answers like the real API after a configurable
+delay. Everything the services write goes to a temporary directory.
+
+    with StandIns() as services:
+        config = services.write_config()
+"""
+import logging
+import os
+import tempfile
+import threading
+import time
+from typing import Optional
+
+from flask import Flask, jsonify, request
+from werkzeug.serving import WSGIRequestHandler, make_server
+
+
+class _KeepAliveHandler(WSGIRequestHandler):
+    # HTTP/1.1 so the client's connection pool can keep connections alive
+    protocol_version = "HTTP/1.1"
+
+    def log_request(self, *args, **kwargs):
+        pass
+
+
+class ServerThread:
+    """Serves a WSGI app on ``127.0.0.1`` from a daemon thread."""
+
+    def __init__(self, app):
+        self._server = make_server('127.0.0.1', 0, app, threaded=True, request_handler=_KeepAliveHandler)
+        self.port = self._server.server_port
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+
+    @property
+    def url(self) -> str:
+        return f"http://127.0.0.1:{self.port}"
+
+    def start(self) -> "ServerThread":
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._server.shutdown()
+        self._thread.join()
+        self._server.server_close()
+
+
+def fake_openweathermap(latency: float = 0.0) -> Flask:
+    """Answers ``GET /data/2.5/weather`` like OpenWeatherMap, after ``latency`` seconds."""
+    app = Flask("fake_openweathermap")
+    app.calls = 0
+
+    @app.get('/data/2.5/weather')
+    def weather():
+        app.calls += 1
+        if latency:
+            time.sleep(latency)
+        city = request.args.get('q', '')
+        if not request.args.get('appid'):
+            return jsonify({"cod": 401, "message": "Invalid API key"}), 401
+        return jsonify({
+            "name": city,
+            "weather": [{"description": "leicht bewölkt"}],
+            "main": {"temp": 12.5},
+        })
+
+    return app
+
+
+class StandIns:
+    """Starts the policy service, the flight-recorder service and a fake OpenWeatherMap.
+
+    ``weather_latency`` simulates the upstream round trip of the real API.
+    """
+
+    def __init__(self, weather_latency: float = 0.02, workdir: Optional[str] = None):
+        self.weather_latency = weather_latency
+        self._tmp = None if workdir else tempfile.TemporaryDirectory(prefix="bench-")
+        self.workdir = workdir or self._tmp.name
+        self.records_dir = os.path.join(self.workdir, 'flight_records')
+        self.servers = {}
+        self._env = {}
+
+    def __enter__(self) -> "StandIns":
+        self.start()
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.stop()
+
+    def start(self) -> None:
+        # Set before import: the services read their environment on load or on first write
+        self._setenv('FLIGHT_RECORDER_DIR', self.records_dir)
+        self._setenv('FLIGHT_RECORDER_FSYNC', 'never')
+        import flight_recorder_service
+        import policy_service
+
+        # Per-request logging in the services would dominate the measurements
+        logging.getLogger().setLevel(logging.WARNING)
+        self.servers = {
+            'policy': ServerThread(policy_service.app).start(),
+            'flight_recorder': ServerThread(flight_recorder_service.app).start(),
+            'openweathermap': ServerThread(fake_openweathermap(self.weather_latency)).start(),
+        }
+
+    def stop(self) -> None:
+        import recorder_storage
+
+        for server in self.servers.values():
+            server.stop()
+        self.servers = {}
+        writer = recorder_storage.get_writer()
+        writer.close()
+        for key, value in self._env.items():
+            if value is None:
+                os.environ.pop(key, None)
+            else:
+                os.environ[key] = value
+        self._env = {}
+        if self._tmp is not None:
+            self._tmp.cleanup()
+
+    def _setenv(self, key: str, value: str) -> None:
+        self._env.setdefault(key, os.environ.get(key))
+        os.environ[key] = value
+
+    def url(self, name: str) -> str:
+        return self.servers[name].url
+
+    def write_config(self, **sections) -> str:
+        """Writes a ``config.ini`` that points the CLI at the stand-ins; returns its path.
+
+        Keyword arguments override whole sections, e.g. ``Policy={"cache_size": "0"}``.
+        """
+        values = {
+            'Logging': {'LogFile': os.path.join(self.workdir, 'app.log')},
+            'API': {
+                'openweathermap_key': 'benchmark',
+                'openweathermap_url': self.url('openweathermap') + '/data/2.5/weather',
+            },
+            'Policy': {'url': self.url('policy') + '/policy_check'},
+            'FlightRecorder': {
+                'url': self.url('flight_recorder') + '/flight_record',
+                'batch_url': self.url('flight_recorder') + '/flight_record/batch',
+                'spool': os.path.join(self.workdir, 'flight_recorder.log'),
+                'flush_interval': '0.05',
+            },
+            'Processor': {'manifest': os.path.join(self.workdir, 'command_manifest.json')},
+            'Web': {'server': 'none'},
+        }
+        for section, overrides in sections.items():
+            values.setdefault(section, {}).update(overrides)
+        path = os.path.join(self.workdir, 'config.ini')
+        with open(path, 'w', encoding='utf-8') as fp:
+            for section, options in values.items():
+                fp.write(f"[{section}]\n")
+                for key, value in options.items():
+                    fp.write(f"{key} = {value}\n")
+                fp.write("\n")
+        return path
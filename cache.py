@@ -0,0 +1,315 @@
+"""Kleine In-Memory-Caches für die CLI."""
+import asyncio
+import logging
+import sys
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional, Set
+
+
+class TTLCache:
+    """Größenbegrenzter LRU-Cache, dessen Einträge nach ihrer TTL verfallen.
+
+    Jeder Eintrag kann eine eigene TTL bekommen (z. B. aus einem ``max_age``
+    der Gegenstelle); ohne Angabe gilt ``default_ttl``.
+    """
+
+    def __init__(self, max_size: int = 1024, default_ttl: float = 60.0):
+        self.max_size = max_size
+        self.default_ttl = default_ttl
+        self._data: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        item = self._data.get(key)
+        if item is None:
+            self.misses += 1
+            return default
+        expires_at, value = item
+        if expires_at <= time.monotonic():
+            del self._data[key]
+            self.misses += 1
+            return default
+        self._data.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def set(self, key: Hashable, value: Any, ttl: Optional[float] = None) -> None:
+        ttl = self.default_ttl if ttl is None else ttl
+        if ttl <= 0 or self.max_size <= 0:
+            return
+        self._data[key] = (time.monotonic() + ttl, value)
+        self._data.move_to_end(key)
+        while len(self._data) > self.max_size:
+            self._data.popitem(last=False)
+            self.evictions += 1
+
+    def invalidate(self, key: Hashable) -> None:
+        self._data.pop(key, None)
+
+    def clear(self) -> None:
+        self._data.clear()
+
+    def __contains__(self, key: Hashable) -> bool:
+        """Gültiger Eintrag vorhanden? Zählt nicht als Zugriff (Statistik und LRU-Reihenfolge bleiben)."""
+        item = self._data.get(key)
+        return item is not None and item[0] > time.monotonic()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._data),
+            "max_size": self.max_size,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0,
+        }
+
+
+class RefreshingCache:
+    """Asynchroner LRU-Cache mit Stale-While-Revalidate und Single-Flight.
+
+    - Innerhalb von ``ttl`` Sekunden wird der Eintrag direkt geliefert.
+    - Danach und bis ``ttl + stale_ttl`` wird der alte Wert sofort geliefert
+      und im Hintergrund genau eine Aktualisierung gestartet.
+    - Fehlt der Eintrag, teilen sich gleichzeitige Aufrufer für denselben
+      Schlüssel einen einzigen ``fetch``.
+
+    Nur Werte, für die ``cacheable(value)`` wahr ist, werden gespeichert
+    (z. B. keine Fehlerantworten).
+    """
+
+    def __init__(self, max_size: int = 256, ttl: float = 600.0, stale_ttl: float = 0.0,
+                 cacheable: Optional[Callable[[Any], bool]] = None):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        self.cacheable = cacheable or (lambda value: True)
+        self._data: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self._inflight: Dict[Hashable, asyncio.Task] = {}
+        self._background: Set[asyncio.Task] = set()
+        self.hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.refreshes = 0
+        self.evictions = 0
+
+    async def get(self, key: Hashable, fetch: Callable[[], Awaitable[Any]]) -> Any:
+        """Liefert den Wert zu ``key``; ``fetch`` wird nur bei Bedarf aufgerufen."""
+        item = self._data.get(key)
+        if item is not None:
+            age = time.monotonic() - item[0]
+            if age < self.ttl:
+                self._data.move_to_end(key)
+                self.hits += 1
+                return item[1]
+            if age < self.ttl + self.stale_ttl:
+                self._data.move_to_end(key)
+                self.stale_hits += 1
+                if self._running(key) is None:
+                    self.refreshes += 1
+                    task = self._start(key, fetch)
+                    self._background.add(task)
+                    task.add_done_callback(self._refresh_done)
+                return item[1]
+            del self._data[key]
+
+        task = self._running(key)
+        if task is not None:
+            self.coalesced += 1
+        else:
+            self.misses += 1
+            task = self._start(key, fetch)
+        # shield: ein abgebrochener Aufrufer bricht den Abruf der anderen nicht ab
+        return await asyncio.shield(task)
+
+    def _running(self, key: Hashable) -> Optional[asyncio.Task]:
+        task = self._inflight.get(key)
+        if task is None or task.done():
+            return None
+        # Tasks sind an ihre Event-Loop gebunden (Flask nutzt pro Request eine eigene)
+        if task.get_loop() is not asyncio.get_running_loop():
+            return None
+        return task
+
+    def _start(self, key: Hashable, fetch: Callable[[], Awaitable[Any]]) -> asyncio.Task:
+        task = asyncio.ensure_future(self._fetch(key, fetch))
+        self._inflight[key] = task
+        task.add_done_callback(lambda t: self._inflight.pop(key, None) if self._inflight.get(key) is t else None)
+        return task
+
+    async def _fetch(self, key: Hashable, fetch: Callable[[], Awaitable[Any]]) -> Any:
+        value = await fetch()
+        if self.cacheable(value):
+            self._store(key, value)
+        return value
+
+    def _refresh_done(self, task: asyncio.Task) -> None:
+        self._background.discard(task)
+        if not task.cancelled() and task.exception() is not None:
+            logging.error("Hintergrund-Aktualisierung fehlgeschlagen: %s", task.exception())
+
+    def _store(self, key: Hashable, value: Any) -> None:
+        if self.ttl <= 0 or self.max_size <= 0:
+            return
+        self._data[key] = (time.monotonic(), value)
+        self._data.move_to_end(key)
+        while len(self._data) > self.max_size:
+            self._data.popitem(last=False)
+            self.evictions += 1
+
+    def invalidate(self, key: Hashable) -> None:
+        self._data.pop(key, None)
+
+    def clear(self) -> None:
+        self._data.clear()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.stale_hits + self.misses + self.coalesced
+        return {
+            "size": len(self._data),
+            "max_size": self.max_size,
+            "hits": self.hits,
+            "stale_hits": self.stale_hits,
+            "misses": self.misses,
+            "coalesced": self.coalesced,
+            "refreshes": self.refreshes,
+            "evictions": self.evictions,
+            "hit_rate": round((self.hits + self.stale_hits) / lookups, 3) if lookups else 0.0,
+        }
+
+
+def approx_size(value: Any) -> int:
+    """Grobe Speichergröße eines Werts in Bytes (Container rekursiv, ohne geteilte Objekte zu erkennen)."""
+    size = sys.getsizeof(value)
+    if isinstance(value, dict):
+        size += sum(approx_size(k) + approx_size(v) for k, v in value.items())
+    elif isinstance(value, (list, tuple, set, frozenset)):
+        size += sum(approx_size(item) for item in value)
+    return size
+
+
+class ResultCache:
+    """LRU-Cache für Ergebnisse mit TTL je Eintrag, Obergrenze für Anzahl und Bytes und Single-Flight.
+
+    Fehlt ein Eintrag, teilen sich gleichzeitige Aufrufer für denselben
+    Schlüssel einen einzigen ``compute``. Wird der letzte von ihnen
+    abgebrochen, wird auch ``compute`` abgebrochen. Nur Werte, für die
+    ``cacheable(value)`` wahr ist, werden gespeichert, und nur, wenn
+    mindestens ein Aufrufer ``store`` verlangt; ein einzelner Wert über
+    ``max_bytes`` wird nie gespeichert.
+    """
+
+    def __init__(self, max_size: int = 1024, max_bytes: int = 64 * 1024 * 1024, default_ttl: float = 300.0,
+                 cacheable: Optional[Callable[[Any], bool]] = None, weigh: Callable[[Any], int] = approx_size):
+        self.max_size = max_size
+        self.max_bytes = max_bytes
+        self.default_ttl = default_ttl
+        self.cacheable = cacheable or (lambda value: True)
+        self.weigh = weigh
+        # key -> (expires_at, value, bytes)
+        self._data: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self._inflight: Dict[Hashable, asyncio.Task] = {}
+        # laufende Berechnung -> Anzahl der Aufrufer, die noch auf sie warten
+        self._waiters: Dict[asyncio.Task, int] = {}
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.evictions = 0
+
+    async def get(self, key: Hashable, compute: Callable[[], Awaitable[Any]], ttl: Optional[float] = None,
+                  store: bool = True) -> Any:
+        """Liefert den Wert zu ``key``; ``compute`` läuft nur bei Bedarf und nur einmal gleichzeitig.
+
+        Mit ``store=False`` (spekulative Ausführung vor der Policy-Freigabe)
+        wird ein Treffer geliefert, ein neu berechneter Wert aber nicht gespeichert.
+        """
+        item = self._data.get(key)
+        if item is not None:
+            if item[0] > time.monotonic():
+                self._data.move_to_end(key)
+                self.hits += 1
+                return item[1]
+            self._remove(key)
+
+        task = self._inflight.get(key)
+        # Tasks sind an ihre Event-Loop gebunden (Flask nutzt pro Request eine eigene)
+        if task is not None and not task.done() and task.get_loop() is asyncio.get_running_loop():
+            self.coalesced += 1
+        else:
+            self.misses += 1
+            task = asyncio.ensure_future(compute())
+            self._inflight[key] = task
+            task.add_done_callback(lambda t: self._inflight.pop(key, None) if self._inflight.get(key) is t else None)
+
+        self._waiters[task] = self._waiters.get(task, 0) + 1
+        try:
+            # shield: ein abgebrochener Aufrufer bricht die Berechnung der anderen nicht ab
+            value = await asyncio.shield(task)
+        finally:
+            waiting = self._waiters.pop(task) - 1
+            if waiting:
+                self._waiters[task] = waiting
+            elif not task.done():
+                # Niemand wartet mehr: nicht für den Cache weiterrechnen
+                task.cancel()
+                if self._inflight.get(key) is task:
+                    del self._inflight[key]
+        if store and key not in self._data and self.cacheable(value):
+            self.set(key, value, ttl)
+        return value
+
+    def set(self, key: Hashable, value: Any, ttl: Optional[float] = None) -> None:
+        ttl = self.default_ttl if ttl is None else ttl
+        if ttl <= 0 or self.max_size <= 0:
+            return
+        weight = self.weigh(value)
+        if weight > self.max_bytes:
+            return
+        self._remove(key)
+        self._data[key] = (time.monotonic() + ttl, value, weight)
+        self.bytes += weight
+        while len(self._data) > self.max_size or self.bytes > self.max_bytes:
+            _, (_, _, evicted) = self._data.popitem(last=False)
+            self.bytes -= evicted
+            self.evictions += 1
+
+    def _remove(self, key: Hashable) -> None:
+        item = self._data.pop(key, None)
+        if item is not None:
+            self.bytes -= item[2]
+
+    def invalidate(self, key: Hashable) -> None:
+        self._remove(key)
+
+    def clear(self) -> None:
+        self._data.clear()
+        self.bytes = 0
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses + self.coalesced
+        return {
+            "size": len(self._data),
+            "max_size": self.max_size,
+            "bytes": self.bytes,
+            "max_bytes": self.max_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "coalesced": self.coalesced,
+            "evictions": self.evictions,
+            "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0,
+        }
@@ -0,0 +1,154 @@
+"""Circuit-Breaker für die Abhängigkeiten der CLI (Policy-Service, Flight-Recorder).
+
+Nach ``failure_threshold`` aufeinanderfolgenden Fehlern öffnet der Breaker:
+Aufrufe scheitern sofort, statt jeweils bis zum HTTP-Timeout zu warten. Im
+Hintergrund fragt er alle ``probe_interval`` Sekunden den ``/health``-Endpunkt
+des Dienstes ab. Antwortet dieser, geht der Breaker auf ``half_open``: genau
+ein echter Aufruf wird als Versuch durchgelassen und entscheidet, ob er wieder
+schließt oder erneut öffnet; alle anderen scheitern bis dahin sofort. Meldet
+der Versuch binnen ``http_total_timeout`` Sekunden kein Ergebnis (z. B. weil er
+abgebrochen wurde), wird der nächste Aufruf zugelassen. Ohne Health-URL wird
+nach ``reset_timeout`` Sekunden ein Versuch zugelassen.
+"""
+import asyncio
+import logging
+import time
+from typing import Any, Dict, Optional
+
+import metrics
+from http_client import HttpClient
+
+CLOSED = "closed"
+HALF_OPEN = "half_open"
+OPEN = "open"
+
+_STATE_VALUES = {CLOSED: 0, HALF_OPEN: 1, OPEN: 2}
+STATE = metrics.gauge("cli_circuit_state", "Zustand je Abhängigkeit (0 closed, 1 half_open, 2 open)", ("dependency",))
+SHORT_CIRCUITS = metrics.counter("cli_circuit_short_circuits_total", "Wegen offenem Circuit sofort abgewiesene Aufrufe",
+                                 ("dependency",))
+
+
+def health_url(url: Optional[str], *suffixes: str) -> Optional[str]:
+    """``/health`` neben einem Service-Endpunkt, z. B. ``.../policy_check`` -> ``.../health``."""
+    if not url:
+        return None
+    base = url.rstrip('/')
+    for suffix in suffixes:
+        if base.endswith(suffix):
+            base = base[:-len(suffix)]
+            break
+    return base + '/health'
+
+
+class CircuitBreaker:
+    """Zustand und Health-Probing für genau eine Abhängigkeit."""
+
+    def __init__(self, name: str, config: Any = None, http: Optional[HttpClient] = None,
+                 probe_url: Optional[str] = None):
+        self.name = name
+        self.failure_threshold = max(1, getattr(config, 'circuit_failure_threshold', 3))
+        self.probe_interval = getattr(config, 'circuit_probe_interval', 2.0)
+        self.probe_timeout = getattr(config, 'circuit_probe_timeout', 1.0)
+        self.reset_timeout = getattr(config, 'circuit_reset_timeout', 30.0)
+        self.trial_timeout = getattr(config, 'http_total_timeout', 5.0)
+        self.probe_url = probe_url
+        self._http = http if http is not None else HttpClient(config)
+
+        self.state = CLOSED
+        self.failures = 0
+        self.trips = 0
+        self.short_circuited = 0
+        self.opened_at: Optional[float] = None
+        self.last_error: Optional[str] = None
+        self._probe: Optional[asyncio.Task] = None
+        self._trial_at: Optional[float] = None
+        STATE.set(0, name)
+
+    def allow(self) -> bool:
+        """True, wenn ein Aufruf versucht werden darf; sonst sofort scheitern."""
+        if self.state == CLOSED:
+            return True
+        now = time.monotonic()
+        if self.state == OPEN and self.probe_url is None and now - self.opened_at >= self.reset_timeout:
+            self._set(HALF_OPEN)
+        if self.state == HALF_OPEN:
+            # Nur ein Versuch gleichzeitig; ein verlorener gibt nach trial_timeout frei
+            if self._trial_at is None or now - self._trial_at >= self.trial_timeout:
+                self._trial_at = now
+                return True
+        else:
+            self._ensure_probe()
+        self.short_circuited += 1
+        SHORT_CIRCUITS.inc(self.name)
+        return False
+
+    def record_success(self) -> None:
+        self.failures = 0
+        if self.state != CLOSED:
+            logging.info("Circuit '%s' geschlossen: Dienst antwortet wieder", self.name)
+            self._set(CLOSED)
+
+    def record_failure(self, error: Any = None) -> None:
+        self.failures += 1
+        self.last_error = str(error) if error is not None else None
+        if self.state == HALF_OPEN or (self.state == CLOSED and self.failures >= self.failure_threshold):
+            self.trips += 1
+            self.opened_at = time.monotonic()
+            logging.warning("Circuit '%s' geöffnet nach %d Fehler(n): %s", self.name, self.failures, error)
+            self._set(OPEN)
+            self._ensure_probe()
+
+    def _set(self, state: str) -> None:
+        self.state = state
+        self._trial_at = None
+        STATE.set(_STATE_VALUES[state], self.name)
+
+    # Health-Probing
+
+    def _ensure_probe(self) -> None:
+        if self.probe_url is None:
+            return
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            return
+        task = self._probe
+        if task is not None and not task.done() and task.get_loop() is loop:
+            return
+        self._probe = loop.create_task(self._probe_loop())
+
+    async def _probe_loop(self) -> None:
+        while self.state == OPEN:
+            await asyncio.sleep(self.probe_interval)
+            if self.state == OPEN and await self.probe():
+                logging.info("Circuit '%s' halb offen: Health-Check erfolgreich", self.name)
+                self._set(HALF_OPEN)
+
+    async def probe(self) -> bool:
+        """Fragt den Health-Endpunkt einmal ab."""
+        import aiohttp
+
+        try:
+            async with self._http.get(self.probe_url, timeout=aiohttp.ClientTimeout(total=self.probe_timeout)) as resp:
+                return resp.status == 200
+        except Exception as exc:
+            logging.debug("Health-Check für '%s' fehlgeschlagen: %s", self.name, exc)
+            return False
+
+    async def close(self) -> None:
+        task, self._probe = self._probe, None
+        if task is not None and not task.done() and task.get_loop() is asyncio.get_running_loop():
+            task.cancel()
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "state": self.state,
+            "failures": self.failures,
+            "trips": self.trips,
+            "short_circuited": self.short_circuited,
+            "last_error": self.last_error,
+        }
@@ -1,192 +1,305 @@
+import asyncio
 import inspect
-import commands
 import logging
-from typing import Dict, Any
+import time
+import weakref
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, Hashable, Iterable, List, Optional, Tuple
+
+from cache import ResultCache
+from command_registry import CommandRegistry
+from file_ops import FileOps
+from flight_recorder_shipper import FlightRecorderShipper
+from http_client import HttpClient
+import metrics
+import pipeline
+from policy_client import PolicyClient
+import tracing
+
+COMMAND_DURATION = metrics.histogram(
+    "cli_command_duration_seconds", "Ausführungsdauer je Befehl (ohne Policy-Check)", ("command",))
+COMMANDS = metrics.counter("cli_commands_total", "Ausgeführte Befehle je Befehl und Status", ("command", "status"))
+RECORDER_QUEUE = metrics.gauge("cli_flight_recorder_queue_depth", "Flight-Records in der Versand-Queue")
+HTTP_POOL = metrics.gauge("cli_http_pool_connections", "Verbindungen im HTTP-Pool", ("state",))
+RESULT_CACHE_BYTES = metrics.gauge("cli_result_cache_bytes", "Geschätzter Speicher der gecachten Befehlsergebnisse")
+RESULT_CACHE_ENTRIES = metrics.gauge("cli_result_cache_entries", "Gecachte Befehlsergebnisse")
+RESULT_CACHE_LOOKUPS = metrics.gauge("cli_result_cache_lookups", "Zugriffe auf den Ergebnis-Cache seit dem Start",
+                                     ("outcome",))
+
+
+class _DefaultHelp:
+    """Ein einfacher Help-Command, falls keine Hilfe-Klasse gefunden/instanziiert werden konnte."""
+    description = "Zeigt verfügbare Befehle an."
+    read_only = True
+
+    def __init__(self, registry: CommandRegistry):
+        self._registry = registry
+
+    def execute(self, value: str = "") -> Dict[str, str]:
+        lines = ["Verfügbare Befehle:"]
+        for name, spec in sorted(self._registry.specs().items(), key=lambda item: item[0].lower()):
+            if name.lower() == 'hilfe':
+                continue
+            # Nur die erste Zeile der Beschreibung
+            lines.append(f"- {name}: {spec.description.splitlines()[0]}")
+        return {"status": "success", "result": "\n".join(lines)}
+
 
 class CommandProcessor:
     def __init__(self, config: Any):
         self.config = config
-        self.commands = self._discover_commands()
+        # Geteilter Connection-Pool für alle ausgehenden HTTP-Aufrufe
+        self.http = HttpClient(config)
+        # Thread-Pool für Dateioperationen (Lesen, Speichern, Löschen)
+        self.files = FileOps(config)
+        # Hintergrund-Versand der Flight-Records (Spool + Batch-Endpunkt)
+        self.recorder = FlightRecorderShipper(config, self.http)
+        # Policy-Client mit Entscheidungs-Cache
+        self.policy = PolicyClient(config, self.http)
+        # Ergebnisse reiner Befehle (pure), mit Zusammenlegen gleichzeitiger identischer Aufrufe
+        self.results = ResultCache(
+            max_size=getattr(config, 'processor_result_cache_size', 1024),
+            max_bytes=getattr(config, 'processor_result_cache_max_bytes', 64 * 1024 * 1024),
+            default_ttl=getattr(config, 'processor_result_cache_ttl', 300.0),
+            cacheable=lambda result: result.get('status') == 'success',
+        )
+        # Befehle werden erst beim ersten Aufruf importiert und instanziiert
+        self.commands = CommandRegistry(
+            {'config': config, 'http': self.http, 'files': self.files},
+            manifest_path=getattr(config, 'command_manifest', None),
+        )
 
         # FALLBACK: Wenn keine Hilfe vorhanden ist, stelle eine Default-Hilfe sicher
-        if 'hilfe' not in self.commands and 'Hilfe' not in self.commands:
-            class _DefaultHelp:
-                def __init__(self, commands_dict: Dict[str, Any]):
-                    self._commands = commands_dict
-                    self.description = "Zeigt verfügbare Befehle an."
-
-                def execute(self, value: str = "") -> Dict[str, str]:
-                    lines = ["Verfügbare Befehle:"]
-                    seen = set()
-                    for k in sorted(self._commands.keys(), key=lambda s: s.lower()):
-                        kl = k.lower()
-                        if kl in seen or kl == 'hilfe':
-                            continue
-                        seen.add(kl)
-                        cmd = self._commands[k]
-                        desc = getattr(cmd, 'description', None) or (cmd.__doc__ or '').strip()
-                        display_name = kl.capitalize()
-                        if desc:
-                            desc_line = desc.splitlines()[0]
-                            lines.append(f"- {display_name}: {desc_line}")
-                        else:
-                            lines.append(f"- {display_name}")
-                    return {"status": "success", "result": "\n".join(lines)}
-
-            help_inst = _DefaultHelp(self.commands)
-            self.commands['hilfe'] = help_inst
-            self.commands['Hilfe'] = help_inst
-
-        # Debug: liste geladene Befehle auf
-        try:
-            logging.info(f"CommandProcessor: geladene Befehle: {sorted(self.commands.keys())}")
-        except Exception:
-            pass
+        if 'hilfe' not in self.commands:
+            self.commands.register('Hilfe', _DefaultHelp(self.commands))
 
-    def _discover_commands(self) -> Dict[str, Any]:
-        """Findet und instanziiert alle Command-Klassen im 'commands'-Modul.
+        logging.info(f"CommandProcessor: registrierte Befehle: {sorted(self.commands.names())}")
+        self._bind_gauges()
 
-        - Überspringt explizit definierte Basisklassen wie BaseCommand.
-        - Versucht, Konstruktor-Parameter (z. B. config, commands) zu erkennen und zu übergeben.
-        - Überspringt Klassen, die bei der Instanziierung Fehler werfen.
-        - Speichert Command-Namen in lowercase und Capitalized Form für robuste Lookup.
-        """
-        discovered_commands: Dict[str, Any] = {}
+    def _bind_gauges(self) -> None:
+        # Werte erst beim Abruf von /metrics lesen; weakref, damit der Prozessor freigegeben werden kann
+        ref = weakref.ref(self)
 
-        base_cls = getattr(commands, 'BaseCommand', None)
+        def queue_depth():
+            proc = ref()
+            return proc.recorder.queue_depth if proc is not None else None
 
-        for name, obj in inspect.getmembers(commands, inspect.isclass):
-            # Nur Klassen mit dem 'Command'-Suffix betrachten
-            if not name.endswith('Command'):
-                continue
+        def pool():
+            proc = ref()
+            if proc is None:
+                return {}
+            stats = proc.http.stats()
+            return {"in_use": stats["in_use"], "idle": stats["idle"]}
 
-            # Überspringe die Basisklasse selbst
-            if base_cls is not None and obj is base_cls:
-                continue
+        def cache_bytes():
+            proc = ref()
+            return proc.results.bytes if proc is not None else None
 
-            # Skip HilfeCommand here; wird gesondert initialisiert
-            if name == 'HilfeCommand':
-                continue
+        def cache_entries():
+            proc = ref()
+            return len(proc.results) if proc is not None else None
 
-            # Prüfe, ob es sinnvoll ist, die Klasse zu behandeln
-            try:
-                if base_cls is not None:
-                    if not issubclass(obj, base_cls):
-                        # Wenn es keine Unterklasse der BaseCommand ist, dann nur aufnehmen,
-                        # falls eine execute()-Methode vorhanden ist
-                        if not hasattr(obj, 'execute'):
-                            continue
-                else:
-                    # Kein BaseCommand definiert -> akzeptiere Klassen mit execute
-                    if not hasattr(obj, 'execute'):
-                        continue
-
-                # Erzeuge Instanz und übergebe gegebenenfalls 'config'
-                ctor_sig = inspect.signature(obj.__init__)
-                kwargs = {}
-                if 'config' in ctor_sig.parameters:
-                    kwargs['config'] = self.config
-                # Manche Commands erwarten 'commands' oder andere Parameter — wir übergeben nur 'config' hier
-
-                instance = obj(**kwargs)
-                command_name = name.replace('Command', '')
-                # Speichere beide Varianten: lowercase (für parsing) und Capitalized (für ältere callers)
-                discovered_commands[command_name.lower()] = instance
-                discovered_commands[command_name.capitalize()] = instance
-            except Exception:
-                # Wenn die Klasse nicht instanziiert werden kann, überspringe sie (robustheit)
-                continue
+        def cache_lookups():
+            proc = ref()
+            if proc is None:
+                return {}
+            return {outcome: getattr(proc.results, outcome) for outcome in ("hits", "misses", "coalesced")}
 
-        # Initialisiere HilfeCommand separat mit der Liste anderer Befehle und optional config
-        if hasattr(commands, 'HilfeCommand'):
-            HilfeCls = getattr(commands, 'HilfeCommand')
-            try:
-                help_ctor_sig = inspect.signature(HilfeCls.__init__)
-                help_kwargs = {}
-                # Versuche unterschiedliche mögliche Parameter
-                if 'commands' in help_ctor_sig.parameters:
-                    help_kwargs['commands'] = discovered_commands
-                if 'config' in help_ctor_sig.parameters:
-                    help_kwargs['config'] = self.config
-
-                # Wenn help_kwargs noch leer ist, übergebe discovered_commands als positional
-                if help_kwargs:
-                    help_inst = HilfeCls(**help_kwargs)
-                else:
-                    help_inst = HilfeCls(discovered_commands)
-
-                discovered_commands['hilfe'] = help_inst
-                discovered_commands['Hilfe'] = help_inst
-            except Exception:
-                # Ignoriere Fehler beim Erstellen der Hilfe-Instanz
-                pass
-
-        # FALLBACK: Wenn weiterhin kein 'Hilfe' vorhanden ist, erstelle eine Default-Hilfe
-        if 'hilfe' not in discovered_commands and 'Hilfe' not in discovered_commands:
-            class _DefaultHelp:
-                """Ein einfacher Help-Command, falls keine Hilfe-Klasse gefunden/instanziiert werden konnte."""
-                def __init__(self, commands_dict: Dict[str, Any]):
-                    self._commands = commands_dict
-                    self.description = "Zeigt verfügbare Befehle an."
-
-                def execute(self, value: str = "") -> Dict[str, str]:
-                    lines = ["Verfügbare Befehle:"]
-                    # Wir zeigen nur die lowercase Schlüssel (Menschenfreundlich)
-                    seen = set()
-                    for k in sorted(self._commands.keys(), key=lambda s: s.lower()):
-                        kl = k.lower()
-                        if kl in seen or kl == 'hilfe':
-                            continue
-                        seen.add(kl)
-                        cmd = self._commands[k]
-                        desc = getattr(cmd, 'description', None) or (cmd.__doc__ or '').strip()
-                        display_name = kl.capitalize()
-                        if desc:
-                            # Nur die erste Zeile der Beschreibung
-                            desc_line = desc.splitlines()[0]
-                            lines.append(f"- {display_name}: {desc_line}")
-                        else:
-                            lines.append(f"- {display_name}")
-                    return {"status": "success", "result": "\n".join(lines)}
-
-            help_inst = _DefaultHelp(discovered_commands)
-            discovered_commands['hilfe'] = help_inst
-            discovered_commands['Hilfe'] = help_inst
-
-        return discovered_commands
+        RECORDER_QUEUE.set_function(queue_depth)
+        HTTP_POOL.set_function(pool)
+        RESULT_CACHE_BYTES.set_function(cache_bytes)
+        RESULT_CACHE_ENTRIES.set_function(cache_entries)
+        RESULT_CACHE_LOOKUPS.set_function(cache_lookups)
 
     def _find_command_case_insensitive(self, name: str):
-        """Hilfsfunktion: finde einen command instance per case-insensitive key."""
+        """Hilfsfunktion: finde eine Befehlsinstanz per normalisiertem Namen oder eindeutiger Abkürzung.
+
+        Groß-/Kleinschreibung und Umlaute werden gefaltet (``Loeschen`` == ``löschen``);
+        die Suche kostet O(Länge des Namens), unabhängig von der Anzahl der Befehle.
+        """
         if not name:
             return None
-        # first direct lookup
-        inst = self.commands.get(name)
-        if inst:
-            return inst
-        lower = name.lower()
-        inst = self.commands.get(lower)
-        if inst:
-            return inst
-        # fallback: iterate keys
-        for k, v in self.commands.items():
-            if k.lower() == lower:
-                return v
-        return None
-
-    async def process(self, raw_command: str) -> Dict[str, str]:
+        return self.commands.get(name)
+
+    def _not_found_message(self, name: str) -> str:
+        candidates, ambiguous = self.commands.suggestions(name)
+        if ambiguous:
+            return f"Befehl '{name}' ist mehrdeutig: {', '.join(candidates)}."
+        message = f"Befehl '{name}' nicht gefunden."
+        if candidates:
+            message += f" Meinten Sie: {', '.join(candidates)}?"
+        return message
+
+    def is_pipeline(self, raw_command: str) -> bool:
+        """True, wenn die Eingabe eine Pipeline ist.
+
+        Dafür muss jede Stufe nach der ersten mit dem vollen Namen eines
+        Befehls beginnen, der Eingabe verarbeitet (``accepts_input``).
+        Sonst gehört `` | `` zum Argument eines einzelnen Befehls, z. B. bei
+        ``Speichern:a.txt:foo | bar`` oder ``Analyse:Hallo | Welt``.
+        """
+        if not pipeline.is_pipeline(raw_command):
+            return False
+        for stage in pipeline.split(raw_command)[1:]:
+            name = stage.split(':', 1)[0].strip()
+            # Keine Abkürzungen: "Analyse:Hallo | an" ist Text, keine Stufe "Analyse"
+            spec = self.commands.spec(name) if name in self.commands else None
+            if spec is None or spec.attrs.get('accepts_input') is not True:
+                return False
+        return True
+
+    def _stages(self, raw_command: str) -> List[str]:
+        return pipeline.split(raw_command) if self.is_pipeline(raw_command) else [raw_command.strip()]
+
+    def is_read_only(self, raw_command: str) -> bool:
+        """True, wenn der Befehl (bei Pipelines: jede Stufe) als seiteneffektfrei deklariert ist."""
+        if not raw_command or not raw_command.strip():
+            return False
+        for stage in self._stages(raw_command):
+            name = stage.split(':', 1)[0].strip()
+            spec = self.commands.spec(name) if name else None
+            if spec is None or not spec.read_only:
+                return False
+        return True
+
+    def complete(self, prefix: str) -> List[str]:
+        """Befehlsnamen für die Tab-Vervollständigung."""
+        return self.commands.complete(prefix)
+
+    async def process(self, raw_command: str, speculative: bool = False) -> Dict[str, str]:
         """Verarbeitet einen rohen Eingabestring im Format 'Befehl:Wert'.
 
-        Gibt ein Dict mit Schlüsseln 'status' und 'result' zurück.
+        Gibt ein Dict mit Schlüsseln 'status' und 'result' zurück. Mit
+        ``speculative`` (Ausführung vor der Policy-Freigabe) landet das
+        Ergebnis nicht im Ergebnis-Cache.
         """
         if not raw_command or not raw_command.strip():
             return {"status": "error", "result": "Kein Befehl eingegeben."}
+        if self.is_pipeline(raw_command):
+            return await self._process_pipeline(raw_command)
+
+        with tracing.span("parse"):
+            parts = raw_command.strip().split(':', 1)
+            command_name = parts[0].strip()
+            value = parts[1] if len(parts) > 1 else ""
+
+        started = time.perf_counter()
+        with tracing.span("lookup"):
+            key = self.commands.resolve(command_name) if command_name else None
+            command_instance = self.commands.get(key) if key else None
+            # Nur bekannte Befehle als Label, damit die Zahl der Zeitreihen begrenzt bleibt
+            label = key if command_instance else "unknown"
+
+        with tracing.span("execute"):
+            result = await self._execute(command_instance, value, parts[0], label, store=not speculative)
+        COMMAND_DURATION.observe(time.perf_counter() - started, label)
+        COMMANDS.inc(label, result.get("status", "error"))
+        return result
+
+    async def _process_pipeline(self, raw_command: str) -> Dict[str, str]:
+        """Führt eine Pipeline aus und sammelt ihre Ausgabe (höchstens ``[Processor] pipeline_max_output`` Zeichen)."""
+        started = time.perf_counter()
+        limit = getattr(self.config, 'processor_pipeline_max_output', 1024 * 1024)
+        parts: List[str] = []
+        size = 0
+        truncated = False
+        stream = self.process_stream(raw_command)
+        try:
+            with tracing.span("execute"):
+                async for chunk in stream:
+                    if size + len(chunk) > limit:
+                        parts.append(chunk[:limit - size])
+                        truncated = True
+                        break
+                    parts.append(chunk)
+                    size += len(chunk)
+            output = ''.join(parts).rstrip('\n')
+            if truncated:
+                output += f"\n[... Ausgabe auf {limit} Zeichen gekürzt]"
+            result = {"status": "success", "result": output}
+        except pipeline.PipelineError as e:
+            result = {"status": "error", "result": str(e)}
+        except Exception as e:
+            result = {"status": "error", "result": f"Fehler beim Ausführen der Pipeline: {e}"}
+        finally:
+            await stream.aclose()
+        COMMAND_DURATION.observe(time.perf_counter() - started, "pipeline")
+        COMMANDS.inc("pipeline", result["status"])
+        return result
 
-        parts = raw_command.strip().split(':', 1)
-        command_name = parts[0].strip()
-        value = parts[1] if len(parts) > 1 else ""
+    async def process_stream(self, raw_command: str) -> AsyncIterator[str]:
+        """Führt einen Befehl oder eine Pipeline aus und liefert die Ausgabe abschnittsweise.
 
-        command_instance = self._find_command_case_insensitive(command_name)
+        Jede Stufe läuft als eigener Task hinter einer Queue mit höchstens
+        ``[Processor] pipeline_buffer`` Abschnitten. Fehler einer Stufe
+        (auch eine ungültige Pipeline) kommen als ``pipeline.PipelineError``.
+        """
+        with tracing.span("parse"):
+            stages = self._stages(raw_command)
+        with tracing.span("lookup"):
+            resolved = self._resolve_stages(stages)
+        buffer = getattr(self.config, 'processor_pipeline_buffer', 4)
+        source: Optional[AsyncIterator[str]] = None
+        for command_instance, value in resolved:
+            source = pipeline.buffered(self._stage(command_instance, value, source), buffer)
+        async for chunk in source:
+            yield chunk
+
+    def _resolve_stages(self, stages: List[str]) -> List[Tuple[Any, str]]:
+        resolved = []
+        for index, stage in enumerate(stages):
+            name, _, value = stage.partition(':')
+            name = name.strip()
+            if not name:
+                raise pipeline.PipelineError("Fehler: Leere Stufe in der Pipeline.")
+            command_instance = self._find_command_case_insensitive(name)
+            if command_instance is None:
+                raise pipeline.PipelineError(self._not_found_message(name))
+            if index and not getattr(command_instance, 'accepts_input', False):
+                spec = self.commands.spec(name)
+                canonical = spec.name if spec is not None else name
+                raise pipeline.PipelineError(f"Befehl '{canonical}' kann keine Eingabe aus einer Pipeline verarbeiten.")
+            resolved.append((command_instance, value))
+        return resolved
+
+    async def _stage(self, command_instance: Any, value: str,
+                     source: Optional[AsyncIterator[str]]) -> AsyncIterator[str]:
+        stream = getattr(command_instance, 'stream', None)
+        if stream is not None:
+            async for chunk in stream(value, source):
+                yield chunk
+            return
+        # Befehle ohne stream() (z. B. ältere Plugins) liefern ihr Ergebnis als einen Abschnitt
+        result = await self._run(command_instance, value, "")
+        if result.get('status') != 'success':
+            raise pipeline.PipelineError(result.get('result', 'Unbekannter Fehler'))
+        yield result.get('result', '')
+
+    def _result_key(self, command_instance: Any, value: str, label: str) -> Optional[Hashable]:
+        if command_instance is None or getattr(command_instance, 'pure', False) is not True:
+            return None
+        try:
+            key = command_instance.cache_key(value)
+        except Exception as e:
+            logging.debug("Cache-Schlüssel für '%s' nicht bestimmbar: %s", label, e)
+            return None
+        return None if key is None else (label, key)
 
+    async def _execute(self, command_instance: Any, value: str, raw_name: str, label: str,
+                       store: bool = True) -> Dict[str, str]:
+        """Führt den Befehl aus; Ergebnisse reiner Befehle kommen aus dem Ergebnis-Cache."""
+        key = self._result_key(command_instance, value, label)
+        if key is None:
+            return await self._run(command_instance, value, raw_name)
+        result = await self.results.get(
+            key,
+            lambda: self._run(command_instance, value, raw_name),
+            ttl=getattr(command_instance, 'cache_ttl', None),
+            store=store,
+        )
+        # Kopie, damit Aufrufer den gecachten Eintrag nicht verändern
+        return dict(result)
+
+    async def _run(self, command_instance: Any, value: str, raw_name: str) -> Dict[str, str]:
         if command_instance:
             try:
                 result = command_instance.execute(value)
@@ -197,19 +310,76 @@ class CommandProcessor:
             except Exception as e:
                 return {"status": "error", "result": f"Fehler beim Ausführen des Befehls: {e}"}
         else:
-            return {"status": "error", "result": f"Befehl '{parts[0]}' nicht gefunden."}
+            return {"status": "error", "result": self._not_found_message(raw_name)}
+
+    async def process_many(
+        self,
+        raw_commands: Iterable[str],
+        concurrency: Optional[int] = None,
+        handler: Optional[Callable[[str], Awaitable[Dict[str, str]]]] = None,
+    ) -> List[Dict[str, str]]:
+        """Verarbeitet viele Befehle nebenläufig; die Ergebnisse behalten die Eingabereihenfolge.
+
+        Höchstens ``concurrency`` Befehle laufen gleichzeitig (Standard aus
+        ``[Processor] concurrency``), sodass I/O-lastige Befehle wie Wetter oder
+        Netzwerk überlappen. Mit ``handler`` lässt sich statt ``process`` eine
+        eigene Pipeline (z. B. inklusive Policy-Check) pro Befehl ausführen.
+        """
+        command_list = list(raw_commands)
+        limit = concurrency or getattr(self.config, 'processor_concurrency', 8)
+        handler = handler or self.process
+        results: List[Optional[Dict[str, str]]] = [None] * len(command_list)
+        pending = iter(enumerate(command_list))
+
+        async def worker() -> None:
+            # Feste Anzahl Worker statt eines Tasks pro Befehl
+            for index, raw_command in pending:
+                try:
+                    results[index] = await handler(raw_command)
+                except Exception as e:
+                    results[index] = {"status": "error", "result": f"Fehler beim Ausführen des Befehls: {e}"}
+
+        await asyncio.gather(*(worker() for _ in range(max(1, min(limit, len(command_list))))))
+        return results
+
+    def status(self) -> Dict[str, Dict[str, Any]]:
+        """Liefert Laufzeitstatistiken der Subsysteme (für den CLI-Befehl 'status')."""
+        status = {
+            "policy_cache": self.policy.stats(),
+            "result_cache": self.results.stats(),
+            "http_pool": self.http.stats(),
+            "flight_recorder": {
+                "queue_depth": self.recorder.queue_depth,
+                "shipped": self.recorder.shipped,
+                "dropped": self.recorder.dropped,
+            },
+            "circuit_policy": self.policy.breaker.stats(),
+            "circuit_flight_recorder": self.recorder.breaker.stats(),
+        }
+        # Geladene Befehle mit eigenen Statistiken (z. B. Wetter-Cache)
+        for name in self.commands.names():
+            stats = getattr(self.commands.peek(name), 'stats', None)
+            if callable(stats):
+                status[name.lower()] = stats()
+        return status
+
+    async def close(self) -> None:
+        """Gibt die vom Prozessor gehaltenen Ressourcen (Policy-Abgleich, Recorder, HTTP-Pool, Datei-Pool) frei."""
+        for instance in self.commands.loaded():
+            close = getattr(instance, 'close', None)
+            if close is not None:
+                try:
+                    res = close()
+                    if inspect.isawaitable(res):
+                        await res
+                except Exception as e:
+                    logging.error("Befehl konnte nicht sauber geschlossen werden: %s", e)
+        await self.policy.close()
+        await self.recorder.close()
+        await self.http.close()
+        await self.files.close()
 
     # Rückwärtskompatible Methode (frühere main-Versionen riefen ggf. execute auf)
     async def execute(self, command_name: str, value: str) -> Dict[str, str]:
         instance = self._find_command_case_insensitive(command_name.strip())
-        if instance:
-            try:
-                res = instance.execute(value)
-                if inspect.isawaitable(res):
-                    return await res
-                else:
-                    return res
-            except Exception as e:
-                return {"status": "error", "result": f"Fehler beim Ausführen des Befehls: {e}"}
-        else:
-            return {"status": "error", "result": f"Befehl '{command_name}' nicht gefunden."}
+        return await self._run(instance, value, command_name)
@@ -0,0 +1,436 @@
+"""Lazy Befehlsregistrierung für den CommandProcessor.
+
+Beim Start werden nur Namen und Beschreibungen der Befehle benötigt (für die
+Befehlssuche und ``Hilfe``). Diese stehen in einem Manifest, das aus dem
+Quelltext von ``commands.py`` (per ``ast``, ohne Import) und den
+Plugin-Entry-Points der Gruppe ``cli_app.commands`` erzeugt und zwischen
+Starts gecacht wird. Modul und Klasse eines Befehls werden erst beim ersten
+Aufruf importiert und instanziiert.
+
+Ein Plugin registriert einen Befehl in seiner ``setup.py`` z. B. so::
+
+    entry_points={'cli_app.commands': ['Uebersetzen = mein_plugin:UebersetzenCommand']}
+"""
+import ast
+import difflib
+import importlib
+import importlib.util
+import inspect
+import json
+import logging
+import os
+import sys
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+ENTRY_POINT_GROUP = 'cli_app.commands'
+MANIFEST_VERSION = 2
+_BASE_CLASS = 'BaseCommand'
+_UMLAUTS = str.maketrans({'ä': 'ae', 'ö': 'oe', 'ü': 'ue'})
+
+
+def normalize_name(name: str) -> str:
+    """Normalisiert Befehlsnamen: casefold plus Umlaut-Faltung (``Löschen`` == ``loeschen``)."""
+    return name.strip().casefold().translate(_UMLAUTS)
+
+
+class PrefixTrie:
+    """Präfixbaum über normalisierte Befehlsnamen.
+
+    Jeder Knoten kennt die Anzahl der Namen darunter und einen davon, sodass
+    eine eindeutige Abkürzung in O(Länge des Präfixes) aufgelöst wird.
+    """
+
+    __slots__ = ('children', 'count', 'sample', 'terminal')
+
+    def __init__(self):
+        self.children: Dict[str, 'PrefixTrie'] = {}
+        self.count = 0
+        self.sample: Optional[str] = None
+        self.terminal = False
+
+    def insert(self, key: str) -> None:
+        node = self
+        node.count += 1
+        node.sample = key
+        for char in key:
+            node = node.children.setdefault(char, PrefixTrie())
+            node.count += 1
+            node.sample = key
+        node.terminal = True
+
+    def _node(self, prefix: str) -> Optional['PrefixTrie']:
+        node = self
+        for char in prefix:
+            node = node.children.get(char)
+            if node is None:
+                return None
+        return node
+
+    def unique(self, prefix: str) -> Optional[str]:
+        """Der einzige Name mit diesem Präfix, sonst ``None``."""
+        node = self._node(prefix)
+        return node.sample if node is not None and node.count == 1 else None
+
+    def complete(self, prefix: str) -> List[str]:
+        """Alle Namen mit diesem Präfix (sortiert)."""
+        node = self._node(prefix)
+        if node is None:
+            return []
+        found = []
+        stack = [(node, prefix)]
+        while stack:
+            current, path = stack.pop()
+            if current.terminal:
+                found.append(path)
+            for char, child in current.children.items():
+                stack.append((child, path + char))
+        return sorted(found)
+
+
+class CommandSpec:
+    """Beschreibt einen registrierten, noch nicht zwingend geladenen Befehl."""
+
+    __slots__ = ('name', 'module', 'class_name', 'attrs')
+
+    def __init__(self, name: str, module: str, class_name: str, attrs: Optional[Dict[str, Any]] = None):
+        self.name = name
+        self.module = module
+        self.class_name = class_name
+        self.attrs = attrs or {}
+
+    @property
+    def description(self) -> str:
+        return self.attrs.get('description') or "Keine Beschreibung verfügbar."
+
+    @property
+    def read_only(self) -> bool:
+        """Befehl ohne Seiteneffekte (Klassenattribut ``read_only``, Standard: nein)."""
+        return self.attrs.get('read_only') is True
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {"name": self.name, "module": self.module, "class": self.class_name, "attrs": self.attrs}
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> 'CommandSpec':
+        return cls(data['name'], data['module'], data['class'], data.get('attrs'))
+
+
+def _literal_class_attrs(node: ast.ClassDef) -> Dict[str, Any]:
+    attrs: Dict[str, Any] = {}
+    for stmt in node.body:
+        if isinstance(stmt, ast.Assign) and len(stmt.targets) == 1 and isinstance(stmt.targets[0], ast.Name):
+            target, value = stmt.targets[0].id, stmt.value
+        elif isinstance(stmt, ast.AnnAssign) and isinstance(stmt.target, ast.Name) and stmt.value is not None:
+            target, value = stmt.target.id, stmt.value
+        else:
+            continue
+        try:
+            attrs[target] = ast.literal_eval(value)
+        except ValueError:
+            continue
+    return attrs
+
+
+def scan_module_source(module_name: str, path: str) -> List[CommandSpec]:
+    """Findet Befehlsklassen in einer Quelldatei, ohne das Modul zu importieren.
+
+    Berücksichtigt werden Klassen mit ``Command``-Suffix (außer der Basisklasse),
+    die selbst oder über eine Basisklasse im selben Modul ``execute`` besitzen.
+    Literale Klassenattribute (z. B. ``description``) werden entlang der
+    Basisklassen im Modul vererbt.
+    """
+    with open(path, 'r', encoding='utf-8') as fp:
+        tree = ast.parse(fp.read(), filename=path)
+
+    classes: Dict[str, ast.ClassDef] = {n.name: n for n in tree.body if isinstance(n, ast.ClassDef)}
+
+    def resolve(name: str, seen=()) -> Dict[str, Any]:
+        node = classes.get(name)
+        if node is None or name in seen:
+            return {"__methods__": set()}
+        merged: Dict[str, Any] = {"__methods__": set()}
+        for base in node.bases:
+            if isinstance(base, ast.Name):
+                inherited = resolve(base.id, seen + (name,))
+                merged["__methods__"] |= inherited.pop("__methods__")
+                merged.update(inherited)
+        merged.update(_literal_class_attrs(node))
+        merged["__methods__"] |= {
+            n.name for n in node.body if isinstance(n, (ast.FunctionDef, ast.AsyncFunctionDef))
+        }
+        return merged
+
+    specs = []
+    for name in classes:
+        if not name.endswith('Command') or name == _BASE_CLASS:
+            continue
+        attrs = resolve(name)
+        if 'execute' not in attrs.pop("__methods__"):
+            continue
+        specs.append(CommandSpec(name[:-len('Command')], module_name, name, attrs))
+    return specs
+
+
+def _plugin_entry_points() -> List[Any]:
+    try:
+        from importlib.metadata import entry_points
+    except ImportError:
+        return []
+    try:
+        eps = entry_points()
+        if hasattr(eps, 'select'):
+            return list(eps.select(group=ENTRY_POINT_GROUP))
+        return list(eps.get(ENTRY_POINT_GROUP, []))
+    except Exception as exc:
+        logging.error("Plugin-Befehle konnten nicht ermittelt werden: %s", exc)
+        return []
+
+
+def _plugin_names(plugins: List[Any]) -> List[str]:
+    return sorted(f"{ep.name}={ep.value}" for ep in plugins)
+
+
+def _path_stamp() -> List[List[Any]]:
+    """Die mtimes der ``sys.path``-Verzeichnisse.
+
+    Ein installiertes oder entferntes Paket legt dort seine ``*.dist-info``
+    an bzw. löscht sie; solange sich keine mtime ändert, können sich auch die
+    Entry-Points nicht geändert haben.
+    """
+    stamp = []
+    for entry in sys.path:
+        try:
+            stamp.append([entry, os.stat(entry or os.curdir).st_mtime_ns])
+        except OSError:
+            continue
+    return stamp
+
+
+def _default_manifest_path() -> str:
+    base = os.environ.get('XDG_CACHE_HOME') or os.path.join(os.path.expanduser('~'), '.cache')
+    return os.path.join(base, 'cli-app', 'command_manifest.json')
+
+
+class CommandRegistry:
+    """Registry mit Manifest-Cache und Instanziierung beim ersten Zugriff.
+
+    ``resources`` sind die vom Prozessor geteilten Objekte (z. B. ``config``,
+    ``http``, ``files``); jeder Befehl bekommt davon, was sein Konstruktor
+    als Parameter nennt.
+    """
+
+    def __init__(self, resources: Dict[str, Any], module_name: str = 'commands',
+                 manifest_path: Optional[str] = None):
+        self.resources = resources
+        self.module_name = module_name
+        self.manifest_path = manifest_path or _default_manifest_path()
+        # Ein normalisierter Index statt mehrerer Schreibweisen pro Befehl
+        self._specs: Dict[str, CommandSpec] = {}
+        self._trie = PrefixTrie()
+        self._instances: Dict[str, Any] = {}
+        self._failed: Dict[str, str] = {}
+        for spec in self._load_manifest():
+            self._add(spec)
+
+    def _add(self, spec: CommandSpec) -> str:
+        key = normalize_name(spec.name)
+        if key not in self._specs:
+            self._trie.insert(key)
+        self._specs[key] = spec
+        return key
+
+    # Manifest
+
+    def _manifest_key(self, source: str) -> Dict[str, Any]:
+        st = os.stat(source)
+        return {
+            "version": MANIFEST_VERSION,
+            "source": source,
+            "mtime_ns": st.st_mtime_ns,
+            "size": st.st_size,
+        }
+
+    def _read_manifest(self) -> Dict[str, Any]:
+        try:
+            with open(self.manifest_path, 'r', encoding='utf-8') as fp:
+                cached = json.load(fp)
+            return cached if isinstance(cached, dict) else {}
+        except (OSError, ValueError):
+            return {}
+
+    def _write_manifest(self, manifest: Dict[str, Any]) -> None:
+        try:
+            os.makedirs(os.path.dirname(self.manifest_path), exist_ok=True)
+            tmp_path = self.manifest_path + '.tmp'
+            with open(tmp_path, 'w', encoding='utf-8') as fp:
+                json.dump(manifest, fp)
+            os.replace(tmp_path, self.manifest_path)
+        except OSError as exc:
+            logging.debug("Befehlsmanifest konnte nicht gespeichert werden: %s", exc)
+
+    def _load_manifest(self) -> List[CommandSpec]:
+        spec = importlib.util.find_spec(self.module_name)
+        source = spec.origin if spec is not None else None
+        if not source or not source.endswith('.py'):
+            # Kein Quelltext verfügbar: Modul importieren und Klassen direkt prüfen
+            return self._scan_imported_module()
+
+        key = self._manifest_key(source)
+        paths = _path_stamp()
+        cached = self._read_manifest()
+        plugins = None
+        if cached.get('key') == key:
+            if cached.get('paths') != paths:
+                # Seit dem letzten Start wurde etwas installiert oder entfernt: nur dann die
+                # Distributionen nach Entry-Points durchsuchen
+                plugins = _plugin_entry_points()
+            if plugins is None or cached.get('plugins') == _plugin_names(plugins):
+                try:
+                    specs = [CommandSpec.from_dict(d) for d in cached['commands']]
+                except (KeyError, TypeError):
+                    pass
+                else:
+                    if plugins is not None:
+                        self._write_manifest(dict(cached, paths=paths))
+                    return specs
+
+        if plugins is None:
+            plugins = _plugin_entry_points()
+        specs = scan_module_source(self.module_name, source) + self._plugin_specs(plugins)
+        self._write_manifest({"key": key, "plugins": _plugin_names(plugins), "paths": paths,
+                              "commands": [s.to_dict() for s in specs]})
+        return specs
+
+    def _scan_imported_module(self) -> List[CommandSpec]:
+        module = importlib.import_module(self.module_name)
+        specs = []
+        for name, obj in inspect.getmembers(module, inspect.isclass):
+            if name.endswith('Command') and name != _BASE_CLASS and hasattr(obj, 'execute'):
+                attrs = {k: v for k, v in vars(obj).items() if not k.startswith('_') and isinstance(v, (str, bool, int, float))}
+                attrs.setdefault('description', getattr(obj, 'description', None))
+                specs.append(CommandSpec(name[:-len('Command')], self.module_name, name, attrs))
+        return specs
+
+    @staticmethod
+    def _plugin_specs(plugins: List[Any]) -> List[CommandSpec]:
+        specs = []
+        for ep in plugins:
+            module, _, attr = ep.value.partition(':')
+            attrs: Dict[str, Any] = {}
+            try:
+                # Nur beim Neuaufbau des Manifests: Beschreibung des Plugins ermitteln
+                cls = ep.load()
+                attrs = {k: v for k, v in vars(cls).items()
+                         if not k.startswith('_') and isinstance(v, (str, bool, int, float))}
+                attrs.setdefault('description', getattr(cls, 'description', None))
+            except Exception as exc:
+                logging.error("Plugin-Befehl '%s' konnte nicht geladen werden: %s", ep.name, exc)
+                continue
+            specs.append(CommandSpec(ep.name, module, attr, attrs))
+        return specs
+
+    # Zugriff
+
+    def __contains__(self, name: str) -> bool:
+        return normalize_name(name) in self._specs
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._specs)
+
+    def __len__(self) -> int:
+        return len(self._specs)
+
+    def names(self) -> List[str]:
+        return [spec.name for spec in self._specs.values()]
+
+    def specs(self) -> Dict[str, CommandSpec]:
+        """Anzeigename -> Spezifikation aller registrierten Befehle."""
+        return {spec.name: spec for spec in self._specs.values()}
+
+    def resolve(self, name: str) -> Optional[str]:
+        """Normalisierter Schlüssel für einen Namen oder eine eindeutige Abkürzung."""
+        if name in self._specs:
+            # Schon ein Schlüssel (die Normalisierung ist idempotent)
+            return name
+        key = normalize_name(name)
+        if not key:
+            return None
+        if key in self._specs:
+            return key
+        return self._trie.unique(key)
+
+    def spec(self, name: str) -> Optional[CommandSpec]:
+        key = self.resolve(name)
+        return self._specs.get(key) if key is not None else None
+
+    def complete(self, prefix: str) -> List[str]:
+        """Anzeigenamen aller Befehle, die mit ``prefix`` beginnen (für Tab-Vervollständigung)."""
+        return [self._specs[key].name for key in self._trie.complete(normalize_name(prefix))]
+
+    def suggestions(self, name: str, limit: int = 3) -> Tuple[List[str], bool]:
+        """Vorschläge für einen nicht auflösbaren Namen.
+
+        Gibt ``(namen, mehrdeutig)`` zurück: bei einer mehrdeutigen Abkürzung
+        alle passenden Befehle, sonst ähnlich geschriebene ("Meinten Sie ...").
+        """
+        key = normalize_name(name)
+        if not key:
+            return [], False
+        candidates = self._trie.complete(key)
+        if len(candidates) > 1:
+            return [self._specs[k].name for k in candidates], True
+        close = difflib.get_close_matches(key, list(self._specs), n=limit, cutoff=0.6)
+        return [self._specs[k].name for k in close], False
+
+    def register(self, name: str, instance: Any) -> None:
+        """Registriert eine bereits erzeugte Befehlsinstanz (z. B. Fallback-Hilfe)."""
+        attrs = {"description": getattr(instance, 'description', None),
+                 "read_only": getattr(instance, 'read_only', False) is True}
+        key = self._add(CommandSpec(name, type(instance).__module__, type(instance).__name__, attrs))
+        self._instances[key] = instance
+
+    def get(self, name: str) -> Optional[Any]:
+        """Liefert die Befehlsinstanz; importiert und instanziiert sie beim ersten Zugriff."""
+        key = self.resolve(name)
+        if key is None:
+            return None
+        instance = self._instances.get(key)
+        if instance is not None:
+            return instance
+        spec = self._specs[key]
+        if key in self._failed:
+            return None
+        try:
+            instance = self._instantiate(spec)
+        except Exception as exc:
+            # Wie bisher: nicht instanziierbare Befehle gelten als nicht vorhanden
+            logging.error("Befehl '%s' konnte nicht geladen werden: %s", spec.name, exc)
+            self._failed[key] = str(exc)
+            return None
+        self._instances[key] = instance
+        return instance
+
+    def _instantiate(self, spec: CommandSpec) -> Any:
+        module = sys.modules.get(spec.module) or importlib.import_module(spec.module)
+        cls = getattr(module, spec.class_name)
+        params = inspect.signature(cls.__init__).parameters
+        kwargs = {name: value for name, value in self.resources.items() if name in params}
+        # Hilfe bekommt die Spezifikationen aller Befehle (Beschreibungen ohne Import)
+        for name in ('all_commands', 'commands'):
+            if name in params:
+                kwargs[name] = self.specs()
+        return cls(**kwargs)
+
+    def peek(self, name: str) -> Optional[Any]:
+        """Die Befehlsinstanz, falls bereits geladen (ohne sie zu laden)."""
+        key = self.resolve(name)
+        return self._instances.get(key) if key is not None else None
+
+    def loaded(self) -> List[Any]:
+        """Alle bisher instanziierten Befehle."""
+        return list(self._instances.values())
+
+    def load_all(self) -> None:
+        """Instanziiert alle Befehle sofort (z. B. für Vergleichsmessungen)."""
+        for key in list(self._specs):
+            self.get(key)
@@ -1,41 +1,105 @@
 import abc
+import asyncio
+import functools
+import hashlib
 import os
-import requests
-import aiohttp
+import re
+import stat
+import time
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
-from typing import Dict, List, Type, Optional
+from typing import Any, AsyncIterator, Callable, Dict, Hashable, Type, Optional
+import expression_engine
+import file_ops
+import pipeline
+import text_analysis
+from cache import RefreshingCache
 from config import Configuration
+from http_client import HttpClient
+
+DEFAULT_OPENWEATHERMAP_URL = "https://api.openweathermap.org/data/2.5/weather"
+
+
+def argument_key(value: str) -> bytes:
+    """Kurzer, fester Schlüssel für beliebig lange Argumente (z. B. ganze Texte für Analyse)."""
+    return hashlib.blake2b(value.encode('utf-8', 'surrogatepass'), digest_size=16).digest()
+
+
+def file_key(path: str, value: str) -> Optional[Hashable]:
+    """Schlüssel für Ergebnisse über eine Datei: ändert sich mit Pfad, Änderungszeit und Größe."""
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return os.path.abspath(path), st.st_mtime_ns, st.st_size, argument_key(value)
 
 class BaseCommand(abc.ABC):
     """Abstrakte Basisklasse für alle Befehle."""
     description: str = "Keine Beschreibung verfügbar."
+    # Ohne Seiteneffekte (keine Schreibzugriffe, keine Aufrufe nach außen): darf schon während
+    # des Policy-Checks laufen; das Ergebnis wird erst nach der Freigabe ausgeliefert
+    read_only: bool = False
+    # Ergebnis hängt nur von cache_key() ab: der Prozessor darf es cachen und
+    # gleichzeitige identische Aufrufe zusammenlegen
+    pure: bool = False
+    # Lebensdauer gecachter Ergebnisse in Sekunden (None = [Processor] result_cache_ttl)
+    cache_ttl: Optional[float] = None
+    # Kann in einer Pipeline die Ausgabe der vorherigen Stufe verarbeiten (stream() mit source)
+    accepts_input: bool = False
 
-    def __init__(self, config: Optional[Configuration] = None):
+    def __init__(self, config: Optional[Configuration] = None, http: Optional[HttpClient] = None,
+                 files: Optional[file_ops.FileOps] = None):
         self._config = config
+        # Ohne Prozessor (z. B. direkte Instanziierung) bekommt der Befehl eigene Pools
+        self._http = http if http is not None else HttpClient(config)
+        self._files = files if files is not None else file_ops.FileOps(config)
 
     @abc.abstractmethod
     async def execute(self, value: str) -> Dict[str, str]:
         """Führt den Befehl aus."""
         pass
 
+    async def close(self) -> None:
+        """Gibt vom Befehl selbst gehaltene Ressourcen frei (Standard: keine)."""
+        pass
+
+    def cache_key(self, value: str) -> Optional[Hashable]:
+        """Schlüssel für den Ergebnis-Cache (nur bei ``pure``); None = dieses Ergebnis nicht cachen."""
+        return argument_key(value)
+
+    async def stream(self, value: str, source: Optional[AsyncIterator[str]] = None) -> AsyncIterator[str]:
+        """Liefert die Ausgabe als Pipeline-Stufe abschnittsweise (Standard: das Ergebnis von ``execute``).
+
+        ``source`` sind die Abschnitte der vorherigen Stufe; nur Befehle mit
+        ``accepts_input`` bekommen eine. Fehler werden als ``PipelineError`` gemeldet.
+        """
+        result = await self.execute(value)
+        if result.get('status') != 'success':
+            raise pipeline.PipelineError(result.get('result', 'Unbekannter Fehler'))
+        yield result.get('result', '')
+
 class HilfeCommand(BaseCommand):
     """Ein Befehl zur Anzeige der Hilfe."""
     description = "Zeigt diese Hilfe an. Format: Hilfe"
+    read_only = True
 
-    def __init__(self, all_commands: Dict[str, Type['BaseCommand']], config: Optional[Configuration] = None):
-        super().__init__(config)
-        self.all_commands = all_commands
+    def __init__(self, config: Optional[Configuration] = None, http: Optional[HttpClient] = None,
+                 files: Optional[file_ops.FileOps] = None,
+                 all_commands: Optional[Dict[str, Type['BaseCommand']]] = None):
+        super().__init__(config, http, files)
+        self.all_commands = all_commands or {}
 
     async def execute(self, value: str) -> Dict[str, str]:
         output = ["Verfügbare Befehle:"]
         for name, cmd_class in sorted(self.all_commands.items()):
             output.append(f"- {name}: {cmd_class.description}")
+        output.append("- status: Zeigt Laufzeitstatistiken an.")
         output.append("- exit: Beendet die Anwendung.")
         return {"status": "success", "result": "\n".join(output)}
 
 class SpeichernCommand(BaseCommand):
     """Ein Befehl zum Speichern von Text in einer Datei."""
-    description = "Speichert Text in einer Datei. Format: Speichern:<dateiname>:<inhalt>"
+    description = "Speichert Text atomar in einer Datei. Format: Speichern:<dateiname>:<inhalt>"
 
     async def execute(self, value: str) -> Dict[str, str]:
         parts = value.split(':', 1)
@@ -43,112 +107,391 @@ class SpeichernCommand(BaseCommand):
             return {"status": "error", "result": "Fehler: Dateiname und Inhalt erforderlich."}
         filename, content = parts
         try:
-            with open(filename, 'w') as f:
-                f.write(content)
+            await self._files.save(filename, content)
             return {"status": "success", "result": f"Datei '{filename}' erfolgreich gespeichert."}
-        except IOError as e:
+        except OSError as e:
             return {"status": "error", "result": f"Fehler beim Speichern der Datei: {e}"}
 
+class AnhängenCommand(BaseCommand):
+    """Ein Befehl zum Anhängen von Text an eine Datei."""
+    description = "Hängt Text an eine Datei an (legt sie bei Bedarf an). Format: Anhängen:<dateiname>:<inhalt>"
+
+    async def execute(self, value: str) -> Dict[str, str]:
+        parts = value.split(':', 1)
+        if len(parts) < 2:
+            return {"status": "error", "result": "Fehler: Dateiname und Inhalt erforderlich."}
+        filename, content = parts
+        try:
+            await self._files.append(filename, content)
+            return {"status": "success", "result": f"Text an Datei '{filename}' angehängt."}
+        except OSError as e:
+            return {"status": "error", "result": f"Fehler beim Anhängen an die Datei: {e}"}
+
 class LesenCommand(BaseCommand):
     """Ein Befehl zum Lesen einer Datei."""
-    description = "Liest eine Datei. Format: Lesen:<dateiname>"
+    description = (
+        "Liest eine Datei oder einen Ausschnitt. Format: Lesen:<dateiname>[:<optionen>] "
+        "mit Optionen head=N, tail=N, lines=A-B, bytes=A-B, grep=REGEX, max=N (getrennt durch ';')"
+    )
+    read_only = True
+    pure = True
+
+    def cache_key(self, value: str) -> Optional[Hashable]:
+        return file_key(file_ops.split_read_spec(value)[0], value) if value else None
 
     async def execute(self, value: str) -> Dict[str, str]:
         if not value:
             return {"status": "error", "result": "Fehler: Dateiname erforderlich."}
+        filename, options = file_ops.split_read_spec(value)
+        max_bytes = getattr(self._config, 'lesen_max_bytes', 1024 * 1024)
         try:
-            with open(value, 'r') as f:
-                content = f.read()
-            return {"status": "success", "result": content}
+            content, truncated_at = await self._files.run(file_ops.read_file, filename, options, max_bytes)
         except FileNotFoundError:
             return {"status": "error", "result": "Fehler: Datei nicht gefunden."}
-        except IOError as e:
+        except (ValueError, re.error) as e:
+            return {"status": "error", "result": f"Fehler: Ungültige Leseoption: {e}"}
+        except (IOError, OSError) as e:
             return {"status": "error", "result": f"Fehler beim Lesen der Datei: {e}"}
+        if truncated_at is not None:
+            content += f"\n[... Ausgabe auf {truncated_at} Bytes gekürzt]"
+        return {"status": "success", "result": content}
+
+    async def stream(self, value: str, source: Optional[AsyncIterator[str]] = None) -> AsyncIterator[str]:
+        filename, options = file_ops.split_read_spec(value)
+        if not filename or options:
+            # Ausschnitte (head, tail, grep, ...) sind ohnehin begrenzt
+            async for chunk in super().stream(value, source):
+                yield chunk
+            return
+        try:
+            fp = await self._files.run(functools.partial(open, filename, 'r', encoding='utf-8', errors='replace'))
+        except FileNotFoundError:
+            raise pipeline.PipelineError("Fehler: Datei nicht gefunden.")
+        except OSError as e:
+            raise pipeline.PipelineError(f"Fehler beim Lesen der Datei: {e}")
+        try:
+            while True:
+                chunk = await self._files.run(pipeline.read_block, fp)
+                if chunk is None:
+                    break
+                yield chunk
+        finally:
+            fp.close()
+
+class FilternCommand(BaseCommand):
+    """Ein Pipeline-Befehl, der nur die Zeilen durchlässt, die auf einen regulären Ausdruck passen."""
+    description = "Filtert die Zeilen der vorherigen Pipeline-Stufe per Regex. Format: <befehl> | Filtern:<regex>"
+    read_only = True
+    accepts_input = True
+
+    async def execute(self, value: str) -> Dict[str, str]:
+        return {"status": "error", "result": "Fehler: Filtern erwartet eine Eingabe, z. B. Lesen:app.log | Filtern:ERROR"}
+
+    async def stream(self, value: str, source: Optional[AsyncIterator[str]] = None) -> AsyncIterator[str]:
+        if source is None:
+            raise pipeline.PipelineError((await self.execute(value))['result'])
+        try:
+            pattern = re.compile(value)
+        except re.error as e:
+            raise pipeline.PipelineError(f"Fehler: Ungültiger regulärer Ausdruck: {e}")
+        async for lines in pipeline.line_blocks(source):
+            matched = [line for line in lines if pattern.search(line)]
+            if matched:
+                yield ''.join(matched)
 
 class LöschenCommand(BaseCommand):
-    """Ein Befehl zum Löschen einer Datei."""
-    description = "Löscht eine Datei. Format: Löschen:<dateiname>"
+    """Ein Befehl zum Löschen von Dateien."""
+    description = "Löscht Dateien, auch per Glob-Muster. Format: Löschen:<dateiname|muster>[,<dateiname|muster>...]"
 
     async def execute(self, value: str) -> Dict[str, str]:
-        if not value:
+        patterns = [p.strip() for p in value.split(',') if p.strip()]
+        if not patterns:
             return {"status": "error", "result": "Fehler: Dateiname erforderlich."}
         try:
-            os.remove(value)
-            return {"status": "success", "result": f"Datei '{value}' erfolgreich gelöscht."}
-        except FileNotFoundError:
-            return {"status": "error", "result": "Fehler: Datei nicht gefunden."}
+            deleted, missing, errors = await self._files.delete_many(patterns)
         except OSError as e:
             return {"status": "error", "result": f"Fehler beim Löschen der Datei: {e}"}
 
+        # Einzelne Datei ohne Muster: bisherige Meldungen beibehalten
+        if len(patterns) == 1 and len(deleted) + len(missing) + len(errors) == 1:
+            if deleted:
+                return {"status": "success", "result": f"Datei '{deleted[0]}' erfolgreich gelöscht."}
+            if missing:
+                return {"status": "error", "result": "Fehler: Datei nicht gefunden."}
+            return {"status": "error", "result": f"Fehler beim Löschen der Datei: {errors[0][1]}"}
+
+        lines = [f"{len(deleted)} Datei(en) gelöscht."]
+        if missing:
+            lines.append(f"Nicht gefunden: {', '.join(missing)}")
+        for path, message in errors:
+            lines.append(f"Fehler bei '{path}': {message}")
+        status = "success" if deleted and not errors else "error"
+        return {"status": status, "result": "\n".join(lines)}
+
 class AnalyseCommand(BaseCommand):
-    """Ein Befehl zur Analyse eines Textes."""
-    description = "Analysiert einen Text. Format: Analyse:<text>"
+    """Ein Befehl zur Analyse eines Textes, einer Datei oder eines Verzeichnisses."""
+    description = (
+        "Analysiert einen Text oder eine Datei/ein Verzeichnis. "
+        "Format: Analyse:<text> oder Analyse:<pfad>[:top=N;ngram=N;nlp=1] oder <befehl> | Analyse[:top=N]"
+    )
+    read_only = True
+    pure = True
+    accepts_input = True
+
+    def __init__(self, config: Optional[Configuration] = None, http: Optional[HttpClient] = None,
+                 files: Optional[file_ops.FileOps] = None):
+        super().__init__(config, http, files)
+        self._analyzer = text_analysis.TextAnalyzer(config)
+
+    def cache_key(self, value: str) -> Optional[Hashable]:
+        target = file_ops.split_spec(value, text_analysis.ANALYSE_OPTIONS)[0]
+        # Ein einziges stat: für reinen Text (der häufigste Fall) schlägt es fehl
+        try:
+            st = os.stat(target)
+        except (OSError, ValueError):
+            return argument_key(value)
+        if stat.S_ISDIR(st.st_mode):
+            # Änderungen in Unterverzeichnissen sind an der Verzeichnis-mtime nicht zu erkennen
+            return None
+        return os.path.abspath(target), st.st_mtime_ns, st.st_size, argument_key(value)
 
     async def execute(self, value: str) -> Dict[str, str]:
         if not value:
             return {"status": "error", "result": "Fehler: Kein Text zur Analyse angegeben."}
-        word_count = len(value.split())
-        char_count = len(value)
-        return {"status": "success", "result": f"Analyse: {word_count} Wörter, {char_count} Zeichen."}
+
+        target, options = file_ops.split_spec(value, text_analysis.ANALYSE_OPTIONS)
+        if not os.path.exists(target):
+            word_count = len(value.split())
+            char_count = len(value)
+            return {"status": "success", "result": f"Analyse: {word_count} Wörter, {char_count} Zeichen."}
+
+        try:
+            top = int(options.get('top', 10))
+            ngram = int(options.get('ngram', 1))
+        except ValueError as e:
+            return {"status": "error", "result": f"Fehler: Ungültige Analyseoption: {e}"}
+        try:
+            summary = await self._analyzer.analyse_path(target, top=top, ngram=ngram)
+        except OSError as e:
+            return {"status": "error", "result": f"Fehler beim Lesen für die Analyse: {e}"}
+
+        lines = [f"Analyse: {summary['words']} Wörter, {summary['chars']} Zeichen in {summary['files']} Datei(en)."]
+        if summary['top_terms']:
+            lines.append("Häufigste Begriffe: " + ", ".join(f"{t} ({n})" for t, n in summary['top_terms']))
+        if summary['top_ngrams']:
+            lines.append(f"Häufigste {ngram}-Gramme: " + ", ".join(f"{t} ({n})" for t, n in summary['top_ngrams']))
+
+        if options.get('nlp', '0') not in ('', '0'):
+            try:
+                ling = await self._analyzer.linguistic(summary['paths'], top)
+            except ImportError:
+                return {"status": "error", "result": "Fehler: spaCy ist nicht installiert."}
+            except OSError as e:
+                return {"status": "error", "result": f"Fehler: spaCy-Modell nicht verfügbar: {e}"}
+            lines.append("Wortarten: " + ", ".join(f"{t} ({n})" for t, n in ling['pos']))
+            if ling['entities']:
+                lines.append("Entitäten: " + ", ".join(f"{t} ({n})" for t, n in ling['entities']))
+
+        return {"status": "success", "result": "\n".join(lines)}
+
+    async def stream(self, value: str, source: Optional[AsyncIterator[str]] = None) -> AsyncIterator[str]:
+        if source is None:
+            async for chunk in super().stream(value, source):
+                yield chunk
+            return
+        # In der Pipeline sind nur Optionen erlaubt, z. B. "... | Analyse:top=5"
+        try:
+            options = dict(part.split('=', 1) for part in value.split(';') if part.strip())
+            top = int(options.get('top', 10))
+        except ValueError as e:
+            raise pipeline.PipelineError(f"Fehler: Ungültige Analyseoption: {e}")
+        counter = text_analysis.TermCounter()
+        async for lines in pipeline.line_blocks(source):
+            counter.update(''.join(lines))
+        result = f"Analyse: {counter.words} Wörter, {counter.chars} Zeichen."
+        if counter.terms:
+            result += "\nHäufigste Begriffe: " + ", ".join(f"{t} ({n})" for t, n in counter.terms.most_common(top))
+        yield result
+
+    async def close(self) -> None:
+        self._analyzer.close()
 
 class NetzwerkCommand(BaseCommand):
-    """Ein Befehl zur Simulation einer Netzwerkanfrage."""
-    description = "Simuliert eine Netzwerkanfrage. Format: Netzwerk:<url>"
+    """Ein Befehl für HTTP-GET-Anfragen an eine oder mehrere URLs."""
+    description = "Fragt eine oder mehrere URLs ab (Status, Bytes, Latenz). Format: Netzwerk:<url>[,<url>...]"
+
+    async def _probe(self, url: str, limiter: asyncio.Semaphore) -> Dict[str, Any]:
+        import aiohttp
+
+        async with limiter:
+            started = time.perf_counter()
+            try:
+                async with self._http.get(url) as response:
+                    size = 0
+                    # Body nur zählen, nicht im Speicher halten
+                    async for chunk in response.content.iter_chunked(65536):
+                        size += len(chunk)
+                    return {
+                        "url": url,
+                        "status": response.status,
+                        "bytes": size,
+                        "ms": (time.perf_counter() - started) * 1000,
+                    }
+            except asyncio.TimeoutError:
+                return {"url": url, "error": "Zeitüberschreitung"}
+            except (aiohttp.ClientError, ValueError) as e:
+                return {"url": url, "error": str(e) or e.__class__.__name__}
 
     async def execute(self, value: str) -> Dict[str, str]:
-        if not value:
+        urls = [u for u in re.split(r'[\s,]+', value.strip()) if u]
+        if not urls:
             return {"status": "error", "result": "Fehler: URL erforderlich."}
-        try:
-            response = requests.get(value, timeout=5)
-            return {"status": "success", "result": f"Antwort von {value}: Status {response.status_code}"}
-        except requests.RequestException as e:
-            return {"status": "error", "result": f"Netzwerkfehler: {e}"}
+
+        limiter = asyncio.Semaphore(getattr(self._config, 'netzwerk_concurrency', 10))
+        probes = await asyncio.gather(*(self._probe(url, limiter) for url in urls))
+
+        lines = []
+        for probe in probes:
+            if "error" in probe:
+                lines.append(f"Netzwerkfehler bei {probe['url']}: {probe['error']}")
+            else:
+                lines.append(
+                    f"Antwort von {probe['url']}: Status {probe['status']}, "
+                    f"{probe['bytes']} Bytes, {probe['ms']:.0f} ms"
+                )
+
+        ok = sum(1 for p in probes if "error" not in p)
+        if len(urls) > 1:
+            lines.insert(0, f"Netzwerk: {ok}/{len(urls)} URLs erreichbar")
+        if ok == 0:
+            return {"status": "error", "result": "\n".join(lines)}
+        return {"status": "success", "result": "\n".join(lines)}
 
 class RechnerCommand(BaseCommand):
-    """Ein Befehl zur Auswertung eines einfachen mathematischen Ausdrucks."""
-    description = "Wertet einen mathematischen Ausdruck aus. Format: Rechner:<ausdruck>"
+    """Ein Befehl zur Auswertung mathematischer Ausdrücke.
+
+    Ausdrücke laufen über die ``expression_engine`` (AST-Whitelist, Cache
+    kompilierter Ausdrücke). Mit Wertebereichen wird der Ausdruck vektorisiert
+    über alle Punkte ausgewertet und zusammengefasst.
+    """
+    description = ("Wertet einen mathematischen Ausdruck aus. "
+                   "Format: Rechner:<ausdruck>[; <var>=<wert>|<von>..<bis>[:<schritt>]|[<a>,<b>,...]]")
+    read_only = True
+    pure = True
+
+    def __init__(self, config: Optional[Configuration] = None, http: Optional[HttpClient] = None,
+                 files: Optional[file_ops.FileOps] = None):
+        super().__init__(config, http, files)
+        self.engine = expression_engine.ExpressionEngine(cache_size=getattr(config, 'rechner_cache_size', 256))
+        self.max_points = getattr(config, 'rechner_max_points', 10_000_000)
+        self.timeout = getattr(config, 'rechner_timeout', 5.0)
+        self.workers = getattr(config, 'rechner_workers', 2)
+        self._executor: Optional[ThreadPoolExecutor] = None
+
+    async def _run(self, func: Callable[..., Any], *args: Any) -> Any:
+        # Jede Auswertung läuft in einem kleinen eigenen Pool, nie auf der Event-Loop. Die Frist
+        # geht an den Auswerter, der sich daran hält; wait_for allein hielte den Thread nicht an.
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='rechner')
+        deadline = time.monotonic() + self.timeout
+        future = asyncio.get_running_loop().run_in_executor(self._executor, func, *args, deadline)
+        return await asyncio.wait_for(future, self.timeout)
 
     async def execute(self, value: str) -> Dict[str, str]:
-        if not value:
+        if not value or not value.strip():
             return {"status": "error", "result": "Fehler: Kein Ausdruck angegeben."}
         try:
-            result = eval(value, {"__builtins__": {}}, {})
-            return {"status": "success", "result": f"Ergebnis: {result}"}
+            source, scalars, columns = expression_engine.parse_request(value, self.max_points)
+            compiled = self.engine.compile(source)
+            if not columns:
+                result = await self._run(compiled.evaluate, scalars)
+                return {"status": "success", "result": f"Ergebnis: {result}"}
+            values = await self._run(compiled.evaluate_many, columns, scalars, True)
+            return {"status": "success", "result": f"Ergebnis: {expression_engine.summarize(values)}"}
+        except (asyncio.TimeoutError, expression_engine.EvaluationTimeout):
+            return {"status": "error", "result": f"Fehler bei der Auswertung: Zeitlimit von {self.timeout:g} s überschritten"}
         except Exception as e:
             return {"status": "error", "result": f"Fehler bei der Auswertung: {e}"}
 
+    async def close(self) -> None:
+        executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=False)
+
+    def stats(self) -> Dict[str, Any]:
+        return self.engine.stats()
+
 class WetterCommand(BaseCommand):
-    """Ruft das aktuelle Wetter für eine Stadt ab."""
-    description = "Ruft das Wetter für eine Stadt ab. Format: Wetter:<stadt>"
+    """Ruft das aktuelle Wetter für eine oder mehrere Städte ab.
+
+    Antworten werden pro Stadt zwischengespeichert (``[Wetter] cache_ttl``),
+    danach noch ``stale_ttl`` Sekunden ausgeliefert und dabei im Hintergrund
+    erneuert. Gleichzeitige Anfragen für dieselbe Stadt teilen sich einen
+    API-Aufruf.
+    """
+    description = "Ruft das Wetter für eine Stadt ab. Format: Wetter:<stadt>[,<stadt>...]"
+
+    def __init__(self, config: Optional[Configuration] = None, http: Optional[HttpClient] = None,
+                 files: Optional[file_ops.FileOps] = None):
+        super().__init__(config, http, files)
+        self.api_url = getattr(config, 'openweathermap_url', None) or DEFAULT_OPENWEATHERMAP_URL
+        self.cache = RefreshingCache(
+            max_size=getattr(config, 'wetter_cache_size', 256),
+            ttl=getattr(config, 'wetter_cache_ttl', 600.0),
+            stale_ttl=getattr(config, 'wetter_stale_ttl', 1800.0),
+            cacheable=lambda result: result["status"] == "success",
+        )
+
+    async def _fetch(self, city: str, api_key: str) -> Dict[str, str]:
+        import aiohttp
+
+        params = {"q": city, "appid": api_key, "units": "metric", "lang": "de"}
+        try:
+            async with self._http.get(self.api_url, params=params) as response:
+                data = await response.json()
+                if response.status == 200:
+                    weather = data['weather'][0]['description']
+                    temp = data['main']['temp']
+                    return {"status": "success", "result": f"Wetter in {city.capitalize()}: {weather}, Temperatur: {temp}°C"}
+                return {"status": "error", "result": f"Fehler beim Abrufen der Wetterdaten: {data.get('message', 'Unbekannter Fehler')}"}
+        except aiohttp.ClientError as e:
+            return {"status": "error", "result": f"Netzwerkfehler: {e}"}
+        except asyncio.TimeoutError:
+            return {"status": "error", "result": "Netzwerkfehler: Zeitüberschreitung"}
 
     async def execute(self, value: str) -> Dict[str, str]:
-        if not value:
+        cities = [c.strip() for c in value.split(',') if c.strip()]
+        if not cities:
             return {"status": "error", "result": "Fehler: Stadt erforderlich."}
-        
+
         if not self._config or not self._config.openweathermap_key or self._config.openweathermap_key == 'IHR_API_SCHLUESSEL_HIER':
             return {"status": "error", "result": "Fehler: OpenWeatherMap API-Schlüssel nicht in config.ini konfiguriert."}
 
-        city = value.strip()
         api_key = self._config.openweathermap_key
-        url = f"http://api.openweathermap.org/data/2.5/weather?q={city}&appid={api_key}&units=metric&lang=de"
+        if len(cities) == 1:
+            # Der Normalfall: ohne gather, damit ein Cache-Treffer nicht erst einen Task über die Event-Loop schickt
+            return await self.cache.get(cities[0].casefold(), lambda: self._fetch(cities[0], api_key))
 
-        try:
-            async with aiohttp.ClientSession() as session:
-                async with session.get(url) as response:
-                    if response.status == 200:
-                        data = await response.json()
-                        weather = data['weather'][0]['description']
-                        temp = data['main']['temp']
-                        return {"status": "success", "result": f"Wetter in {city.capitalize()}: {weather}, Temperatur: {temp}°C"}
-                    else:
-                        data = await response.json()
-                        return {"status": "error", "result": f"Fehler beim Abrufen der Wetterdaten: {data.get('message', 'Unbekannter Fehler')}"}
-        except aiohttp.ClientError as e:
-            return {"status": "error", "result": f"Netzwerkfehler: {e}"}
+        # Doppelte Städte nur einmal abfragen, Reihenfolge beibehalten
+        unique = list(dict.fromkeys(c.casefold() for c in cities))
+        names = {c.casefold(): c for c in reversed(cities)}
+        fetched = await asyncio.gather(*(
+            self.cache.get(key, lambda key=key: self._fetch(names[key], api_key)) for key in unique
+        ))
+        results = dict(zip(unique, fetched))
+
+        ok = sum(1 for r in fetched if r["status"] == "success")
+        lines = [f"Wetter: {ok}/{len(unique)} Städte abgerufen"]
+        lines.extend(results[key]["result"] for key in unique)
+        return {"status": "success" if ok else "error", "result": "\n".join(lines)}
+
+    def stats(self) -> Dict[str, Any]:
+        return self.cache.stats()
 
 class ZeitCommand(BaseCommand):
     """Gibt die aktuelle Datum-/Uhrzeitinformation zurück."""
     description = "Zeigt die aktuelle Zeit an. Format: Zeit"
+    read_only = True
 
     async def execute(self, value: str) -> Dict[str, str]:
         now = datetime.now()
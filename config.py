@@ -11,5 +11,91 @@ class Configuration:
         self.log_level = logging.INFO
 
         self.openweathermap_key = parser.get('API', 'openweathermap_key', fallback=None)
+        self.openweathermap_url = parser.get('API', 'openweathermap_url', fallback=None)
         self.policy_url = parser.get('Policy', 'url', fallback=None)
+        self.policy_cache_size = parser.getint('Policy', 'cache_size', fallback=1024)
+        self.policy_cache_ttl = parser.getfloat('Policy', 'cache_ttl', fallback=30.0)
+        # remote | embedded | hybrid (siehe policy_client.py)
+        self.policy_mode = parser.get('Policy', 'mode', fallback='remote')
+        self.policy_rules_file = parser.get('Policy', 'rules_file', fallback=None)
+        self.policy_rules_url = parser.get('Policy', 'rules_url', fallback=None)
+        self.policy_sync_interval = parser.getfloat('Policy', 'sync_interval', fallback=30.0)
+        # Verhalten bei nicht erreichbarem Policy-Service: open (ausführen) | closed (ablehnen)
+        self.policy_fail_mode = parser.get('Policy', 'fail_mode', fallback='closed')
+        self.policy_fail_mode_read_only = parser.get('Policy', 'fail_mode_read_only', fallback='closed')
+        self.policy_health_url = parser.get('Policy', 'health_url', fallback=None)
         self.flight_recorder_url = parser.get('FlightRecorder', 'url', fallback=None)
+        self.flight_recorder_batch_url = parser.get('FlightRecorder', 'batch_url', fallback=None)
+        self.flight_recorder_spool = parser.get('FlightRecorder', 'spool', fallback='flight_recorder.log')
+        self.flight_recorder_queue_size = parser.getint('FlightRecorder', 'queue_size', fallback=10000)
+        self.flight_recorder_batch_size = parser.getint('FlightRecorder', 'batch_size', fallback=500)
+        self.flight_recorder_flush_interval = parser.getfloat('FlightRecorder', 'flush_interval', fallback=1.0)
+        self.flight_recorder_health_url = parser.get('FlightRecorder', 'health_url', fallback=None)
+        # Vollständig übertragenen Spool leeren, sobald er diese Größe erreicht
+        self.flight_recorder_spool_compact_bytes = parser.getint('FlightRecorder', 'spool_compact_bytes',
+                                                                 fallback=64 * 1024 * 1024)
+
+        # Circuit-Breaker für Policy-Service und Flight-Recorder: öffnet nach failure_threshold
+        # Fehlern in Folge und prüft dann alle probe_interval Sekunden den /health-Endpunkt
+        self.circuit_failure_threshold = parser.getint('CircuitBreaker', 'failure_threshold', fallback=3)
+        self.circuit_probe_interval = parser.getfloat('CircuitBreaker', 'probe_interval', fallback=2.0)
+        self.circuit_probe_timeout = parser.getfloat('CircuitBreaker', 'probe_timeout', fallback=1.0)
+        self.circuit_reset_timeout = parser.getfloat('CircuitBreaker', 'reset_timeout', fallback=30.0)
+
+        # Maximale Anzahl gleichzeitig ausgeführter Befehle bei Batch-/Skript-Verarbeitung
+        self.processor_concurrency = parser.getint('Processor', 'concurrency', fallback=8)
+        # Cache-Datei für das Befehlsmanifest (Standard: ~/.cache/cli-app/command_manifest.json)
+        self.command_manifest = parser.get('Processor', 'manifest', fallback=None)
+        # Seiteneffektfreie Befehle (read_only) parallel zum Policy-Check ausführen
+        self.processor_speculative = parser.getboolean('Processor', 'speculative', fallback=True)
+        # Ergebnis-Cache für reine Befehle (pure): Anzahl, geschätzte Bytes und Lebensdauer in Sekunden
+        self.processor_result_cache_size = parser.getint('Processor', 'result_cache_size', fallback=1024)
+        self.processor_result_cache_max_bytes = parser.getint('Processor', 'result_cache_max_bytes',
+                                                              fallback=64 * 1024 * 1024)
+        self.processor_result_cache_ttl = parser.getfloat('Processor', 'result_cache_ttl', fallback=300.0)
+        # Pipelines: Abschnitte je Queue zwischen zwei Stufen, gesammelte Ausgabe außerhalb der REPL
+        self.processor_pipeline_buffer = parser.getint('Processor', 'pipeline_buffer', fallback=4)
+        self.processor_pipeline_max_output = parser.getint('Processor', 'pipeline_max_output', fallback=1024 * 1024)
+
+        # Obergrenze für die von 'Lesen' zurückgegebene Datenmenge
+        self.lesen_max_bytes = parser.getint('Lesen', 'max_bytes', fallback=1024 * 1024)
+
+        # Datei-Thread-Pool und fsync-Verhalten (always|batch|never) für Speichern/Anhängen
+        self.dateien_workers = parser.getint('Dateien', 'workers', fallback=4)
+        self.dateien_fsync = parser.get('Dateien', 'fsync', fallback='batch')
+        self.dateien_fsync_interval = parser.getfloat('Dateien', 'fsync_interval', fallback=1.0)
+
+        # Analyse großer Dateien/Verzeichnisse: Prozess-Pool und optionales spaCy-Modell
+        self.analyse_workers = parser.getint('Analyse', 'workers', fallback=0) or None
+        self.analyse_chunk_bytes = parser.getint('Analyse', 'chunk_bytes', fallback=8 * 1024 * 1024)
+        self.analyse_spacy_model = parser.get('Analyse', 'spacy_model', fallback='de_core_news_sm')
+
+        # Gleichzeitige Anfragen des Netzwerk-Befehls bei mehreren URLs
+        self.netzwerk_concurrency = parser.getint('Netzwerk', 'concurrency', fallback=10)
+
+        # Rechner: Cache kompilierter Ausdrücke und Obergrenze für Wertebereiche
+        self.rechner_cache_size = parser.getint('Rechner', 'cache_size', fallback=256)
+        self.rechner_max_points = parser.getint('Rechner', 'max_points', fallback=10_000_000)
+        # Zeitlimit in Sekunden je Auswertung und Threads für Auswertungen (nie auf der Event-Loop)
+        self.rechner_timeout = parser.getfloat('Rechner', 'timeout', fallback=5.0)
+        self.rechner_workers = parser.getint('Rechner', 'workers', fallback=2)
+
+        # Wetter-Cache: frisch für cache_ttl, danach stale_ttl lang mit Aktualisierung im Hintergrund
+        self.wetter_cache_size = parser.getint('Wetter', 'cache_size', fallback=256)
+        self.wetter_cache_ttl = parser.getfloat('Wetter', 'cache_ttl', fallback=600.0)
+        self.wetter_stale_ttl = parser.getfloat('Wetter', 'stale_ttl', fallback=1800.0)
+
+        # Web-Interface: aiohttp (auf der Event-Loop der CLI), flask (Entwicklungsserver) oder none
+        self.web_server = parser.get('Web', 'server', fallback='aiohttp')
+        self.web_host = parser.get('Web', 'host', fallback='127.0.0.1')
+        self.web_port = parser.getint('Web', 'port', fallback=5001)
+        self.web_workers = parser.getint('Web', 'workers', fallback=4)
+        self.web_keepalive_timeout = parser.getfloat('Web', 'keepalive_timeout', fallback=75.0)
+        self.web_backlog = parser.getint('Web', 'backlog', fallback=128)
+
+        # Connection-Pool für alle ausgehenden HTTP-Aufrufe
+        self.http_pool_limit = parser.getint('HTTP', 'pool_limit', fallback=100)
+        self.http_limit_per_host = parser.getint('HTTP', 'limit_per_host', fallback=10)
+        self.http_keepalive_timeout = parser.getfloat('HTTP', 'keepalive_timeout', fallback=30.0)
+        self.http_connect_timeout = parser.getfloat('HTTP', 'connect_timeout', fallback=2.0)
+        self.http_total_timeout = parser.getfloat('HTTP', 'total_timeout', fallback=5.0)
@@ -0,0 +1,360 @@
+"""Ausdrucksauswertung für den Rechner-Befehl.
+
+Ausdrücke werden mit ``ast`` geparst und gegen eine Whitelist geprüft
+(Zahlen, Grundrechenarten, Potenz, bekannte Funktionen und Konstanten,
+Variablen). Attributzugriffe, Indizes, Lambdas usw. werden abgelehnt. Das
+Ergebnis wird einmal kompiliert und in einem LRU-Cache gehalten, sodass
+wiederholte Ausdrücke nicht erneut geparst werden.
+
+Für Wertebereiche wird derselbe Code einmal mit NumPy-Arrays ausgewertet
+(vektorisiert). Ohne NumPy wird punktweise gerechnet.
+
+Ganzzahlige Multiplikationen und Potenzen laufen über geprüfte Funktionen:
+sie lehnen Operanden und Ergebnisse über ``MAX_RESULT_BITS`` ab und brechen
+nach einer optionalen Frist (``deadline``) ab. Ein Thread, der einen Ausdruck
+auswertet, hält sich so selbst an das Zeitlimit; abbrechen lässt er sich von
+außen nicht.
+"""
+import ast
+import math
+import operator
+import time
+from collections import OrderedDict
+from functools import reduce
+from typing import Any, Dict, FrozenSet, List, Optional, Tuple, Union
+
+try:
+    import numpy
+except ImportError:  # pragma: no cover - NumPy ist optional
+    numpy = None
+
+MAX_EXPONENT = 10000
+# Obergrenze für ganzzahlige Potenzen; verschachtelte Potenzen wie (10**10000)**10000 bleiben
+# sonst unter MAX_EXPONENT und rechnen trotzdem minutenlang
+MAX_RESULT_BITS = 1_000_000
+# Höchstens so viele Zeichen je Zahl in einer Variablenbelegung
+MAX_NUMBER_LENGTH = 1000
+# Höchste Schachtelungstiefe des Syntaxbaums; tiefere Ausdrücke sprengen sonst den Compiler
+MAX_DEPTH = 100
+
+_BIN_OPS = (ast.Add, ast.Sub, ast.Mult, ast.Div, ast.FloorDiv, ast.Mod, ast.Pow)
+_UNARY_OPS = (ast.UAdd, ast.USub)
+
+CONSTANTS = {"pi": math.pi, "e": math.e, "tau": math.tau}
+
+_SCALAR_FUNCTIONS = {
+    "abs": abs, "round": round, "min": min, "max": max,
+    "sqrt": math.sqrt, "exp": math.exp, "log": math.log, "log10": math.log10, "log2": math.log2,
+    "sin": math.sin, "cos": math.cos, "tan": math.tan,
+    "asin": math.asin, "acos": math.acos, "atan": math.atan,
+    "sinh": math.sinh, "cosh": math.cosh, "tanh": math.tanh,
+    "floor": math.floor, "ceil": math.ceil,
+}
+FUNCTIONS = frozenset(_SCALAR_FUNCTIONS)
+
+Number = Union[int, float, complex]
+
+
+class ExpressionError(ValueError):
+    """Ungültiger oder nicht erlaubter Ausdruck."""
+
+
+class EvaluationTimeout(ExpressionError):
+    """Die Auswertung hat ihre Frist überschritten."""
+
+
+def _checked_operators(deadline: Optional[float] = None) -> Dict[str, Any]:
+    """``_mul`` und ``_pow`` mit Größenschranke und optionaler Frist (``time.monotonic()``)."""
+
+    def check(*operands: Any) -> None:
+        if deadline is not None and time.monotonic() > deadline:
+            raise EvaluationTimeout("Zeitlimit überschritten")
+        for operand in operands:
+            if isinstance(operand, int) and operand.bit_length() > MAX_RESULT_BITS:
+                raise ExpressionError(f"Zahl zu groß (höchstens {MAX_RESULT_BITS} Bit)")
+
+    def mul(left: Any, right: Any) -> Any:
+        check(left, right)
+        # Die Summe der Bitlängen ist eine obere Schranke für die Größe des Produkts
+        if isinstance(left, int) and isinstance(right, int) and \
+                left.bit_length() + right.bit_length() > MAX_RESULT_BITS:
+            raise ExpressionError(f"Ergebnis zu groß (höchstens {MAX_RESULT_BITS} Bit)")
+        return operator.mul(left, right)
+
+    def pow_(base: Any, exponent: Any) -> Any:
+        check(base, exponent)
+        # Schutz vor Ausdrücken wie 9**9**9, die beliebig viel Speicher belegen würden
+        if isinstance(exponent, int) and isinstance(base, int) and abs(base) > 1:
+            if abs(exponent) > MAX_EXPONENT:
+                raise ExpressionError(f"Exponent zu groß (höchstens {MAX_EXPONENT})")
+            # bit_length * Exponent ist eine obere Schranke für die Größe des Ergebnisses
+            if exponent > 0 and base.bit_length() * exponent > MAX_RESULT_BITS:
+                raise ExpressionError(f"Ergebnis zu groß (höchstens {MAX_RESULT_BITS} Bit)")
+        return operator.pow(base, exponent)
+
+    return {"_mul": mul, "_pow": pow_}
+
+
+def _vector_namespace() -> Dict[str, Any]:
+    def vmin(*args):
+        return reduce(numpy.minimum, args)
+
+    def vmax(*args):
+        return reduce(numpy.maximum, args)
+
+    return {
+        "abs": numpy.abs, "round": numpy.round, "min": vmin, "max": vmax,
+        "sqrt": numpy.sqrt, "exp": numpy.exp, "log": numpy.log, "log10": numpy.log10, "log2": numpy.log2,
+        "sin": numpy.sin, "cos": numpy.cos, "tan": numpy.tan,
+        "asin": numpy.arcsin, "acos": numpy.arccos, "atan": numpy.arctan,
+        "sinh": numpy.sinh, "cosh": numpy.cosh, "tanh": numpy.tanh,
+        "floor": numpy.floor, "ceil": numpy.ceil,
+        "_pow": numpy.power, "_mul": numpy.multiply,
+    }
+
+
+class _CheckedOpsRewriter(ast.NodeTransformer):
+    """Ersetzt ``a * b`` durch ``_mul(a, b)`` und ``a ** b`` durch ``_pow(a, b)`` (Größe und Frist prüfen)."""
+
+    _NAMES = {ast.Mult: "_mul", ast.Pow: "_pow"}
+
+    def visit_BinOp(self, node: ast.BinOp) -> ast.AST:
+        self.generic_visit(node)
+        name = self._NAMES.get(type(node.op))
+        if name is None:
+            return node
+        call = ast.Call(func=ast.Name(id=name, ctx=ast.Load()), args=[node.left, node.right], keywords=[])
+        return ast.copy_location(call, node)
+
+
+def _depth(tree: ast.AST) -> int:
+    deepest, stack = 0, [(tree, 1)]
+    while stack:
+        node, depth = stack.pop()
+        deepest = max(deepest, depth)
+        stack.extend((child, depth + 1) for child in ast.iter_child_nodes(node))
+    return deepest
+
+
+class CompiledExpression:
+    """Ein geprüfter, kompilierter Ausdruck samt der benötigten Variablen."""
+
+    __slots__ = ("source", "code", "variables")
+
+    def __init__(self, source: str, code: Any, variables: FrozenSet[str]):
+        self.source = source
+        self.code = code
+        self.variables = variables
+
+    def _check(self, bindings: Dict[str, Any]) -> None:
+        missing = sorted(self.variables - set(bindings))
+        if missing:
+            raise ExpressionError(f"Unbekannte Variable(n): {', '.join(missing)}")
+
+    def evaluate(self, variables: Optional[Dict[str, Number]] = None, deadline: Optional[float] = None) -> Number:
+        """Wertet den Ausdruck aus; nach ``deadline`` (``time.monotonic()``) mit ``EvaluationTimeout``."""
+        variables = variables or {}
+        self._check(variables)
+        namespace = dict(_SCALAR_FUNCTIONS, **_checked_operators(deadline), **CONSTANTS)
+        namespace.update(variables)
+        return eval(self.code, {"__builtins__": {}}, namespace)
+
+    def evaluate_many(self, columns: Dict[str, List[Number]], scalars: Optional[Dict[str, Number]] = None,
+                      vectorize: bool = True, deadline: Optional[float] = None) -> Any:
+        """Wertet den Ausdruck für alle Zeilen gleich langer Wertelisten aus.
+
+        Mit NumPy geschieht das in einem Durchgang über Arrays, sonst punktweise
+        (dann gilt ``deadline`` wie bei ``evaluate``).
+        """
+        scalars = scalars or {}
+        self._check(dict(columns, **scalars))
+        if vectorize and numpy is not None:
+            namespace = dict(_vector_namespace(), **CONSTANTS)
+            namespace.update(scalars)
+            # Gleitkomma statt int64: kein stiller Überlauf bei großen Werten
+            namespace.update({name: numpy.asarray(values, dtype=None if numpy.iscomplexobj(values) else float)
+                              for name, values in columns.items()})
+            length = len(next(iter(columns.values()))) if columns else 1
+            with numpy.errstate(all="ignore"):
+                result = eval(self.code, {"__builtins__": {}}, namespace)
+            return numpy.broadcast_to(result, (length,))
+
+        names = list(columns)
+        rows = zip(*(columns[n] for n in names)) if names else [()]
+        return [self.evaluate(dict(scalars, **dict(zip(names, row))), deadline) for row in rows]
+
+
+class ExpressionEngine:
+    """Parst, prüft und kompiliert Ausdrücke; hält die letzten ``cache_size`` im Cache."""
+
+    def __init__(self, cache_size: int = 256, max_length: int = 1000):
+        self.cache_size = cache_size
+        self.max_length = max_length
+        self._cache: "OrderedDict[str, CompiledExpression]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def compile(self, source: str) -> CompiledExpression:
+        source = source.strip()
+        compiled = self._cache.get(source)
+        if compiled is not None:
+            self._cache.move_to_end(source)
+            self.hits += 1
+            return compiled
+        self.misses += 1
+        compiled = self._compile(source)
+        if self.cache_size > 0:
+            self._cache[source] = compiled
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+        return compiled
+
+    def _compile(self, source: str) -> CompiledExpression:
+        if not source:
+            raise ExpressionError("Leerer Ausdruck")
+        if len(source) > self.max_length:
+            raise ExpressionError(f"Ausdruck zu lang (höchstens {self.max_length} Zeichen)")
+        try:
+            tree = ast.parse(source, mode="eval")
+        except SyntaxError as e:
+            raise ExpressionError(f"Syntaxfehler: {e.msg}") from None
+        except (RecursionError, MemoryError):
+            raise ExpressionError(f"Ausdruck zu tief verschachtelt (höchstens {MAX_DEPTH} Ebenen)") from None
+        if _depth(tree) > MAX_DEPTH:
+            raise ExpressionError(f"Ausdruck zu tief verschachtelt (höchstens {MAX_DEPTH} Ebenen)")
+        variables = set()
+        for node in ast.walk(tree):
+            self._validate(node, variables)
+        tree = ast.fix_missing_locations(_CheckedOpsRewriter().visit(tree))
+        return CompiledExpression(source, compile(tree, "<ausdruck>", "eval"), frozenset(variables))
+
+    @staticmethod
+    def _validate(node: ast.AST, variables: set) -> None:
+        if isinstance(node, (ast.Expression, ast.Load) + _BIN_OPS + _UNARY_OPS):
+            return
+        if isinstance(node, ast.BinOp) and isinstance(node.op, _BIN_OPS):
+            return
+        if isinstance(node, ast.UnaryOp) and isinstance(node.op, _UNARY_OPS):
+            return
+        if isinstance(node, ast.Constant):
+            if isinstance(node.value, (int, float, complex)) and not isinstance(node.value, bool):
+                return
+            raise ExpressionError(f"Nicht erlaubter Wert: {node.value!r}")
+        if isinstance(node, ast.Call):
+            if isinstance(node.func, ast.Name) and node.func.id in FUNCTIONS and not node.keywords:
+                return
+            raise ExpressionError("Nur bekannte Funktionen ohne Schlüsselwortargumente sind erlaubt")
+        if isinstance(node, ast.Name):
+            if node.id in FUNCTIONS or node.id in CONSTANTS:
+                return
+            if node.id.startswith("_"):
+                raise ExpressionError(f"Nicht erlaubter Name: {node.id}")
+            variables.add(node.id)
+            return
+        raise ExpressionError(f"Nicht erlaubter Ausdruck: {type(node).__name__}")
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._cache),
+            "max_size": self.cache_size,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0,
+        }
+
+
+def _number(text: str) -> Number:
+    text = text.strip()
+    if len(text) > MAX_NUMBER_LENGTH:
+        raise ExpressionError(f"Zahl zu lang (höchstens {MAX_NUMBER_LENGTH} Zeichen)")
+    for kind in (int, float, complex):
+        try:
+            return kind(text)
+        except ValueError:
+            continue
+    raise ExpressionError(f"Keine Zahl: '{text}'")
+
+
+def parse_binding(text: str, max_points: int) -> Tuple[str, Union[Number, List[Number]]]:
+    """Parst ``name=wert``, ``name=von..bis[:schritt]`` oder ``name=[a,b,...]``.
+
+    Bereiche schließen wie ``range`` das Ende aus: ``x=0..5`` ergibt 0 bis 4.
+    """
+    name, sep, spec = text.partition("=")
+    name, spec = name.strip(), spec.strip()
+    if not sep or not name.isidentifier() or name.startswith("_"):
+        raise ExpressionError(f"Ungültige Variablenbelegung: '{text.strip()}'")
+    if name in CONSTANTS or name in FUNCTIONS:
+        raise ExpressionError(f"'{name}' ist reserviert")
+
+    if spec.startswith("[") and spec.endswith("]"):
+        values = [_number(v) for v in spec[1:-1].split(",") if v.strip()]
+        if len(values) > max_points:
+            raise ExpressionError(f"Zu viele Werte (höchstens {max_points})")
+        return name, values
+
+    if ".." in spec:
+        bounds, _, step_text = spec.partition(":")
+        start_text, _, stop_text = bounds.partition("..")
+        start, stop = _number(start_text), _number(stop_text)
+        step = _number(step_text) if step_text else 1
+        if any(isinstance(v, complex) for v in (start, stop, step)) or step == 0:
+            raise ExpressionError(f"Ungültiger Bereich: '{spec}'")
+        count = max(0, math.ceil((stop - start) / step))
+        if count > max_points:
+            raise ExpressionError(f"Bereich zu groß ({count} Werte, höchstens {max_points})")
+        if numpy is not None:
+            return name, numpy.arange(count) * step + start
+        return name, [start + i * step for i in range(count)]
+
+    return name, _number(spec)
+
+
+def parse_request(value: str, max_points: int) -> Tuple[str, Dict[str, Number], Dict[str, List[Number]]]:
+    """Zerlegt ``<ausdruck>[; <belegung>...]`` in Ausdruck, feste Werte und Wertelisten."""
+    expression, *parts = value.split(";")
+    scalars: Dict[str, Number] = {}
+    columns: Dict[str, List[Number]] = {}
+    for part in parts:
+        if not part.strip():
+            continue
+        name, bound = parse_binding(part, max_points)
+        if isinstance(bound, (int, float, complex)):
+            scalars[name] = bound
+        else:
+            columns[name] = bound
+    lengths = {len(v) for v in columns.values()}
+    if len(lengths) > 1:
+        raise ExpressionError("Alle Wertelisten müssen gleich lang sein")
+    return expression, scalars, columns
+
+
+def summarize(values: Any) -> str:
+    """Kurze Zusammenfassung einer Ergebnisreihe."""
+    count = len(values)
+    if count == 0:
+        return "0 Werte"
+    if numpy is not None:
+        array = numpy.asarray(values)
+        if numpy.iscomplexobj(array):
+            return f"{count} Werte, Summe={array.sum()}"
+        finite = array[numpy.isfinite(array)]
+        text = f"{count} Werte"
+        if finite.size:
+            text += (f", min={_format(finite.min())}, max={_format(finite.max())}, "
+                     f"Summe={_format(finite.sum())}, Mittelwert={_format(finite.mean())}")
+        if finite.size < count:
+            text += f", {count - finite.size} nicht endlich"
+        return text
+    if any(isinstance(v, complex) for v in values):
+        return f"{count} Werte, Summe={sum(values)}"
+    return (f"{count} Werte, min={_format(min(values))}, max={_format(max(values))}, "
+            f"Summe={_format(sum(values))}, Mittelwert={_format(sum(values) / count)}")
+
+
+def _format(value: Any) -> str:
+    value = value.item() if hasattr(value, "item") else value
+    if isinstance(value, float) and value.is_integer() and abs(value) < 1e16:
+        return str(int(value))
+    return f"{value:.6g}" if isinstance(value, float) else str(value)
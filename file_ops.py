@@ -0,0 +1,297 @@
+"""Dateioperationen für die Datei-Befehle.
+
+Gelesen wird über ``mmap``: Bereiche, Kopf/Ende und Filter greifen nur auf
+die benötigten Seiten der Datei zu, statt sie komplett in den Speicher zu
+laden. Schreiben und Löschen übernimmt ``FileOps`` in einem eigenen
+Thread-Pool. Nichts davon läuft auf der Event-Loop.
+"""
+import asyncio
+import glob
+import mmap
+import os
+import re
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Iterable, List, Optional, Set, Tuple
+
+READ_OPTIONS = ('bytes', 'lines', 'head', 'tail', 'grep', 'max')
+
+# umask einmalig beim Import ermitteln; os.umask ist prozessweit und nicht threadsicher
+_UMASK = os.umask(0)
+os.umask(_UMASK)
+
+
+def split_spec(value: str, known_options: Iterable[str]) -> Tuple[str, Dict[str, str]]:
+    """Trennt ``<ziel>[:<optionen>]`` in Ziel und Optionen.
+
+    Optionen haben die Form ``key=wert`` und werden mit ``;`` getrennt, z. B.
+    ``flight_recorder.log:tail=100;grep=denied``. Ein Doppelpunkt zählt nur
+    dann als Trenner, wenn danach eine bekannte Option folgt; Dateinamen mit
+    Doppelpunkt bleiben so lesbar.
+    """
+    names = '|'.join(re.escape(o) for o in known_options)
+    option_start = re.compile(r'(?:%s)=' % names)
+    option_split = re.compile(r';(?=(?:%s)=)' % names)
+    pos = value.find(':')
+    while pos != -1:
+        rest = value[pos + 1:]
+        if option_start.match(rest):
+            options = {}
+            for part in option_split.split(rest):
+                key, _, val = part.partition('=')
+                options[key] = val
+            return value[:pos], options
+        pos = value.find(':', pos + 1)
+    return value, {}
+
+
+def split_read_spec(value: str) -> Tuple[str, Dict[str, str]]:
+    """``split_spec`` mit den Optionen des Lesen-Befehls."""
+    return split_spec(value, READ_OPTIONS)
+
+
+def _parse_range(spec: str) -> Tuple[Optional[int], Optional[int]]:
+    start, sep, end = spec.partition('-')
+    if not sep:
+        raise ValueError(f"Ungültiger Bereich '{spec}', erwartet <von>-<bis>")
+    return (int(start) if start else None), (int(end) if end else None)
+
+
+def _skip_lines(mm: mmap.mmap, pos: int, count: int, limit: int) -> int:
+    """Position nach ``count`` Zeilenumbrüchen ab ``pos`` (höchstens ``limit``)."""
+    while count > 0 and pos < limit:
+        nl = mm.find(b'\n', pos, limit)
+        if nl == -1:
+            return limit
+        pos = nl + 1
+        count -= 1
+    return pos
+
+
+def _tail_start(mm: mmap.mmap, start: int, end: int, count: int) -> int:
+    """Beginn der letzten ``count`` Zeilen im Fenster [start, end)."""
+    pos = end
+    # Ein abschließender Zeilenumbruch beendet die letzte Zeile, er beginnt keine neue
+    if pos > start and mm[pos - 1:pos] == b'\n':
+        pos -= 1
+    while count > 0:
+        nl = mm.rfind(b'\n', start, pos)
+        if nl == -1:
+            return start
+        count -= 1
+        if count == 0:
+            return nl + 1
+        pos = nl
+    return end
+
+
+def _window(mm: mmap.mmap, options: Dict[str, str]) -> Tuple[int, int]:
+    """Ermittelt das Byte-Fenster [start, end), das durch die Optionen ausgewählt ist."""
+    start, end = 0, len(mm)
+    if 'bytes' in options:
+        first, last = _parse_range(options['bytes'])
+        start = max(0, first or 0)
+        end = min(end, last + 1 if last is not None else end)
+    if 'lines' in options:
+        first, last = _parse_range(options['lines'])
+        first = max(1, first or 1)
+        start = _skip_lines(mm, start, first - 1, end)
+        if last is not None:
+            end = _skip_lines(mm, start, last - first + 1, end)
+    if 'head' in options:
+        end = _skip_lines(mm, start, int(options['head']), end)
+    if 'tail' in options:
+        start = _tail_start(mm, start, end, int(options['tail']))
+    return start, min(max(start, end), len(mm))
+
+
+def _grep(mm: mmap.mmap, start: int, end: int, pattern: str, max_bytes: int) -> Tuple[bytes, bool]:
+    regex = re.compile(pattern.encode('utf-8'))
+    out = []
+    size = 0
+    pos = start
+    while pos < end:
+        match = regex.search(mm, pos, end)
+        if match is None:
+            break
+        line_start = mm.rfind(b'\n', start, match.start()) + 1
+        line_end = mm.find(b'\n', match.end(), end)
+        line_end = end if line_end == -1 else line_end + 1
+        line = mm[max(line_start, start):line_end]
+        if size + len(line) > max_bytes:
+            out.append(line[:max_bytes - size])
+            return b''.join(out), True
+        out.append(line)
+        size += len(line)
+        pos = line_end
+    return b''.join(out), False
+
+
+def read_file(path: str, options: Dict[str, str], max_bytes: int) -> Tuple[str, Optional[int]]:
+    """Liest den per Optionen gewählten Ausschnitt einer Datei.
+
+    Gibt ``(text, limit)`` zurück; ``limit`` ist das greifende Byte-Limit,
+    falls gekürzt wurde, sonst ``None``. Es werden nie mehr als ``max_bytes``
+    Bytes gelesen bzw. zurückgegeben; ``max`` in den Optionen kann das Limit
+    nur verkleinern.
+    """
+    if 'max' in options:
+        max_bytes = min(max_bytes, int(options['max']))
+    with open(path, 'rb') as fp:
+        if os.fstat(fp.fileno()).st_size == 0:
+            return '', None
+        with mmap.mmap(fp.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            start, end = _window(mm, options)
+            if 'grep' in options:
+                data, truncated = _grep(mm, start, end, options['grep'], max_bytes)
+            else:
+                truncated = end - start > max_bytes
+                data = mm[start:min(end, start + max_bytes)]
+    return data.decode('utf-8', errors='replace'), (max_bytes if truncated else None)
+
+
+class FileOps:
+    """Thread-Pool-gestützte Schreib- und Löschoperationen.
+
+    Speichern erfolgt atomar (temporäre Datei im Zielverzeichnis, danach
+    ``os.replace``), sodass ein Absturz nie eine halb geschriebene Datei
+    hinterlässt. ``fsync`` steuert die Dauerhaftigkeit:
+
+    - ``always``: jede Datei wird vor dem Umbenennen synchronisiert,
+    - ``batch``: geänderte Dateien werden gesammelt alle ``fsync_interval``
+      Sekunden in einem Durchgang synchronisiert,
+    - ``never``: das Betriebssystem entscheidet.
+    """
+
+    def __init__(self, config: Any = None):
+        self.workers = getattr(config, 'dateien_workers', 4)
+        self.fsync_mode = getattr(config, 'dateien_fsync', 'batch')
+        self.fsync_interval = getattr(config, 'dateien_fsync_interval', 1.0)
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._dirty: Set[str] = set()
+        self._dirty_lock = threading.Lock()
+        self._flush_handle: Optional[asyncio.TimerHandle] = None
+
+    async def run(self, func: Callable[..., Any], *args: Any) -> Any:
+        """Führt eine blockierende Funktion im Datei-Thread-Pool aus."""
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='file-ops')
+        return await asyncio.get_running_loop().run_in_executor(self._executor, func, *args)
+
+    async def save(self, path: str, content: str) -> None:
+        """Schreibt ``content`` atomar nach ``path``."""
+        await self.run(self._atomic_write, path, content.encode('utf-8'))
+        self._mark_dirty(path)
+
+    async def append(self, path: str, content: str) -> None:
+        """Hängt ``content`` an ``path`` an (legt die Datei bei Bedarf an)."""
+        await self.run(self._append, path, content.encode('utf-8'))
+        self._mark_dirty(path)
+
+    async def delete_many(self, patterns: List[str]) -> Tuple[List[str], List[str], List[Tuple[str, str]]]:
+        """Löscht alle Dateien zu den (Glob-)Mustern.
+
+        Gibt ``(gelöscht, nicht_gefunden, fehler)`` zurück; ``fehler`` enthält
+        Paare aus Pfad und Fehlermeldung.
+        """
+        return await self.run(self._delete_many, patterns)
+
+    async def close(self) -> None:
+        """Synchronisiert ausstehende Dateien und beendet den Thread-Pool."""
+        if self._flush_handle is not None:
+            self._flush_handle.cancel()
+            self._flush_handle = None
+        if self._executor is None:
+            return
+        await self.run(self._fsync_dirty)
+        executor, self._executor = self._executor, None
+        executor.shutdown(wait=False)
+
+    def _atomic_write(self, path: str, data: bytes) -> None:
+        directory = os.path.dirname(os.path.abspath(path))
+        fd, tmp_path = tempfile.mkstemp(dir=directory, prefix='.' + os.path.basename(path) + '.', suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as fp:
+                fp.write(data)
+                if self.fsync_mode == 'always':
+                    fp.flush()
+                    os.fsync(fp.fileno())
+            if os.path.exists(path):
+                # Rechte der bestehenden Datei übernehmen
+                os.chmod(tmp_path, os.stat(path).st_mode & 0o7777)
+            else:
+                os.chmod(tmp_path, 0o666 & ~_UMASK)
+            os.replace(tmp_path, path)
+        except BaseException:
+            try:
+                os.remove(tmp_path)
+            except OSError:
+                pass
+            raise
+        if self.fsync_mode == 'always':
+            _fsync_path(directory)
+
+    def _append(self, path: str, data: bytes) -> None:
+        with open(path, 'ab') as fp:
+            fp.write(data)
+            if self.fsync_mode == 'always':
+                fp.flush()
+                os.fsync(fp.fileno())
+
+    @staticmethod
+    def _delete_many(patterns: List[str]) -> Tuple[List[str], List[str], List[Tuple[str, str]]]:
+        deleted: List[str] = []
+        missing: List[str] = []
+        errors: List[Tuple[str, str]] = []
+        for pattern in patterns:
+            matches = sorted(glob.glob(pattern)) if glob.has_magic(pattern) else [pattern]
+            if not matches:
+                missing.append(pattern)
+            for path in matches:
+                try:
+                    os.remove(path)
+                    deleted.append(path)
+                except FileNotFoundError:
+                    missing.append(path)
+                except OSError as e:
+                    errors.append((path, str(e)))
+        return deleted, missing, errors
+
+    def _mark_dirty(self, path: str) -> None:
+        if self.fsync_mode != 'batch':
+            return
+        with self._dirty_lock:
+            self._dirty.add(os.path.abspath(path))
+        if self._flush_handle is None:
+            loop = asyncio.get_running_loop()
+            self._flush_handle = loop.call_later(self.fsync_interval, self._schedule_flush)
+
+    def _schedule_flush(self) -> None:
+        self._flush_handle = None
+        if self._executor is not None:
+            self._executor.submit(self._fsync_dirty)
+
+    def _fsync_dirty(self) -> None:
+        with self._dirty_lock:
+            paths, self._dirty = self._dirty, set()
+        directories = set()
+        for path in paths:
+            _fsync_path(path)
+            directories.add(os.path.dirname(path))
+        for directory in directories:
+            _fsync_path(directory)
+
+
+def _fsync_path(path: str) -> None:
+    try:
+        fd = os.open(path, os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(fd)
+    except OSError:
+        # Verzeichnisse lassen sich nicht auf allen Plattformen synchronisieren
+        pass
+    finally:
+        os.close(fd)
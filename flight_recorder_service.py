@@ -1,41 +1,149 @@
 """Minimal flight recorder service for the CLI + Android."""
 from datetime import datetime
 import logging
-import os
 import json
-from pathlib import Path
-from typing import Dict, Any
+import os
+import time
+from typing import Dict, Any, List, Optional
 
 from flask import Flask, jsonify, request
 from flask_cors import CORS
 
+import metrics
+import recorder_storage
+
 app = Flask(__name__)
 CORS(app)
+metrics.instrument_flask(app, "flight_recorder")
 logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
 
+QUERY_DEFAULT_LIMIT = 100
+QUERY_MAX_LIMIT = int(os.environ.get("FLIGHT_RECORDER_QUERY_MAX_LIMIT", "1000"))
+STAGES_MAX_RECORDS = int(os.environ.get("FLIGHT_RECORDER_STAGES_MAX_RECORDS", "10000"))
+
+INGESTED = metrics.counter("flight_recorder_ingested_records_total", "Records stored by endpoint", ("endpoint",))
+INGEST_DURATION = metrics.histogram(
+    "flight_recorder_persist_duration_seconds", "Time to append (and commit) one request's records", ("endpoint",))
+INGEST_BATCH_SIZE = metrics.histogram(
+    "flight_recorder_batch_size", "Records per batch request", buckets=metrics.SIZE_BUCKETS)
+STORAGE_COMMITS = metrics.gauge("flight_recorder_storage_commits", "Group commits of this worker's segment writer")
+STORAGE_RECORDS = metrics.gauge("flight_recorder_storage_records", "Records written by this worker's segment writer")
+STORAGE_COMMITS.set_function(lambda: recorder_storage.get_writer().commits)
+STORAGE_RECORDS.set_function(lambda: recorder_storage.get_writer().records)
+
 def _persist(entry: Dict[str, Any]) -> None:
-    target = Path(os.environ.get("FLIGHT_RECORDER_LOG", "flight_recorder.log"))
-    target.parent.mkdir(parents=True, exist_ok=True)
-    with target.open("a", encoding="utf-8") as fp:
-        fp.write(json.dumps(entry) + "\n")
+    _persist_many([entry], "single")
 
-@app.post('/flight_record')
-def record_event():
-    payload = request.json or {}
-    entry = {
-        "timestamp": datetime.utcnow().isoformat() + "Z",
+def _persist_many(entries: List[Dict[str, Any]], endpoint: str = "batch") -> None:
+    # One long-lived writer per worker process, shared by all request threads
+    started = time.perf_counter()
+    recorder_storage.get_writer().append(entries)
+    INGEST_DURATION.observe(time.perf_counter() - started, endpoint)
+    INGESTED.inc(endpoint, amount=len(entries))
+
+def _build_entry(payload: Dict[str, Any], timestamp: Optional[str] = None) -> Dict[str, Any]:
+    return {
+        "timestamp": timestamp or datetime.utcnow().isoformat() + "Z",
         "command": payload.get("command", ""),
         "policy_status": payload.get("policy_status", "unknown"),
         "result": payload.get("result", ""),
         "metadata": payload.get("metadata", {}),
     }
+
+@app.post('/flight_record')
+def record_event():
+    payload = request.json or {}
+    entry = _build_entry(payload)
     logging.info("Flight record: %s", entry)
     _persist(entry)
     return jsonify({"status": "recorded"}), 200
 
+@app.post('/flight_record/batch')
+def record_batch():
+    """Bulk ingest: NDJSON body (one event per line) or a JSON list.
+
+    Batched events are usually backfilled from a client spool, so the
+    client's original timestamp is kept when present.
+    """
+    if request.is_json:
+        payloads = request.get_json(silent=True)
+        if not isinstance(payloads, list):
+            return jsonify({"status": "error", "reason": "Expected a JSON list or NDJSON body"}), 400
+    else:
+        payloads = []
+        for line_no, line in enumerate(request.get_data().splitlines(), start=1):
+            if not line.strip():
+                continue
+            try:
+                payloads.append(json.loads(line))
+            except ValueError:
+                return jsonify({"status": "error", "reason": f"Invalid JSON on line {line_no}"}), 400
+
+    entries = [_build_entry(p, p.get("timestamp")) for p in payloads if isinstance(p, dict)]
+    INGEST_BATCH_SIZE.observe(len(entries))
+    if entries:
+        _persist_many(entries)
+    logging.info("Flight record batch: %d events", len(entries))
+    return jsonify({"status": "recorded", "count": len(entries)}), 200
+
+def _record_query(args) -> recorder_storage.RecordQuery:
+    return recorder_storage.RecordQuery(
+        since=args.get("since"),
+        until=args.get("until"),
+        command=args.get("command"),
+        status=args.get("status"),
+    )
+
+def _limit(args, default: int, maximum: int) -> int:
+    limit = int(args.get("limit", default))
+    if limit < 1:
+        raise ValueError("'limit' must be positive")
+    return min(limit, maximum)
+
+@app.get('/flight_records')
+def query_records():
+    """Query stored records.
+
+    Parameters: ``since``/``until`` (ISO timestamps, until exclusive),
+    ``command`` (case-insensitive prefix), ``status`` (policy status),
+    ``limit`` (default 100, max ``QUERY_MAX_LIMIT``) and ``cursor`` (the
+    ``next_cursor`` of the previous page).
+    """
+    args = request.args
+    try:
+        page = recorder_storage.query_records(
+            recorder_storage.StorageConfig.from_env().directory,
+            _record_query(args),
+            limit=_limit(args, QUERY_DEFAULT_LIMIT, QUERY_MAX_LIMIT),
+            cursor=args.get("cursor"),
+        )
+    except ValueError as exc:
+        return jsonify({"status": "error", "reason": str(exc)}), 400
+    return jsonify(page), 200
+
+@app.get('/flight_records/stages')
+def stage_report():
+    """Per-stage latency (parse, lookup, policy, execute) from the traces in the records.
+
+    Takes the filters of ``/flight_records``; ``limit`` caps the number of
+    records analysed (default and max ``STAGES_MAX_RECORDS``), ``slowest``
+    the number of slowest traces returned (default 10).
+    """
+    args = request.args
+    try:
+        report = recorder_storage.stage_report(
+            recorder_storage.StorageConfig.from_env().directory,
+            _record_query(args),
+            limit=_limit(args, STAGES_MAX_RECORDS, STAGES_MAX_RECORDS),
+            slowest=max(0, min(int(args.get("slowest", 10)), 100)),
+        )
+    except ValueError as exc:
+        return jsonify({"status": "error", "reason": str(exc)}), 400
+    return jsonify(report), 200
+
 @app.get('/health')
 def health():
-    return jsonify({"status": "healthy", "service": "flight-recorder"})
+    return jsonify({"status": "healthy", "service": "flight-recorder", "storage": recorder_storage.get_writer().stats()})
 
 if __name__ == '__main__':
     app.run(host='127.0.0.1', port=8090)
@@ -0,0 +1,405 @@
+"""Asynchroner, gebündelter Versand von Flight-Records.
+
+Einträge landen zunächst in einer begrenzten In-Memory-Queue. Ein
+Hintergrund-Task schreibt sie gesammelt (Group Commit) in eine lokale
+Spool-Datei und überträgt alles, was noch nicht beim Flight-Recorder-Service
+angekommen ist, als NDJSON an dessen Batch-Endpunkt. Wie weit die Spool-Datei
+bereits übertragen wurde, steht in ``<spool>.offset``; war der Service nicht
+erreichbar, wird beim nächsten Versuch ab dieser Stelle nachgeliefert.
+Nach mehreren Fehlversuchen in Folge öffnet ein Circuit-Breaker; bis der
+``/health``-Endpunkt des Service wieder antwortet, wird gar nicht versendet
+und nur in den Spool geschrieben.
+
+Zeilen, die kein gültiges JSON sind (z. B. nach einem Absturz mitten im
+Schreiben), und Batches, die der Service mit 4xx ablehnt, landen in
+``<spool>.rejected``; der Offset rückt trotzdem vor, damit eine kaputte Zeile
+den Versand nicht dauerhaft blockiert. Vollständig geparst werden nur Zeilen,
+die beim Start schon im Spool standen; was dieser Prozess selbst anhängt, wird
+nur auf die Klammern eines JSON-Objekts geprüft. Ist alles übertragen und der
+Offset über ``flight_recorder_spool_compact_bytes``, wird der Spool geleert.
+
+Laufen mehrere Prozesse mit derselben Konfiguration (gunicorn-Worker), hat
+jeder mit ``flight_recorder_spool_per_process`` einen eigenen Spool
+``<spool>.<pid>`` samt Offset. Beim Start übernimmt ein Prozess den
+ungesendeten Rest der Spools beendeter Prozesse in seinen eigenen.
+"""
+import asyncio
+import json
+import logging
+import os
+import shutil
+from typing import Any, Dict, List, Optional, Tuple
+
+from circuit_breaker import CircuitBreaker, health_url
+from http_client import HttpClient
+import metrics
+
+SHIPPED = metrics.counter("cli_flight_recorder_shipped_total", "An den Flight-Recorder-Service übertragene Einträge")
+DROPPED = metrics.counter("cli_flight_recorder_dropped_total", "Wegen voller Queue verworfene Einträge")
+REJECTED = metrics.counter("cli_flight_recorder_rejected_total",
+                           "Ungültige oder abgelehnte Einträge, die nach <spool>.rejected verschoben wurden")
+SHIP_DURATION = metrics.histogram("cli_flight_recorder_ship_duration_seconds",
+                                  "Dauer eines Batch-Versands", ("outcome",))
+
+_STOP = object()
+
+
+class FlightRecorderShipper:
+    """Entkoppelt das Aufzeichnen von Flight-Records von der Befehlsschleife."""
+
+    def __init__(self, config: Any = None, http: Optional[HttpClient] = None):
+        url = getattr(config, 'flight_recorder_url', None)
+        self.batch_url = getattr(config, 'flight_recorder_batch_url', None) or (
+            url.rstrip('/') + '/batch' if url else None
+        )
+        self.spool_path = getattr(config, 'flight_recorder_spool', None) or 'flight_recorder.log'
+        self.shared_spool_path = self.spool_path
+        self.spool_per_process = getattr(config, 'flight_recorder_spool_per_process', False)
+        if self.spool_per_process:
+            self.spool_path = f"{self.spool_path}.{os.getpid()}"
+        self.offset_path = self.spool_path + '.offset'
+        self.rejected_path = self.spool_path + '.rejected'
+        self.compact_bytes = getattr(config, 'flight_recorder_spool_compact_bytes', 64 * 1024 * 1024)
+        self.queue_size = getattr(config, 'flight_recorder_queue_size', 10000)
+        self.batch_size = getattr(config, 'flight_recorder_batch_size', 500)
+        self.flush_interval = getattr(config, 'flight_recorder_flush_interval', 1.0)
+        self.ship_max_bytes = getattr(config, 'flight_recorder_ship_max_bytes', 4 * 1024 * 1024)
+        self._http = http if http is not None else HttpClient(config)
+        self.breaker = CircuitBreaker(
+            "flight_recorder", config, self._http,
+            probe_url=getattr(config, 'flight_recorder_health_url', None)
+            or health_url(self.batch_url, '/flight_record/batch'),
+        )
+
+        self.dropped = 0
+        self.shipped = 0
+        self.rejected = 0
+        self._queue: Optional[asyncio.Queue] = None
+        self._task: Optional[asyncio.Task] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._offset: Optional[int] = None
+        # Bis hierher stammt der Spool aus früheren Läufen; nur dort kann eine abgerissene Zeile stehen
+        self._verify_until = 0
+        self._unshipped = 0
+
+    @property
+    def queue_depth(self) -> int:
+        return self._queue.qsize() if self._queue is not None else 0
+
+    def _ensure_started(self) -> None:
+        if self._task is not None and not self._task.done() and not self._loop.is_closed():
+            return
+        self._loop = asyncio.get_running_loop()
+        self._queue = asyncio.Queue(maxsize=self.queue_size)
+        self._task = self._loop.create_task(self._run())
+
+    def start(self) -> None:
+        """Startet den Versand-Task auf der laufenden Event-Loop (sonst beim ersten ``submit``)."""
+        self._ensure_started()
+
+    def submit(self, entry: Dict[str, Any]) -> bool:
+        """Reiht einen Eintrag ein, ohne zu warten. Bei voller Queue wird er verworfen.
+
+        Aus einem anderen Thread bzw. einer anderen Event-Loop (z. B. Flask)
+        wird der Eintrag an die Loop übergeben, auf der der Versand läuft.
+        """
+        loop = self._loop
+        if loop is not None and not loop.is_closed() and self._task is not None and not self._task.done():
+            try:
+                running = asyncio.get_running_loop()
+            except RuntimeError:
+                running = None
+            if running is not loop:
+                loop.call_soon_threadsafe(self._put, entry)
+                return True
+        self._ensure_started()
+        return self._put(entry)
+
+    def _put(self, entry: Dict[str, Any]) -> bool:
+        try:
+            self._queue.put_nowait(entry)
+            return True
+        except asyncio.QueueFull:
+            self.dropped += 1
+            DROPPED.inc()
+            if self.dropped == 1 or self.dropped % 1000 == 0:
+                logging.warning("Flight-Recorder-Queue voll, %d Einträge verworfen", self.dropped)
+            return False
+
+    async def close(self, timeout: float = 5.0) -> None:
+        """Schreibt alle eingereihten Einträge in den Spool und versucht einen letzten Versand."""
+        if self._task is None or self._task.done():
+            return
+        await self._queue.put(_STOP)
+        try:
+            await asyncio.wait_for(self._task, timeout)
+        except asyncio.TimeoutError:
+            logging.warning("Flight-Recorder-Versand beim Beenden abgebrochen; Rest bleibt im Spool")
+        finally:
+            self._task = None
+            await self.breaker.close()
+
+    async def _run(self) -> None:
+        loop = asyncio.get_running_loop()
+        if self.spool_per_process:
+            try:
+                await asyncio.to_thread(self._adopt_orphans)
+            except OSError as exc:
+                logging.error("Spools beendeter Prozesse nicht übernommen: %s", exc)
+        try:
+            await asyncio.to_thread(self._close_torn_line)
+        except OSError as exc:
+            logging.error("Flight-Recorder-Spool nicht beschreibbar: %s", exc)
+        self._offset = await asyncio.to_thread(self._load_offset)
+        self._verify_until = await asyncio.to_thread(self._spool_size)
+        self._unshipped = 1 if self._verify_until > self._offset else 0
+        next_ship = loop.time()
+        stopping = False
+
+        while not stopping:
+            timeout = max(0.0, next_ship - loop.time()) if self._unshipped else None
+            batch: List[Dict[str, Any]] = []
+            try:
+                item = await asyncio.wait_for(self._queue.get(), timeout)
+                if item is _STOP:
+                    stopping = True
+                else:
+                    batch.append(item)
+            except asyncio.TimeoutError:
+                pass
+
+            # Alles, was bereits wartet, in denselben Commit aufnehmen
+            while not stopping and len(batch) < self.batch_size:
+                try:
+                    item = self._queue.get_nowait()
+                except asyncio.QueueEmpty:
+                    break
+                if item is _STOP:
+                    stopping = True
+                else:
+                    batch.append(item)
+
+            if batch:
+                try:
+                    await asyncio.to_thread(self._append_to_spool, batch)
+                    self._unshipped += len(batch)
+                except OSError as exc:
+                    logging.error("Flight-Recorder-Spool nicht beschreibbar: %s", exc)
+
+            due = loop.time() >= next_ship or self._unshipped >= self.batch_size
+            if self._unshipped and (due or stopping):
+                if await self._ship():
+                    next_ship = loop.time() + self.flush_interval
+                else:
+                    # Service nicht erreichbar: später ab dem gespeicherten Offset nachliefern
+                    next_ship = loop.time() + max(self.flush_interval, 5.0)
+                    if stopping:
+                        break
+
+    async def _ship(self) -> bool:
+        """Überträgt ungesendete Spool-Einträge; True, wenn nichts mehr aussteht."""
+        if not self.batch_url:
+            self._unshipped = 0
+            return True
+        if not self.breaker.allow():
+            return False
+        loop = asyncio.get_running_loop()
+        while True:
+            body, end, invalid = await asyncio.to_thread(self._read_unshipped)
+            if invalid:
+                await asyncio.to_thread(self._reject, invalid)
+                logging.error("%d ungültige Zeile(n) im Flight-Recorder-Spool nach %s verschoben",
+                              invalid.count(b'\n'), self.rejected_path)
+            if not body:
+                if end != self._offset:
+                    await self._advance(end)
+                    continue
+                self._unshipped = 0
+                await asyncio.to_thread(self._compact)
+                return True
+            started = loop.time()
+            try:
+                async with self._http.post(
+                    self.batch_url,
+                    data=body,
+                    headers={'Content-Type': 'application/x-ndjson'},
+                ) as resp:
+                    if resp.status >= 500:
+                        logging.error("Flight-Recorder-Batch abgelehnt: HTTP %s", resp.status)
+                        SHIP_DURATION.observe(loop.time() - started, "rejected")
+                        self.breaker.record_failure(f"HTTP {resp.status}")
+                        return False
+                    rejected = resp.status >= 300
+            except Exception as exc:
+                logging.error("Flight recorder push failed: %s", exc)
+                SHIP_DURATION.observe(loop.time() - started, "error")
+                self.breaker.record_failure(exc)
+                return False
+            # Auch ein 4xx heißt: der Service antwortet
+            self.breaker.record_success()
+            count = body.count(b'\n')
+            if rejected:
+                # Ein erneuter Versand würde genauso abgelehnt: beiseitelegen statt endlos wiederholen
+                logging.error("Flight-Recorder-Batch abgelehnt: HTTP %s; %d Einträge nach %s verschoben",
+                              resp.status, count, self.rejected_path)
+                SHIP_DURATION.observe(loop.time() - started, "rejected")
+                await asyncio.to_thread(self._reject, body)
+            else:
+                SHIP_DURATION.observe(loop.time() - started, "ok")
+                self.shipped += count
+                SHIPPED.inc(amount=count)
+            await self._advance(end)
+
+    async def _advance(self, end: int) -> None:
+        self._offset = end
+        await asyncio.to_thread(self._store_offset, end)
+
+    def _append_to_spool(self, batch: List[Dict[str, Any]]) -> None:
+        data = ''.join(json.dumps(entry) + '\n' for entry in batch)
+        with open(self.spool_path, 'a', encoding='utf-8') as fp:
+            fp.write(data)
+
+    def _close_torn_line(self) -> None:
+        # Nach einem Absturz mitten im Anhängen fehlt der Zeilenumbruch: neue Einträge nicht daran anhängen
+        try:
+            with open(self.spool_path, 'rb+') as fp:
+                if fp.seek(0, os.SEEK_END) == 0:
+                    return
+                fp.seek(-1, os.SEEK_END)
+                if fp.read(1) != b'\n':
+                    fp.write(b'\n')
+        except FileNotFoundError:
+            pass
+
+    def _spool_size(self) -> int:
+        try:
+            return os.path.getsize(self.spool_path)
+        except OSError:
+            return 0
+
+    def _read_unshipped(self) -> Tuple[bytes, int, bytes]:
+        """Nächster Abschnitt ab dem Offset: ``(gültige Zeilen, Ende, ungültige Zeilen)``."""
+        size = self._spool_size()
+        if size < self._offset:
+            # Spool wurde geleert oder ersetzt: von vorne beginnen und den fremden Inhalt prüfen
+            self._offset = 0
+            self._verify_until = size
+        if size == self._offset:
+            return b'', self._offset, b''
+        with open(self.spool_path, 'rb') as fp:
+            fp.seek(self._offset)
+            chunk = fp.read(self.ship_max_bytes)
+        # Nur vollständige Zeilen versenden
+        cut = chunk.rfind(b'\n') + 1
+        if cut == 0:
+            if len(chunk) < self.ship_max_bytes:
+                return b'', self._offset, b''
+            cut = len(chunk)
+        valid, invalid = [], []
+        position = self._offset
+        for line in chunk[:cut].splitlines(keepends=True):
+            start, position = position, position + len(line)
+            if not line.strip():
+                continue
+            # Eigene Zeilen aus diesem Lauf sind vollständig geschrieben; nur ältere werden geparst
+            if _is_record(line, parse=start < self._verify_until):
+                valid.append(line)
+            else:
+                invalid.append(line if line.endswith(b'\n') else line + b'\n')
+        return b''.join(valid), self._offset + cut, b''.join(invalid)
+
+    def _reject(self, lines: bytes) -> None:
+        count = lines.count(b'\n')
+        self.rejected += count
+        REJECTED.inc(amount=count)
+        with open(self.rejected_path, 'ab') as fp:
+            fp.write(lines)
+
+    def _compact(self) -> None:
+        """Leert den Spool, sobald alles übertragen ist und der Offset ``compact_bytes`` überschreitet."""
+        if self._offset < self.compact_bytes or self._spool_size() != self._offset:
+            return
+        # Erst den Offset, dann den Spool: ein Absturz dazwischen führt höchstens zu Duplikaten
+        self._store_offset(0)
+        with open(self.spool_path, 'r+b') as fp:
+            fp.truncate(0)
+        self._offset = 0
+        self._verify_until = 0
+
+    def _adopt_orphans(self) -> int:
+        """Hängt den ungesendeten Rest der Spools beendeter Prozesse an den eigenen an; liefert deren Anzahl."""
+        directory = os.path.dirname(os.path.abspath(self.shared_spool_path))
+        prefix = os.path.basename(self.shared_spool_path) + '.'
+        adopted = 0
+        for name in sorted(os.listdir(directory)):
+            pid = name[len(prefix):] if name.startswith(prefix) else ''
+            if not pid.isdigit() or int(pid) == os.getpid() or _alive(int(pid)):
+                continue
+            orphan = os.path.join(directory, name)
+            # Umbenennen gelingt nur einem Prozess: zwei Worker übernehmen denselben Spool nie doppelt
+            claimed = f"{self.spool_path}.adopt-{pid}"
+            try:
+                os.rename(orphan, claimed)
+            except FileNotFoundError:
+                continue
+            try:
+                with open(orphan + '.offset', 'r', encoding='utf-8') as fp:
+                    offset = int(fp.read().strip() or 0)
+            except (OSError, ValueError):
+                offset = 0
+            with open(claimed, 'rb') as src, open(self.spool_path, 'ab') as dst:
+                src.seek(offset)
+                shutil.copyfileobj(src, dst)
+            os.remove(claimed)
+            adopted += 1
+            for leftover in (orphan + '.offset', orphan + '.offset.tmp'):
+                try:
+                    os.remove(leftover)
+                except FileNotFoundError:
+                    pass
+            logging.info("Ungesendete Flight-Records von Prozess %s übernommen", pid)
+        return adopted
+
+    def _load_offset(self) -> int:
+        try:
+            with open(self.offset_path, 'r', encoding='utf-8') as fp:
+                return int(fp.read().strip() or 0)
+        except FileNotFoundError:
+            if self.spool_per_process:
+                # Eigener Spool dieses Prozesses: alles darin ist noch ungesendet
+                return 0
+            # Bestehende Historie wurde mit der alten Einzelübertragung bereits versendet
+            offset = self._spool_size()
+            self._store_offset(offset)
+            return offset
+        except (OSError, ValueError):
+            return 0
+
+    def _store_offset(self, offset: int) -> None:
+        tmp_path = self.offset_path + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as fp:
+            fp.write(str(offset))
+        os.replace(tmp_path, self.offset_path)
+
+
+def _is_record(line: bytes, parse: bool) -> bool:
+    """Ob eine Spool-Zeile ein JSON-Objekt ist; ohne ``parse`` nur anhand der Klammern."""
+    line = line.strip()
+    if not (line.startswith(b'{') and line.endswith(b'}')):
+        return False
+    if parse:
+        try:
+            json.loads(line)
+        except ValueError:
+            return False
+    return True
+
+
+def _alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
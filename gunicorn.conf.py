@@ -0,0 +1,17 @@
+"""gunicorn-Konfiguration für das Web-Interface (Werte aus ``[Web]`` in config.ini).
+
+    gunicorn -c gunicorn.conf.py web_server:create_gunicorn_app
+
+Jeder Worker betreibt eine eigene Event-Loop mit eigenem ``CommandProcessor``.
+"""
+import os
+
+from config import Configuration
+
+_config = Configuration(os.environ.get('CLI_APP_CONFIG') or os.path.join(os.path.dirname(os.path.abspath(__file__)), 'config.ini'))
+
+bind = f"{_config.web_host}:{_config.web_port}"
+workers = _config.web_workers
+worker_class = 'aiohttp.GunicornWebWorker'
+keepalive = int(_config.web_keepalive_timeout)
+backlog = _config.web_backlog
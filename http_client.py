@@ -0,0 +1,93 @@
+"""Gemeinsamer, langlebiger HTTP-Client für alle ausgehenden Aufrufe der CLI.
+
+Policy-Checks, Flight-Recorder-Pushes und Netzwerk-Befehle teilen sich einen
+Connection-Pool mit Keep-Alive, damit nicht jeder Befehl neue TCP-Verbindungen
+aufbauen muss. Der Pool gehört dem ``CommandProcessor`` und wird mit ihm
+geschlossen.
+"""
+import asyncio
+import logging
+from contextlib import asynccontextmanager
+from typing import TYPE_CHECKING, Any, AsyncIterator, Dict, Optional
+
+if TYPE_CHECKING:
+    import aiohttp
+
+
+class HttpClient:
+    """Verwaltet eine geteilte ``aiohttp.ClientSession`` mit Connection-Pool."""
+
+    def __init__(self, config: Any = None):
+        self.limit = getattr(config, 'http_pool_limit', 100)
+        self.limit_per_host = getattr(config, 'http_limit_per_host', 10)
+        self.keepalive_timeout = getattr(config, 'http_keepalive_timeout', 30.0)
+        self.connect_timeout = getattr(config, 'http_connect_timeout', 2.0)
+        self.total_timeout = getattr(config, 'http_total_timeout', 5.0)
+        self._session: Optional['aiohttp.ClientSession'] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+    def _new_session(self) -> 'aiohttp.ClientSession':
+        # aiohttp erst beim ersten Aufruf importieren (schnellerer Start der CLI)
+        import aiohttp
+
+        connector = aiohttp.TCPConnector(
+            limit=self.limit,
+            limit_per_host=self.limit_per_host,
+            keepalive_timeout=self.keepalive_timeout,
+            ttl_dns_cache=300,
+        )
+        timeout = aiohttp.ClientTimeout(total=self.total_timeout, connect=self.connect_timeout)
+        return aiohttp.ClientSession(connector=connector, timeout=timeout)
+
+    def _acquire(self):
+        """Liefert (session, transient).
+
+        Auf der Event-Loop, die den Pool zuerst benutzt hat, wird immer dieselbe
+        Session wiederverwendet. Aufrufe aus fremden Loops (z. B. Flask startet
+        pro Request eine eigene Loop) bekommen eine kurzlebige Session, da eine
+        aiohttp-Session nicht loop-übergreifend genutzt werden darf.
+        """
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop and (self._loop is None or self._loop.is_closed()):
+            # Die Besitzer-Loop ist weg: die alte Session ist unbrauchbar
+            self._session = None
+            self._loop = loop
+        if self._loop is loop:
+            if self._session is None or self._session.closed:
+                self._session = self._new_session()
+            return self._session, False
+        return self._new_session(), True
+
+    @asynccontextmanager
+    async def request(self, method: str, url: str, **kwargs: Any) -> AsyncIterator['aiohttp.ClientResponse']:
+        """Führt eine Anfrage über den Pool aus und liefert die Antwort als Context-Manager."""
+        session, transient = self._acquire()
+        try:
+            async with session.request(method, url, **kwargs) as response:
+                yield response
+        finally:
+            if transient:
+                await session.close()
+
+    def get(self, url: str, **kwargs: Any):
+        return self.request('GET', url, **kwargs)
+
+    def post(self, url: str, **kwargs: Any):
+        return self.request('POST', url, **kwargs)
+
+    def stats(self) -> Dict[str, int]:
+        """Belegte und freie Keep-Alive-Verbindungen der geteilten Session."""
+        connector = self._session.connector if self._session is not None and not self._session.closed else None
+        in_use = len(getattr(connector, '_acquired', ()) or ())
+        idle = sum(len(conns) for conns in (getattr(connector, '_conns', None) or {}).values())
+        return {"limit": self.limit, "in_use": in_use, "idle": idle}
+
+    async def close(self) -> None:
+        """Schließt die geteilte Session samt aller Keep-Alive-Verbindungen."""
+        session, self._session = self._session, None
+        self._loop = None
+        if session is not None and not session.closed:
+            try:
+                await session.close()
+            except Exception as exc:
+                logging.error("HTTP-Client konnte nicht sauber geschlossen werden: %s", exc)
@@ -0,0 +1,371 @@
+"""Incremental "Impfstoff" (vaccine) miner for flight records.
+
+Turns recurring threats in the flight-recorder segments into rule candidates.
+Each run:
+
+1. reads only records written since the last run, resuming every segment
+   at the ``(block, line)`` position stored in the checkpoint file;
+2. folds commands the policy engine denied on a rule (``BLOCKED_REASON`` or
+   ``GUEST_REASON``) into decayed, size-bounded counters, together with the
+   roles they were denied for (counts halve every ``half_life`` seconds, only
+   the ``capacity`` most frequent signatures are kept). Outages
+   (``unavailable``) and failed commands are not threats;
+3. writes signatures that reached ``threshold`` and are not already covered
+   by the rules to the review file.
+
+Candidates are never enforced automatically: ``learned_patterns`` apply to
+every role, so a maintainer approves them one by one with ``--approve``,
+which adds them to the rule file with a new version that ``policy_service``
+picks up on its next reload. A candidate that was only ever denied for
+guests (the usual case: the guest rule on destructive keywords) becomes a
+block for every role once approved; ``approve`` refuses that widening unless
+it is confirmed with ``--all-roles``.
+
+Intended to run from cron, e.g. every minute::
+
+    * * * * * cd /srv/pro-bono && python impfstoff.py
+"""
+import argparse
+import json
+import logging
+import os
+import re
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+import recorder_storage
+from policy_engine import BLOCKED_REASON, DEFAULT_RULES_FILE, GUEST_REASON, RuleSet, normalize_command
+
+DEFAULT_STATE_FILE = "impfstoff_state.json"
+DEFAULT_REVIEW_FILE = "impfstoff_candidates.json"
+MIN_PATTERN_LENGTH = 6
+MAX_PATTERN_LENGTH = 200
+_SEGMENT_NAME = re.compile(r"^seg-\d{13}-(\d+)-(\d{6})\.ndjson$")
+
+
+def signature(command: Any) -> str:
+    """Command text used as counter key and rule pattern.
+
+    Uses the engine's ``normalize_command``, so a learned pattern matches
+    exactly the commands it was mined from; only the REPL prompt and
+    surrounding whitespace are stripped.
+    """
+    text = str(command or "").strip()
+    if text.startswith(">"):
+        text = text[1:].strip()
+    return normalize_command(text)[:MAX_PATTERN_LENGTH]
+
+
+def is_threat(record: Dict[str, Any]) -> bool:
+    """Denied by the policy engine on a rule (not by an outage, not merely failed)."""
+    if record.get("policy_status") != "denied":
+        return False
+    return str(record.get("result", "")).startswith((BLOCKED_REASON, GUEST_REASON))
+
+
+def denied_role(record: Dict[str, Any]) -> str:
+    """Role the command was denied for; the guest rule only ever denies guests."""
+    if str(record.get("result", "")).startswith(GUEST_REASON):
+        return "guest"
+    metadata = record.get("metadata")
+    role = metadata.get("user_role") if isinstance(metadata, dict) else None
+    return str(role) if role else "unknown"
+
+
+class ThreatCounter:
+    """Exponentially decayed counts over a bounded set of signatures.
+
+    When ``capacity`` signatures are tracked and a new one arrives, the
+    least frequent tenth is dropped, so memory stays bounded however long it runs.
+    """
+
+    def __init__(self, capacity: int = 1000, half_life: float = 86400.0):
+        self.capacity = capacity
+        self.half_life = half_life
+        self.updated_at = time.time()
+        # signature -> [count, first_seen, last_seen, roles]
+        self.entries: Dict[str, List[Any]] = {}
+
+    def decay(self, now: float) -> None:
+        elapsed = max(0.0, now - self.updated_at)
+        self.updated_at = now
+        if not elapsed or self.half_life <= 0:
+            return
+        factor = 0.5 ** (elapsed / self.half_life)
+        for sig in list(self.entries):
+            entry = self.entries[sig]
+            entry[0] *= factor
+            if entry[0] < 0.01:
+                del self.entries[sig]
+
+    def add(self, sig: str, seen_at: float, role: str = "unknown") -> None:
+        entry = self.entries.get(sig)
+        if entry is None:
+            if len(self.entries) >= self.capacity:
+                # Before inserting, so a newcomer gets a chance to recur before the next shrink
+                self._shrink()
+            self.entries[sig] = [1.0, seen_at, seen_at, [role]]
+            return
+        entry[0] += 1.0
+        entry[1] = min(entry[1], seen_at)
+        entry[2] = max(entry[2], seen_at)
+        if role not in entry[3]:
+            entry[3] = sorted(entry[3] + [role])
+
+    def _shrink(self) -> None:
+        keep = sorted(self.entries.items(), key=lambda item: item[1][0], reverse=True)
+        self.entries = dict(keep[:max(1, int(self.capacity * 0.9))])
+
+    def frequent(self, threshold: float) -> List[Tuple[str, List[Any]]]:
+        return sorted(((s, e) for s, e in self.entries.items() if e[0] >= threshold),
+                      key=lambda item: item[1][0], reverse=True)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {"updated_at": self.updated_at, "entries": self.entries}
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any], capacity: int, half_life: float) -> "ThreatCounter":
+        counter = cls(capacity, half_life)
+        counter.updated_at = data.get("updated_at", counter.updated_at)
+        # Checkpoints from before role tracking have no role list
+        counter.entries = {k: (list(v) + [["unknown"]])[:4] for k, v in data.get("entries", {}).items()}
+        if len(counter.entries) > capacity:
+            counter._shrink()
+        return counter
+
+
+class Checkpoint:
+    """Read positions per segment plus the counter state, stored as JSON."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self.segments: Dict[str, Dict[str, Any]] = {}
+        self.counter_state: Dict[str, Any] = {}
+        try:
+            with open(path, "r", encoding="utf-8") as fp:
+                data = json.load(fp)
+        except FileNotFoundError:
+            return
+        except ValueError as exc:
+            logging.error("Ignoring unreadable checkpoint %s: %s", path, exc)
+            return
+        self.segments = data.get("segments", {})
+        self.counter_state = data.get("counter", {})
+
+    def save(self, counter: ThreatCounter) -> None:
+        _atomic_write_json(self.path, {"segments": self.segments, "counter": counter.to_dict()})
+
+
+def _atomic_write_json(path: str, data: Dict[str, Any]) -> None:
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, tmp = tempfile.mkstemp(dir=directory, prefix="." + os.path.basename(path) + ".", suffix=".tmp")
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as fp:
+            json.dump(data, fp, ensure_ascii=False, indent=2)
+            fp.write("\n")
+            fp.flush()
+            os.fsync(fp.fileno())
+        os.replace(tmp, path)
+    except BaseException:
+        try:
+            os.remove(tmp)
+        except OSError:
+            pass
+        raise
+
+
+def _sealed(path: str, all_names: Iterable[str]) -> bool:
+    """A segment no longer grows once compressed or once its process opened a newer one."""
+    if path.endswith(".gz"):
+        return True
+    match = _SEGMENT_NAME.match(os.path.basename(path))
+    if match is None:
+        return False
+    pid, seq = match.groups()
+    for name in all_names:
+        other = _SEGMENT_NAME.match(name)
+        if other is not None and other.group(1) == pid and other.group(2) > seq:
+            return True
+    return False
+
+
+def next_version(current: Optional[str], today: Optional[str] = None) -> str:
+    """``YYYY-MM-DD.N``: increments N on the same day, starts at 1 on a new day."""
+    today = today or datetime.now(timezone.utc).strftime("%Y-%m-%d")
+    if current and current.startswith(today + "."):
+        suffix = current[len(today) + 1:]
+        if suffix.isdigit():
+            return f"{today}.{int(suffix) + 1}"
+    return f"{today}.1"
+
+
+class Impfstoff:
+    """One incremental mining run over a flight-record directory."""
+
+    def __init__(self, records_dir: str, rules_file: str, state_file: str, threshold: float = 20.0,
+                 capacity: int = 1000, half_life: float = 86400.0, review_file: str = DEFAULT_REVIEW_FILE):
+        self.records_dir = records_dir
+        self.rules_file = rules_file
+        self.review_file = review_file
+        self.threshold = threshold
+        self.checkpoint = Checkpoint(state_file)
+        self.counter = ThreatCounter.from_dict(self.checkpoint.counter_state, capacity, half_life)
+
+    def ingest(self) -> Dict[str, int]:
+        """Consumes all records written since the last checkpoint."""
+        segments = recorder_storage.list_segments(self.records_dir)
+        names = [os.path.basename(p) for p in segments]
+        known: Dict[str, Dict[str, Any]] = {}
+        stats = {"records": 0, "threats": 0, "segments_read": 0}
+        self.counter.decay(time.time())
+
+        for path in segments:
+            base = recorder_storage.segment_base(path)
+            position = self.checkpoint.segments.get(base, {"block": 0, "line": 0})
+            known[base] = position
+            if position.get("done"):
+                continue
+            sealed = _sealed(path, names)
+            block, line = position["block"], position["line"]
+            read = False
+            for block, line, record in recorder_storage.scan_segment(path, position["block"], position["line"]):
+                read = True
+                line += 1
+                stats["records"] += 1
+                if is_threat(record):
+                    sig = signature(record.get("command"))
+                    if sig:
+                        stats["threats"] += 1
+                        seen = recorder_storage.parse_timestamp(record.get("timestamp")) or time.time()
+                        self.counter.add(sig, seen, denied_role(record))
+            stats["segments_read"] += read
+            known[base] = {"block": block, "line": line, "done": sealed}
+
+        # Forget segments that were deleted (retention)
+        self.checkpoint.segments = known
+        return stats
+
+    def candidates(self, rules: RuleSet) -> List[Dict[str, Any]]:
+        """Frequent threat signatures that the current rules do not block for every role yet.
+
+        ``roles`` lists the roles the command was denied for; a candidate
+        denied only for guests would, once approved, also block every other role.
+        """
+        found = []
+        for sig, (count, first_seen, last_seen, roles) in self.counter.frequent(self.threshold):
+            if len(sig) < MIN_PATTERN_LENGTH or rules.blocked.first(sig) is not None:
+                continue
+            found.append({
+                "pattern": sig,
+                "count": round(count, 1),
+                "roles": roles,
+                "first_seen": _iso(first_seen),
+                "last_seen": _iso(last_seen),
+                "source": "impfstoff",
+            })
+        return found
+
+    def run(self, dry_run: bool = False) -> Dict[str, Any]:
+        """Ingests new records and writes the current candidates to the review file."""
+        stats = self.ingest()
+        rules = self._load_rules()
+        found = self.candidates(rules)
+        if not dry_run:
+            _atomic_write_json(self.review_file, {"rules_version": rules.version, "candidates": found})
+            self.checkpoint.save(self.counter)
+        return dict(stats, candidates=found, rules_version=rules.version, tracked=len(self.counter.entries))
+
+    def approve(self, patterns: Iterable[str], all_roles: bool = False) -> Dict[str, Any]:
+        """Adds reviewed candidates from the review file to ``learned_patterns``, with a new rule version.
+
+        Learned patterns block every role. Candidates denied only for guests
+        are widened by that and need ``all_roles=True``.
+        """
+        try:
+            with open(self.review_file, "r", encoding="utf-8") as fp:
+                review = json.load(fp)
+        except FileNotFoundError:
+            review = {}
+        pending = {c["pattern"]: c for c in review.get("candidates", [])}
+        wanted = [signature(p) for p in patterns]
+        unknown = [p for p in wanted if p not in pending]
+        if unknown:
+            raise ValueError(f"Not in the review file {self.review_file}: {', '.join(unknown)}")
+
+        rules = self._load_rules()
+        approved = [pending[p] for p in dict.fromkeys(wanted) if rules.blocked.first(p) is None]
+        widened = [c["pattern"] for c in approved if set(c.get("roles") or ["unknown"]) <= {"guest"}]
+        if widened and not all_roles:
+            raise ValueError(f"Only denied for guests so far, approving blocks every role "
+                             f"(confirm with --all-roles): {', '.join(widened)}")
+        version = rules.version
+        if approved:
+            data = rules.to_dict()
+            data["learned_patterns"] = rules.learned_patterns + approved
+            data["version"] = next_version(rules.declared_version)
+            version = RuleSet.from_dict(data).version
+            _atomic_write_json(self.rules_file, data)
+            logging.info("Rules version %s: %d learned pattern(s) approved", version, len(approved))
+            review["candidates"] = [c for c in pending.values() if c not in approved]
+            _atomic_write_json(self.review_file, review)
+        return {"approved": approved, "rules_version": version}
+
+    def _load_rules(self) -> RuleSet:
+        try:
+            with open(self.rules_file, "r", encoding="utf-8") as fp:
+                return RuleSet.from_dict(json.load(fp), source=self.rules_file)
+        except FileNotFoundError:
+            return RuleSet.from_dict({}, source=self.rules_file)
+
+
+def _iso(epoch: float) -> str:
+    return datetime.fromtimestamp(epoch, timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ")
+
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Mine flight records for recurring threats and propose policy rules.")
+    parser.add_argument("--records", default=os.environ.get("FLIGHT_RECORDER_DIR", "flight_records"),
+                        help="flight-recorder segment directory")
+    parser.add_argument("--rules", default=os.environ.get("POLICY_RULES_FILE", DEFAULT_RULES_FILE),
+                        help="policy rule file to check candidates against and extend on --approve")
+    parser.add_argument("--state", default=os.environ.get("IMPFSTOFF_STATE", DEFAULT_STATE_FILE),
+                        help="checkpoint file (read positions and counters)")
+    parser.add_argument("--review", default=os.environ.get("IMPFSTOFF_REVIEW", DEFAULT_REVIEW_FILE),
+                        help="file the candidates are written to for review")
+    parser.add_argument("--threshold", type=float, default=float(os.environ.get("IMPFSTOFF_THRESHOLD", 20)),
+                        help="decayed occurrences before a command becomes a candidate")
+    parser.add_argument("--half-life", type=float, default=float(os.environ.get("IMPFSTOFF_HALF_LIFE", 86400)),
+                        help="seconds after which counts are halved")
+    parser.add_argument("--capacity", type=int, default=int(os.environ.get("IMPFSTOFF_CAPACITY", 1000)),
+                        help="maximum number of tracked command signatures")
+    parser.add_argument("--dry-run", action="store_true", help="report candidates without writing anything")
+    parser.add_argument("--approve", metavar="PATTERN", action="append", default=[],
+                        help="add a reviewed candidate to the rule file (repeatable); no mining run")
+    parser.add_argument("--all-roles", action="store_true",
+                        help="confirm that candidates denied only for guests are blocked for every role")
+    return parser.parse_args(argv)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+    args = parse_args(argv)
+    miner = Impfstoff(args.records, args.rules, args.state, args.threshold, args.capacity, args.half_life,
+                      args.review)
+    if args.approve:
+        try:
+            report = miner.approve(args.approve, all_roles=args.all_roles)
+        except ValueError as exc:
+            logging.error("%s", exc)
+            return 1
+    else:
+        report = miner.run(dry_run=args.dry_run)
+    json.dump(report, sys.stdout, ensure_ascii=False, indent=2)
+    sys.stdout.write("\n")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
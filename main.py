@@ -1,139 +1,431 @@
+import argparse
 import asyncio
 import logging
-import json
 import os
 import sys
-from threading import Thread
-from typing import Dict, Any
+from threading import Lock, Thread
+from typing import Dict, Any, List, Optional, TextIO
 from datetime import datetime
 
-import aiohttp
-from flask import Flask, jsonify, request
 from command_processor import CommandProcessor
 from config import Configuration
+import metrics
+import pipeline
+import tracing
 
 # Logging-Konfiguration
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 
-# Flask-App für das Web-Interface
-app = Flask(__name__)
-
 # Globale Variable für den Prozessor, damit der Web-Endpunkt darauf zugreifen kann
 processor: CommandProcessor
 
-@app.route('/command', methods=['POST'])
-async def handle_command():
-    """Nimmt Befehle über einen Web-Endpunkt entgegen."""
-    data = request.json
-    if not data or 'command' not in data:
-        return jsonify({"status": "error", "result": "Kein Befehl angegeben."}), 400
-    
-    raw_command = data['command']
-    result = await processor.process(raw_command)
-    return jsonify(result)
+_web_app = None
+
+# Die langlebige Event-Loop, auf der ``processor`` läuft (siehe _processor_loop)
+_loop: Optional[asyncio.AbstractEventLoop] = None
+_loop_lock = Lock()
+
+FLASK_CONTEXT = {"user_role": "web_user", "user_id": "web"}
+
+def _processor_loop() -> asyncio.AbstractEventLoop:
+    """Die Event-Loop, auf der ``processor`` dauerhaft läuft.
+
+    In der REPL ist das die Loop von ``main_loop``. Ohne sie (``main.app`` unter
+    einem WSGI-Server, Tests) startet beim ersten Aufruf eine eigene Loop in
+    einem Hintergrund-Thread.
+    """
+    global _loop
+    with _loop_lock:
+        if _loop is None or _loop.is_closed():
+            _loop = asyncio.new_event_loop()
+            Thread(target=_loop.run_forever, name='processor-loop', daemon=True).start()
+        return _loop
+
+
+def _on_processor_loop(coro: Any) -> Any:
+    """Führt eine Coroutine aus einem Flask-Thread auf der Loop des Prozessors aus und wartet darauf."""
+    return asyncio.run_coroutine_threadsafe(coro, _processor_loop()).result()
+
+
+def create_web_app():
+    """Erzeugt die Flask-App für das Web-Interface (``[Web] server = flask``).
+
+    Flask wird erst hier importiert, damit ``cli-app --no-web`` und der
+    Skript-Modus ohne Flask starten. Für den Produktivbetrieb ist der
+    aiohttp-Server in ``web_server.py`` vorgesehen. Die Request-Threads von
+    Flask reichen jeden Befehl an die eine Loop des Prozessors weiter: dessen
+    Timer, Health-Probes und Hintergrund-Tasks hängen an dieser Loop und
+    dürfen nicht mit einer kurzlebigen Loop pro Request verschwinden.
+    """
+    from flask import Flask, jsonify, request
+
+    web_app = Flask(__name__)
+    metrics.instrument_flask(web_app, "cli_web")
+
+    @web_app.route('/command', methods=['POST'])
+    def handle_command():
+        """Nimmt Befehle über einen Web-Endpunkt entgegen."""
+        data = request.json
+        if not data or 'command' not in data:
+            return jsonify({"status": "error", "result": "Kein Befehl angegeben."}), 400
+
+        result = _on_processor_loop(execute_command(processor, data['command'], context=FLASK_CONTEXT, source="web"))
+        return jsonify(result)
+
+    @web_app.route('/command/batch', methods=['POST'])
+    def handle_command_batch():
+        """Nimmt mehrere Befehle entgegen und verarbeitet sie nebenläufig."""
+        data = request.json
+        if not data or not isinstance(data.get('commands'), list):
+            return jsonify({"status": "error", "result": "Keine Befehlsliste angegeben."}), 400
+
+        results = _on_processor_loop(processor.process_many(
+            data['commands'],
+            concurrency=data.get('concurrency'),
+            handler=lambda c: execute_command(processor, c, context=FLASK_CONTEXT, source="web"),
+        ))
+        return jsonify({"status": "success", "results": results})
+
+    return web_app
+
+def __getattr__(name: str):
+    # Rückwärtskompatibel: ``main.app`` erzeugt die Flask-App beim ersten Zugriff
+    global _web_app
+    if name == 'app':
+        if _web_app is None:
+            _web_app = create_web_app()
+        return _web_app
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
-def run_web_interface():
+def run_web_interface(host: str = '127.0.0.1', port: int = 5001):
     """Startet das Flask-Web-Interface in einem separaten Thread."""
     try:
         log = logging.getLogger('werkzeug')
         log.setLevel(logging.ERROR)
-        app.run(port=5001, host='127.0.0.1')
+        __getattr__('app').run(port=port, host=host, threaded=True)
     except OSError as e:
         logging.error(f"Fehler beim Starten des Web-Interface: {e}")
 
-async def main_loop(proc: CommandProcessor):
-    """Hauptschleife für die interaktive CLI."""
+BUILTIN_COMMANDS = ('exit', 'status')
+
+
+def make_completer(proc: CommandProcessor):
+    """readline-Completer für Befehlsnamen (vor dem ersten ':')."""
+    matches: List[str] = []
+
+    def complete(text: str, state: int):
+        nonlocal matches
+        if state == 0:
+            candidates = proc.complete(text)
+            candidates += [b for b in BUILTIN_COMMANDS if b.startswith(text.lower())]
+            matches = [c + ':' if c not in BUILTIN_COMMANDS else c for c in candidates]
+        return matches[state] if state < len(matches) else None
+
+    return complete
+
+
+def setup_completion(proc: CommandProcessor) -> bool:
+    """Aktiviert Tab-Vervollständigung, sofern ``readline`` verfügbar ist."""
+    try:
+        import readline
+    except ImportError:
+        return False
+    readline.set_completer(make_completer(proc))
+    # Nur der Befehlsname wird vervollständigt, nicht der Wert nach ':'
+    readline.set_completer_delims(' \t\n:>')
+    if 'libedit' in (readline.__doc__ or ''):
+        readline.parse_and_bind('bind ^I rl_complete')
+    else:
+        readline.parse_and_bind('tab: complete')
+    return True
+
+
+async def main_loop(proc: CommandProcessor, web_config: Any = None):
+    """Hauptschleife für die interaktive CLI.
+
+    Mit ``web_config`` läuft das Web-Interface auf derselben Event-Loop
+    (aiohttp) bzw. reicht seine Befehle an sie weiter (Flask).
+    """
+    global _loop
     print("Willkommen zur interaktiven CLI-Anwendung.")
     print("Geben Sie 'Hilfe' für eine Befehlsübersicht ein.")
+    setup_completion(proc)
+    # Versand-Task an diese Loop binden, bevor Web-Requests Einträge liefern
+    proc.recorder.start()
+    with _loop_lock:
+        _loop = asyncio.get_running_loop()
 
-    while True:
+    web_runner = None
+    if web_config is not None and getattr(web_config, 'web_server', 'aiohttp') == 'flask':
+        Thread(target=run_web_interface, args=(web_config.web_host, web_config.web_port), daemon=True).start()
+        logging.info(f"Web-Interface (Flask) gestartet auf http://{web_config.web_host}:{web_config.web_port}")
+    elif web_config is not None:
+        import web_server
         try:
-            user_input = await asyncio.to_thread(input, '> ')
+            web_runner = await web_server.start(proc, web_config)
+        except OSError as e:
+            logging.error(f"Fehler beim Starten des Web-Interface: {e}")
+
+    try:
+        while True:
+            try:
+                user_input = await asyncio.to_thread(input, '> ')
             
-            cleaned_input = user_input.strip()
-            if cleaned_input.startswith('>'):
-                cleaned_input = cleaned_input[1:].strip()
+                cleaned_input = user_input.strip()
+                if cleaned_input.startswith('>'):
+                    cleaned_input = cleaned_input[1:].strip()
 
-            if not cleaned_input:
-                continue
+                if not cleaned_input:
+                    continue
             
-            if cleaned_input.lower() == 'exit':
-                print("Anwendung wird beendet.")
+                if cleaned_input.lower() == 'exit':
+                    print("Anwendung wird beendet.")
+                    break
+
+                if cleaned_input.lower() == 'status':
+                    print(format_status(proc))
+                    continue
+
+                if proc.is_pipeline(cleaned_input):
+                    await stream_command(proc, cleaned_input)
+                    continue
+
+                result = await execute_command(proc, cleaned_input)
+                print_result(result)
+            except KeyboardInterrupt:
+                print("\nAnwendung wird beendet.")
                 break
+            except Exception as e:
+                logging.error(f"Ein unerwarteter Fehler ist aufgetreten: {e}", exc_info=True)
+                print(f"Ein unerwarteter Fehler ist aufgetreten: {e}")
+    finally:
+        if web_runner is not None:
+            await web_runner.cleanup()
+        # Connection-Pool auf derselben Loop schließen, auf der er benutzt wurde
+        await proc.close()
 
-            policy_ok, policy_data = await check_policy(cleaned_input, proc)
-            if not policy_ok:
-                reason = policy_data.get('reason', 'Policy check failed')
-                await log_flight_record(proc, cleaned_input, 'denied', reason)
-                print(f"Fehler: {reason}")
-                continue
-
-            result: Dict[str, str] = await proc.process(cleaned_input)
-            await log_flight_record(
-                proc,
-                cleaned_input,
-                policy_data.get('policy_status', 'approved'),
-                result.get('result', ''),
-            )
-
-            if result.get('status') == 'success':
-                print(result.get('result', ''))
-            else:
-                print(f"Fehler: {result.get('result', 'Unbekannter Fehler')}")
+SPECULATIONS = metrics.counter(
+    "cli_speculative_executions_total", "Spekulativ ausgeführte Befehle je Ausgang", ("outcome",))
 
-        except KeyboardInterrupt:
-            print("\nAnwendung wird beendet.")
-            break
-        except Exception as e:
-            logging.error(f"Ein unerwarteter Fehler ist aufgetreten: {e}", exc_info=True)
-            print(f"Ein unerwarteter Fehler ist aufgetreten: {e}")
-
-async def check_policy(command: str, proc: CommandProcessor) -> (bool, Dict[str, Any]):
-    config = proc.config
-    url = getattr(config, 'policy_url', None)
-    if not url:
-        return True, {"policy_status": "skipped", "reason": "Policy URL not set"}
-
-    payload = {
-        "command": command,
-        "context": {
-            "user_role": "cli_user",
-            "user_id": "local_cli",
-        },
-    }
+CLI_CONTEXT = {
+    "user_role": "cli_user",
+    "user_id": "local_cli",
+}
+
+
+async def check_policy(command: str, proc: CommandProcessor,
+                       context: Optional[Dict[str, Any]] = None) -> (bool, Dict[str, Any]):
+    """Fragt die Policy; ist der Service nicht erreichbar, gilt der Fail-Modus der Befehlsklasse."""
+    allowed, data = await proc.policy.check(command, context or CLI_CONTEXT)
+    if data.get('policy_status') == 'unavailable' and proc.policy.fails_open(proc.is_read_only(command)):
+        return True, dict(data, policy_status='fail-open')
+    return allowed, data
+
+
+async def execute_command(proc: CommandProcessor, command: str, context: Optional[Dict[str, Any]] = None,
+                          source: str = "cli-app") -> Dict[str, str]:
+    """Führt einen Befehl mit Policy-Check und Flight-Record aus (REPL, Skripte und Web-Interface).
+
+    Jeder Aufruf ist ein eigener Trace: die Trace-ID geht im Kontext an den
+    Policy-Service, die Stufendauern landen im Flight-Record.
+
+    Seiteneffektfreie Befehle (``read_only``) laufen spekulativ schon während
+    des Policy-Checks (``[Processor] speculative``), sofern dieser wirklich
+    auf den Policy-Service wartet; ihr Ergebnis wird erst nach der Freigabe
+    ausgeliefert und bei Ablehnung verworfen. Kommt die Entscheidung aus dem
+    Cache oder der lokalen Engine, lohnt sich das nicht. Alle anderen
+    Befehle starten erst nach der Freigabe.
+    """
+    with tracing.start() as trace:
+        context = dict(context or CLI_CONTEXT, trace_id=trace.trace_id, session_id=trace.session_id)
+        speculation = None
+        if (getattr(proc.config, 'processor_speculative', True) and proc.is_read_only(command)
+                and proc.policy.needs_remote(command, context)):
+            speculation = asyncio.ensure_future(proc.process(command, speculative=True))
+        try:
+            with tracing.span("policy"):
+                policy_ok, policy_data = await check_policy(command, proc, context)
+        except BaseException:
+            if speculation is not None:
+                speculation.cancel()
+            raise
+
+        if not policy_ok:
+            if speculation is not None:
+                await _discard(speculation)
+            reason = policy_data.get('reason', 'Policy check failed')
+            log_flight_record(proc, command, policy_data.get('policy_status', 'denied'), reason, source,
+                              speculative=speculation is not None, context=context)
+            return {"status": "error", "result": reason}
+
+        if speculation is not None:
+            SPECULATIONS.inc("used")
+            result: Dict[str, str] = await speculation
+        else:
+            result = await proc.process(command)
+        log_flight_record(
+            proc,
+            command,
+            policy_data.get('policy_status', 'approved'),
+            result.get('result', ''),
+            source,
+            speculative=speculation is not None,
+            context=context,
+        )
+        return result
+
+
+async def stream_command(proc: CommandProcessor, command: str, out: TextIO = sys.stdout,
+                         context: Optional[Dict[str, Any]] = None, source: str = "cli-app") -> bool:
+    """Führt eine Pipeline mit Policy-Check aus und schreibt ihre Ausgabe, sobald sie entsteht.
+
+    Die Ausgabe geht nicht in den Flight-Record, nur Umfang und Status;
+    Rückgabewert ist True bei Erfolg.
+    """
+    with tracing.start() as trace:
+        context = dict(context or CLI_CONTEXT, trace_id=trace.trace_id, session_id=trace.session_id)
+        with tracing.span("policy"):
+            policy_ok, policy_data = await check_policy(command, proc, context)
+        if not policy_ok:
+            reason = policy_data.get('reason', 'Policy check failed')
+            log_flight_record(proc, command, policy_data.get('policy_status', 'denied'), reason, source,
+                              context=context)
+            print(f"Fehler: {reason}", file=out)
+            return False
+
+        chunks = chars = 0
+        ends_with_newline = True
+        error = None
+        with tracing.span("execute"):
+            try:
+                async for chunk in proc.process_stream(command):
+                    out.write(chunk)
+                    out.flush()
+                    chunks += 1
+                    chars += len(chunk)
+                    if chunk:
+                        ends_with_newline = chunk.endswith('\n')
+            except pipeline.PipelineError as e:
+                error = str(e)
+            except Exception as e:
+                error = f"Fehler beim Ausführen der Pipeline: {e}"
+        if not ends_with_newline:
+            out.write('\n')
+        if error is not None:
+            print(f"Fehler: {error}", file=out)
+        summary = error if error is not None else f"Pipeline: {chunks} Abschnitt(e), {chars} Zeichen ausgegeben"
+        log_flight_record(proc, command, policy_data.get('policy_status', 'approved'), summary, source,
+                          context=context)
+        return error is None
+
+
+async def _discard(speculation: "asyncio.Future") -> None:
+    """Verwirft ein spekulativ berechnetes Ergebnis nach einer Ablehnung."""
+    SPECULATIONS.inc("discarded")
+    speculation.cancel()
     try:
-        async with aiohttp.ClientSession() as session:
-            async with session.post(url, json=payload, timeout=5) as resp:
-                data = await resp.json()
-                return data.get('policy_status') == 'approved', data
+        await speculation
+    except asyncio.CancelledError:
+        pass
     except Exception as exc:
-        logging.error("Policy check failed: %s", exc)
-        return False, {"policy_status": "error", "reason": str(exc)}
-
-
-async def log_flight_record(proc: CommandProcessor, command: str, policy_status: str, result: str) -> None:
-    entry = {
-        "timestamp": datetime.utcnow().isoformat() + "Z",
-        "command": command,
-        "policy_status": policy_status,
-        "result": result,
-        "metadata": {"source": "cli-app"},
-    }
-    with open("flight_recorder.log", "a", encoding="utf-8") as fp:
-        fp.write(json.dumps(entry) + "\n")
-
-    url = getattr(proc.config, 'flight_recorder_url', None)
-    if not url:
-        return
+        logging.debug("Verworfene Spekulation schlug fehl: %s", exc)
+
+
+def print_result(result: Dict[str, str]) -> None:
+    if result.get('status') == 'success':
+        print(result.get('result', ''))
+    else:
+        print(f"Fehler: {result.get('result', 'Unbekannter Fehler')}")
+
+
+async def run_script(proc: CommandProcessor, lines: List[str]) -> int:
+    """Führt Befehle aus einem Skript nebenläufig aus und gibt die Ergebnisse in Eingabereihenfolge aus.
+
+    Leere Zeilen und Kommentare (``#``) werden übersprungen. Rückgabewert ist
+    der Exit-Code: 1, wenn mindestens ein Befehl fehlgeschlagen ist.
+    """
+    script_commands = []
+    for line in lines:
+        cleaned = line.strip()
+        if cleaned.startswith('>'):
+            cleaned = cleaned[1:].strip()
+        if cleaned and not cleaned.startswith('#'):
+            script_commands.append(cleaned)
+
     try:
-        async with aiohttp.ClientSession() as session:
-            await session.post(url, json=entry, timeout=5)
-    except Exception as exc:
-        logging.error("Flight recorder push failed: %s", exc)
+        results = await proc.process_many(script_commands, handler=lambda c: execute_command(proc, c))
+    finally:
+        await proc.close()
+
+    for result in results:
+        print_result(result)
+    return 0 if all(r.get('status') == 'success' for r in results) else 1
+
+
+def format_status(proc: CommandProcessor) -> str:
+    """Formatiert die Laufzeitstatistiken des Prozessors für die CLI."""
+    lines = ["Status:"]
+    for section, values in proc.status().items():
+        details = ", ".join(f"{k}={v}" for k, v in values.items())
+        lines.append(f"- {section}: {details}")
+    return "\n".join(lines)
+
+
+def log_flight_record(proc: CommandProcessor, command: str, policy_status: str, result: str,
+                      source: str = "cli-app", speculative: bool = False,
+                      context: Optional[Dict[str, Any]] = None) -> None:
+    """Reiht einen Flight-Record zum Hintergrund-Versand ein, ohne auf I/O zu warten.
 
-def run():
+    ``policy_status`` ist der Status des Policy-Checks (``denied`` nur bei
+    einer Regelentscheidung, ``unavailable`` bei Ausfall des Service); die
+    Rolle aus dem Kontext steht unter ``metadata.user_role``. Läuft ein
+    Trace, kommen dessen ID und Stufendauern unter ``metadata.trace`` mit.
+    Die Stufe ``record`` selbst kann nicht mehr im eigenen Eintrag stehen;
+    sie erscheint nur in ``cli_stage_duration_seconds``.
+    """
+    with tracing.span("record"):
+        metadata: Dict[str, Any] = {"source": source}
+        if context is not None:
+            # Wie policy_engine: ohne Rolle gilt der Aufrufer als Gast
+            metadata["user_role"] = context.get("user_role", "guest")
+        if speculative:
+            metadata["speculative"] = True
+        trace = tracing.current()
+        if trace is not None:
+            metadata["trace"] = trace.to_dict()
+        entry = {
+            "timestamp": datetime.utcnow().isoformat() + "Z",
+            "command": command,
+            "policy_status": policy_status,
+            "result": result,
+            "metadata": metadata,
+        }
+        proc.recorder.submit(entry)
+
+def parse_args(argv=None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(prog='cli-app', description='Interaktive, erweiterbare Kommandozeilenanwendung.')
+    parser.add_argument(
+        '--script',
+        metavar='DATEI',
+        help="Befehle zeilenweise aus DATEI (oder '-' für stdin) nebenläufig ausführen statt interaktiv.",
+    )
+    parser.add_argument(
+        '--no-web',
+        action='store_true',
+        help='Web-Interface nicht starten (aiohttp bzw. Flask werden dann nicht geladen).',
+    )
+    parser.add_argument(
+        '--serve',
+        action='store_true',
+        help='Nur das Web-Interface betreiben (ohne interaktive Eingabe).',
+    )
+    return parser.parse_args(argv)
+
+def run(argv=None):
     """Startet die Anwendung."""
     global processor
+
+    args = parse_args(argv)
     
     # Ermitteln des absoluten Pfads zur config.ini, die sich im selben Verzeichnis wie main.py befindet
     try:
@@ -145,13 +437,32 @@ def run():
 
     config = Configuration(config_path)
     processor = CommandProcessor(config)
+
+    if args.script:
+        # Nicht-interaktiver Modus: kein Web-Interface, Exit-Code aus den Ergebnissen
+        if args.script == '-':
+            lines = sys.stdin.read().splitlines()
+        else:
+            with open(args.script, 'r', encoding='utf-8') as fp:
+                lines = fp.read().splitlines()
+        sys.exit(asyncio.run(run_script(processor, lines)))
     
-    web_thread = Thread(target=run_web_interface, daemon=True)
-    web_thread.start()
-    logging.info(f"Web-Interface gestartet auf http://127.0.0.1:5001")
+    web_mode = getattr(config, 'web_server', 'aiohttp')
+    if args.serve:
+        # Nur Web-Interface, ohne REPL
+        import web_server
+        try:
+            asyncio.run(web_server.serve(processor, config))
+        except KeyboardInterrupt:
+            logging.info("Web-Interface beendet.")
+        sys.exit(0)
+
+    web_config = None
+    if not args.no_web and web_mode != 'none':
+        web_config = config
 
     try:
-        asyncio.run(main_loop(processor))
+        asyncio.run(main_loop(processor, web_config))
     except KeyboardInterrupt:
         logging.info("Anwendung durch Benutzer beendet.")
     finally:
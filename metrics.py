@@ -0,0 +1,295 @@
+"""Process-wide metrics in the Prometheus text format.
+
+Counters, gauges and histograms are created once at import time and
+recorded on the hot path: one dict lookup and a short, uncontended lock per
+update. Gauges for values that already exist elsewhere (queue depth, pool
+size) take a callback that is only evaluated when ``/metrics`` is scraped.
+
+    CHECKS = metrics.counter("policy_checks_total", "Policy checks", ("status",))
+    LATENCY = metrics.histogram("policy_check_duration_seconds", "Check latency", ("status",))
+
+    CHECKS.inc("approved")
+    LATENCY.observe(0.0012, "approved")
+
+Every service serves ``metrics.render()`` with ``CONTENT_TYPE`` on ``/metrics``.
+"""
+import bisect
+import logging
+import math
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# Seconds; fine-grained at the low end because most commands finish in well under a millisecond
+LATENCY_BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025,
+                   0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+SIZE_BUCKETS = (1, 2, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000)
+# Label combinations per metric whose normalized key is remembered (label sets are small by design)
+MAX_KEY_CACHE = 1024
+
+Labels = Tuple[str, ...]
+
+
+def _format_value(value: float) -> str:
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    if math.isnan(value):
+        return "NaN"
+    if float(value).is_integer() and abs(value) < 1e15:
+        return str(int(value))
+    return repr(float(value))
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    parts = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+class _Metric:
+    kind = "untyped"
+
+    def __init__(self, name: str, help: str, labels: Sequence[str] = ()):
+        self.name = name
+        self.help = help
+        self.labels = tuple(labels)
+        self._lock = threading.Lock()
+        self._keys: Dict[Labels, Labels] = {}
+
+    def _key(self, values: Sequence[Any]) -> Labels:
+        # Hot path: the same few string label combinations over and over
+        key = self._keys.get(values)
+        if key is not None:
+            return key
+        if len(values) != len(self.labels):
+            raise ValueError(f"{self.name} expects labels {self.labels}, got {tuple(values)}")
+        key = tuple(str(v) for v in values)
+        # Only all-string tuples are remembered, so 1 and True never share an entry
+        if key == values and len(self._keys) < MAX_KEY_CACHE:
+            self._keys[key] = key
+        return key
+
+    def samples(self) -> Iterator[Tuple[str, str, float]]:
+        """``(name suffix, formatted labels, value)`` for rendering."""
+        raise NotImplementedError
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {_escape(self.help)}", f"# TYPE {self.name} {self.kind}"]
+        lines.extend(f"{self.name}{suffix}{labels} {_format_value(value)}" for suffix, labels, value in self.samples())
+        return lines
+
+
+class Counter(_Metric):
+    """Monotonically increasing count per label combination."""
+    kind = "counter"
+
+    def __init__(self, name: str, help: str, labels: Sequence[str] = ()):
+        super().__init__(name, help, labels)
+        self._values: Dict[Labels, float] = {}
+
+    def inc(self, *labels: Any, amount: float = 1.0) -> None:
+        if amount < 0:
+            raise ValueError("Counters can only increase")
+        key = self._keys.get(labels) or self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def value(self, *labels: Any) -> float:
+        return self._values.get(self._key(labels), 0.0)
+
+    def samples(self):
+        with self._lock:
+            items = sorted(self._values.items())
+        for key, value in items:
+            yield "", _format_labels(self.labels, key), value
+
+
+class Gauge(_Metric):
+    """Current value per label combination, set directly or read from a callback at scrape time."""
+    kind = "gauge"
+
+    def __init__(self, name: str, help: str, labels: Sequence[str] = ()):
+        super().__init__(name, help, labels)
+        self._values: Dict[Labels, float] = {}
+        self._function: Optional[Callable[[], Any]] = None
+
+    def set(self, value: float, *labels: Any) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = float(value)
+
+    def inc(self, *labels: Any, amount: float = 1.0) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def dec(self, *labels: Any, amount: float = 1.0) -> None:
+        self.inc(*labels, amount=-amount)
+
+    def set_function(self, function: Optional[Callable[[], Any]]) -> None:
+        """``function()`` returns the value, or ``{label values: value}`` for a labelled gauge."""
+        self._function = function
+
+    def _collect(self) -> Dict[Labels, float]:
+        with self._lock:
+            values = dict(self._values)
+        if self._function is None:
+            return values
+        try:
+            result = self._function()
+        except Exception as exc:
+            logging.debug("Gauge %s callback failed: %s", self.name, exc)
+            return values
+        if isinstance(result, dict):
+            for key, value in result.items():
+                values[self._key(key if isinstance(key, tuple) else (key,))] = float(value)
+        elif result is not None:
+            values[()] = float(result)
+        return values
+
+    def value(self, *labels: Any) -> float:
+        return self._collect().get(self._key(labels), 0.0)
+
+    def samples(self):
+        for key, value in sorted(self._collect().items()):
+            yield "", _format_labels(self.labels, key), value
+
+
+class Histogram(_Metric):
+    """Observations counted into cumulative buckets, plus their sum and count."""
+    kind = "histogram"
+
+    def __init__(self, name: str, help: str, labels: Sequence[str] = (), buckets: Sequence[float] = LATENCY_BUCKETS):
+        super().__init__(name, help, labels)
+        if "le" in self.labels:
+            raise ValueError("'le' is reserved for histogram buckets")
+        self.buckets = tuple(sorted(float(b) for b in buckets))
+        # label values -> [per-bucket counts (+Inf last), sum]
+        self._values: Dict[Labels, List[Any]] = {}
+
+    def observe(self, value: float, *labels: Any) -> None:
+        key = self._keys.get(labels) or self._key(labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            entry = self._values.get(key)
+            if entry is None:
+                entry = self._values[key] = [[0] * (len(self.buckets) + 1), 0.0]
+            entry[0][index] += 1
+            entry[1] += value
+
+    def observe_many(self, observations: Iterable[Tuple[float, Sequence[Any]]]) -> None:
+        """Records several ``(value, label values)`` observations under one lock acquisition."""
+        # Once per traced command: no intermediate list, cached label keys looked up without a call
+        buckets, keys, entries, bisect_left = self.buckets, self._keys, self._values, bisect.bisect_left
+        with self._lock:
+            for value, labels in observations:
+                key = keys.get(labels) or self._key(labels)
+                entry = entries.get(key)
+                if entry is None:
+                    entry = entries[key] = [[0] * (len(buckets) + 1), 0.0]
+                entry[0][bisect_left(buckets, value)] += 1
+                entry[1] += value
+
+    @contextmanager
+    def time(self, *labels: Any) -> Iterator[None]:
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started, *labels)
+
+    def count(self, *labels: Any) -> int:
+        entry = self._values.get(self._key(labels))
+        return sum(entry[0]) if entry else 0
+
+    def samples(self):
+        with self._lock:
+            items = sorted((key, (list(counts), total)) for key, (counts, total) in self._values.items())
+        bounds = [_format_value(b) for b in self.buckets] + ["+Inf"]
+        for key, (counts, total) in items:
+            cumulative = 0
+            for bound, count in zip(bounds, counts):
+                cumulative += count
+                yield "_bucket", _format_labels(self.labels, key, f'le="{bound}"'), cumulative
+            labels = _format_labels(self.labels, key)
+            yield "_sum", labels, total
+            yield "_count", labels, cumulative
+
+
+class Registry:
+    """Named metrics of one process; creating a metric twice returns the existing one."""
+
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+        self._lock = threading.Lock()
+
+    def _register(self, cls, name: str, *args, **kwargs) -> Any:
+        with self._lock:
+            existing = self._metrics.get(name)
+            if existing is not None:
+                if not isinstance(existing, cls):
+                    raise ValueError(f"Metric {name} already registered as {existing.kind}")
+                return existing
+            metric = self._metrics[name] = cls(name, *args, **kwargs)
+            return metric
+
+    def counter(self, name: str, help: str, labels: Sequence[str] = ()) -> Counter:
+        return self._register(Counter, name, help, labels)
+
+    def gauge(self, name: str, help: str, labels: Sequence[str] = ()) -> Gauge:
+        return self._register(Gauge, name, help, labels)
+
+    def histogram(self, name: str, help: str, labels: Sequence[str] = (),
+                  buckets: Sequence[float] = LATENCY_BUCKETS) -> Histogram:
+        return self._register(Histogram, name, help, labels, buckets)
+
+    def get(self, name: str) -> Optional[_Metric]:
+        return self._metrics.get(name)
+
+    def render(self) -> str:
+        with self._lock:
+            metrics = sorted(self._metrics.values(), key=lambda m: m.name)
+        lines: List[str] = []
+        for metric in metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+counter = REGISTRY.counter
+gauge = REGISTRY.gauge
+histogram = REGISTRY.histogram
+render = REGISTRY.render
+
+
+def instrument_flask(app, prefix: str, registry: Registry = REGISTRY) -> None:
+    """Times every request of a Flask app per route and serves ``/metrics`` on it."""
+    from flask import Response, g, request
+
+    duration = registry.histogram(f"{prefix}_http_request_duration_seconds",
+                                  "HTTP handler time per route, method and status", ("route", "method", "status"))
+
+    @app.before_request
+    def _start_timer():
+        g.metrics_started = time.perf_counter()
+
+    @app.after_request
+    def _observe_request(response):
+        started = g.pop("metrics_started", None)
+        if started is not None:
+            route = request.url_rule.rule if request.url_rule is not None else "unmatched"
+            duration.observe(time.perf_counter() - started, route, request.method, response.status_code)
+        return response
+
+    def metrics_endpoint():
+        return Response(registry.render(), content_type=CONTENT_TYPE)
+
+    app.add_url_rule("/metrics", "metrics", metrics_endpoint, methods=["GET"])
@@ -0,0 +1,103 @@
+"""Befehls-Pipelines: ``Lesen:log.txt | Filtern:Fehler | Analyse``.
+
+Stufen werden durch ``|`` mit Leerzeichen davor und danach getrennt; ein
+``|`` ohne Leerzeichen (z. B. in ``grep=a|b``) gehört zum Argument. Ob eine
+Eingabe mit `` | `` wirklich eine Pipeline ist, entscheidet
+``CommandProcessor.is_pipeline`` anhand der registrierten Befehle. Jede
+Stufe ist ein Async-Generator (``BaseCommand.stream``), der Textabschnitte
+liefert und die Abschnitte der vorherigen Stufe als ``source`` bekommt.
+Zwischen zwei Stufen liegt eine begrenzte Queue: jede Stufe läuft als
+eigener Task, ein langsamer Verbraucher bremst den Erzeuger (Backpressure),
+und keine Stufe hält mehr als ``buffer`` Abschnitte vor.
+"""
+import asyncio
+import re
+from typing import AsyncIterator, List, Optional
+
+PIPE = re.compile(r'\s+\|\s+')
+# Zielgröße eines Abschnitts in Zeichen; Abschnitte enden, wo möglich, an Zeilenenden
+CHUNK_CHARS = 64 * 1024
+
+_END = object()
+
+
+class PipelineError(Exception):
+    """Eine Stufe ist fehlgeschlagen oder die Pipeline ist ungültig; die Meldung geht an den Benutzer."""
+
+
+class _Failed:
+    __slots__ = ("error",)
+
+    def __init__(self, error: BaseException):
+        self.error = error
+
+
+def split(raw_command: str) -> List[str]:
+    """Zerlegt eine Eingabe in ihre Stufen (ohne ``|`` genau eine)."""
+    return [stage.strip() for stage in PIPE.split(raw_command.strip())]
+
+
+def is_pipeline(raw_command: str) -> bool:
+    """Enthält die Eingabe ein Stufen-Trennzeichen? (Notwendig, nicht hinreichend.)"""
+    # Die Prüfung auf ``|`` erspart langen Argumenten (ganze Texte für Analyse) die Regex-Suche
+    return '|' in raw_command and PIPE.search(raw_command.strip()) is not None
+
+
+async def buffered(source: AsyncIterator[str], size: int) -> AsyncIterator[str]:
+    """Lässt ``source`` als eigenen Task laufen und puffert höchstens ``size`` Abschnitte."""
+    queue: asyncio.Queue = asyncio.Queue(maxsize=max(1, size))
+
+    async def pump() -> None:
+        try:
+            async for chunk in source:
+                await queue.put(chunk)
+        except Exception as exc:
+            await queue.put(_Failed(exc))
+            return
+        finally:
+            aclose = getattr(source, 'aclose', None)
+            if aclose is not None:
+                await aclose()
+        await queue.put(_END)
+
+    task = asyncio.ensure_future(pump())
+    try:
+        while True:
+            item = await queue.get()
+            if item is _END:
+                return
+            if isinstance(item, _Failed):
+                raise item.error
+            yield item
+    finally:
+        # Verbraucher bricht ab (Fehler, Ausgabelimit): Erzeuger nicht weiterlaufen lassen
+        if not task.done():
+            task.cancel()
+        try:
+            await task
+        except asyncio.CancelledError:
+            pass
+
+
+async def line_blocks(source: AsyncIterator[str]) -> AsyncIterator[List[str]]:
+    """Fasst eingehende Abschnitte zu Blöcken vollständiger Zeilen (mit Zeilenende) zusammen."""
+    carry = ''
+    async for chunk in source:
+        if carry:
+            chunk = carry + chunk
+        lines = chunk.splitlines(keepends=True)
+        carry = lines.pop() if lines and not lines[-1].endswith(('\n', '\r')) else ''
+        if lines:
+            yield lines
+    if carry:
+        yield [carry]
+
+
+def read_block(fp, size: int = CHUNK_CHARS) -> Optional[str]:
+    """Liest etwa ``size`` Zeichen aus einer Textdatei bis zum nächsten Zeilenende; None am Dateiende."""
+    data = fp.read(size)
+    if not data:
+        return None
+    if not data.endswith('\n'):
+        data += fp.readline()
+    return data
@@ -0,0 +1,241 @@
+"""Client für den Policy-Service mit Entscheidungs-Cache.
+
+Betriebsarten (``[Policy] mode``):
+
+- ``remote`` (Standard): jede Entscheidung kommt vom Policy-Service.
+  Identische Befehle (bis auf Groß-/Kleinschreibung, wie beim Regelabgleich) im selben Kontext werden innerhalb
+  ihrer TTL aus dem Cache beantwortet, ohne den Service zu fragen. Die TTL ist
+  durch das ``max_age`` begrenzt, das der Service mitschickt; meldet der
+  Service eine neue Regelversion, wird der Cache verworfen.
+- ``embedded``: dieselbe ``PolicyEngine`` mit derselben Regeldatei wie der
+  Service, im Prozess ausgewertet (Mikrosekunden statt eines HTTP-Aufrufs).
+- ``hybrid``: lokale Auswertung mit den Regeln des Service, die im
+  Hintergrund über ``GET /policy_rules`` aktuell gehalten werden. Bis zur
+  ersten erfolgreichen Synchronisation wird der Service direkt gefragt.
+
+Anfragen an den Service laufen über einen Circuit-Breaker: nach mehreren
+Fehlern in Folge wird nicht mehr gewartet, sondern sofort mit
+``policy_status`` ``unavailable`` geantwortet, bis der ``/health``-Endpunkt
+des Service wieder antwortet. Ob ein Befehl dann trotzdem laufen darf,
+entscheidet ``fails_open`` je Befehlsklasse (``[Policy] fail_mode`` und
+``fail_mode_read_only``).
+"""
+import asyncio
+import logging
+import os
+import time
+from typing import Any, Dict, Hashable, Optional, Tuple
+
+from cache import TTLCache
+from circuit_breaker import OPEN, CircuitBreaker, health_url
+from http_client import HttpClient
+import metrics
+from policy_engine import DEFAULT_RULES_FILE, PolicyEngine, RuleSet, normalize_command
+
+CHECK_DURATION = metrics.histogram(
+    "cli_policy_check_duration_seconds", "Dauer eines Policy-Checks (Cache oder Service)", ("source",))
+DECISIONS = metrics.counter("cli_policy_decisions_total", "Policy-Entscheidungen je Status und Quelle",
+                            ("status", "source"))
+
+MODES = ("remote", "embedded", "hybrid")
+FAIL_MODES = ("open", "closed")
+SYNCS = metrics.counter("cli_policy_rule_syncs_total", "Abgleich der Regeln mit dem Policy-Service", ("outcome",))
+
+# Kontextfelder, die nur der Nachverfolgung dienen und die Entscheidung nicht beeinflussen
+TRACE_KEYS = frozenset({"trace_id", "session_id"})
+
+
+class PolicyClient:
+    """Fragt den Policy-Service und cached dessen Entscheidungen."""
+
+    def __init__(self, config: Any = None, http: Optional[HttpClient] = None):
+        self.url = getattr(config, 'policy_url', None)
+        self._http = http if http is not None else HttpClient(config)
+        self.cache = TTLCache(
+            max_size=getattr(config, 'policy_cache_size', 1024),
+            default_ttl=getattr(config, 'policy_cache_ttl', 30.0),
+        )
+        self.rules_version: Optional[str] = None
+
+        self.mode = getattr(config, 'policy_mode', 'remote')
+        if self.mode not in MODES:
+            raise ValueError(f"Unbekannter Policy-Modus '{self.mode}', erwartet: {', '.join(MODES)}")
+        self.engine: Optional[PolicyEngine] = None
+        if self.mode == 'embedded':
+            self.engine = PolicyEngine(
+                rules_file=getattr(config, 'policy_rules_file', None)
+                or os.environ.get("POLICY_RULES_FILE", DEFAULT_RULES_FILE),
+                reload_interval=getattr(config, 'policy_reload_interval', 2.0),
+            )
+        elif self.mode == 'hybrid':
+            # Regeln kommen ausschließlich vom Service, nicht aus einer lokalen Datei
+            self.engine = PolicyEngine(rules_file=None)
+        self.rules_url = getattr(config, 'policy_rules_url', None) or self._default_rules_url(self.url)
+        self.sync_interval = getattr(config, 'policy_sync_interval', 30.0)
+        self.synced_at: Optional[float] = None
+        self._sync_task: Optional[asyncio.Task] = None
+
+        self.breaker = CircuitBreaker(
+            "policy", config, self._http,
+            probe_url=getattr(config, 'policy_health_url', None) or health_url(self.url, '/policy_check'),
+        )
+        self.fail_mode = getattr(config, 'policy_fail_mode', 'closed')
+        self.fail_mode_read_only = getattr(config, 'policy_fail_mode_read_only', 'closed')
+        for fail_mode in (self.fail_mode, self.fail_mode_read_only):
+            if fail_mode not in FAIL_MODES:
+                raise ValueError(f"Unbekannter Fail-Modus '{fail_mode}', erwartet: {', '.join(FAIL_MODES)}")
+
+    @staticmethod
+    def _default_rules_url(url: Optional[str]) -> Optional[str]:
+        if not url:
+            return None
+        base = url.rstrip('/')
+        if base.endswith('/policy_check'):
+            base = base[:-len('/policy_check')]
+        return base + '/policy_rules'
+
+    @staticmethod
+    def _cache_key(command: str, context: Dict[str, Any]) -> Hashable:
+        # Dieselbe Normalisierung wie der Regelabgleich der Engine: nur Befehle, die die Engine nicht
+        # unterscheiden kann, teilen sich eine Entscheidung. Trace-/Sitzungs-IDs ändern sich pro Befehl
+        # und dürfen den Cache nicht aushebeln
+        return normalize_command(command), tuple(sorted(
+            (k, str(v)) for k, v in context.items() if k not in TRACE_KEYS
+        ))
+
+    async def check(self, command: str, context: Dict[str, Any]) -> Tuple[bool, Dict[str, Any]]:
+        """Liefert (erlaubt, Entscheidungsdaten) für einen Befehl."""
+        if self.mode == 'hybrid':
+            self._ensure_sync()
+        if self.mode == 'embedded' or (self.mode == 'hybrid' and self.synced_at is not None):
+            started = time.perf_counter()
+            data = self.engine.evaluate(command, context, service=f"cli-{self.mode}")
+            self.rules_version = data['rules_version']
+            self._observe(started, data, "embedded")
+            return data['policy_status'] == 'approved', data
+
+        if not self.url:
+            return True, {"policy_status": "skipped", "reason": "Policy URL not set"}
+
+        started = time.perf_counter()
+        key = self._cache_key(command, context)
+        cached = self.cache.get(key)
+        if cached is not None:
+            self._observe(started, cached, "cache")
+            return cached.get('policy_status') == 'approved', cached
+
+        if not self.breaker.allow():
+            data = {"policy_status": "unavailable", "reason": "Policy-Service nicht erreichbar (Circuit offen)"}
+            self._observe(started, data, "breaker")
+            return False, data
+
+        payload = {"command": command, "context": context}
+        try:
+            async with self._http.post(self.url, json=payload) as resp:
+                if resp.status >= 500:
+                    raise ValueError(f"HTTP {resp.status}")
+                data = await resp.json()
+        except Exception as exc:
+            logging.error("Policy check failed: %s", exc)
+            self.breaker.record_failure(exc)
+            data = {"policy_status": "unavailable", "reason": f"Policy-Service nicht erreichbar: {exc}"}
+            self._observe(started, data, "service")
+            return False, data
+
+        self.breaker.record_success()
+        self._remember(key, data)
+        self._observe(started, data, "service")
+        return data.get('policy_status') == 'approved', data
+
+    def needs_remote(self, command: str, context: Dict[str, Any]) -> bool:
+        """Ob ``check`` für diesen Befehl auf den Service warten würde.
+
+        Nein bei lokaler Auswertung, einem Cache-Treffer, ohne URL und bei
+        offenem Circuit; dann kommt die Antwort sofort.
+        """
+        if self.mode == 'embedded' or (self.mode == 'hybrid' and self.synced_at is not None):
+            return False
+        if not self.url or self.breaker.state == OPEN:
+            return False
+        return self._cache_key(command, context) not in self.cache
+
+    def fails_open(self, read_only: bool) -> bool:
+        """Ob ein Befehl dieser Klasse bei nicht erreichbarem Service trotzdem laufen darf."""
+        return (self.fail_mode_read_only if read_only else self.fail_mode) == 'open'
+
+    @staticmethod
+    def _observe(started: float, data: Dict[str, Any], source: str) -> None:
+        CHECK_DURATION.observe(time.perf_counter() - started, source)
+        DECISIONS.inc(data.get('policy_status', 'unknown'), source)
+
+    def _remember(self, key: Hashable, data: Dict[str, Any]) -> None:
+        if data.get('policy_status') not in ('approved', 'denied'):
+            return
+        version = data.get('rules_version')
+        if version is not None and version != self.rules_version:
+            if self.rules_version is not None:
+                logging.info("Policy-Regeln geändert (%s -> %s), Cache verworfen", self.rules_version, version)
+            self.cache.clear()
+            self.rules_version = version
+        max_age = (data.get('cache') or {}).get('max_age')
+        ttl = self.cache.default_ttl
+        if max_age is not None:
+            ttl = min(ttl, float(max_age))
+        self.cache.set(key, data, ttl)
+
+    # Regelabgleich (hybrid)
+
+    def _ensure_sync(self) -> None:
+        task = self._sync_task
+        loop = asyncio.get_running_loop()
+        if task is not None and not task.done() and task.get_loop() is loop:
+            return
+        self._sync_task = loop.create_task(self._sync_loop())
+
+    async def _sync_loop(self) -> None:
+        while True:
+            await self.sync_rules()
+            await asyncio.sleep(self.sync_interval)
+
+    async def sync_rules(self) -> bool:
+        """Holt die Regeln vom Service, falls sich die Version geändert hat; True bei Erfolg."""
+        if not self.rules_url:
+            return False
+        headers = {}
+        if self.synced_at is not None:
+            headers['If-None-Match'] = f'"{self.engine.rules.version}"'
+        try:
+            async with self._http.get(self.rules_url, headers=headers) as resp:
+                if resp.status == 304:
+                    SYNCS.inc("unchanged")
+                    self.synced_at = time.time()
+                    return True
+                if resp.status != 200:
+                    raise ValueError(f"HTTP {resp.status}")
+                data = await resp.json()
+            rules = RuleSet.from_dict(data, source=self.rules_url)
+        except Exception as exc:
+            SYNCS.inc("error")
+            # Mit dem letzten bekannten Regelstand weiterarbeiten
+            logging.warning("Policy-Regeln konnten nicht abgeglichen werden: %s", exc)
+            return False
+        SYNCS.inc("updated" if self.engine.replace(rules) else "unchanged")
+        self.rules_version = rules.version
+        self.synced_at = time.time()
+        return True
+
+    async def close(self) -> None:
+        await self.breaker.close()
+        task, self._sync_task = self._sync_task, None
+        if task is not None and not task.done() and task.get_loop() is asyncio.get_running_loop():
+            task.cancel()
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
+
+    def stats(self) -> Dict[str, Any]:
+        stats = dict(self.cache.stats(), rules_version=self.rules_version, mode=self.mode)
+        if self.mode == 'hybrid':
+            stats["synced_at"] = self.synced_at
+        return stats
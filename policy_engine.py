@@ -0,0 +1,256 @@
+"""Compiled rule engine for policy decisions.
+
+All blocked patterns (and the destructive keywords checked for guests) are
+compiled once into an Aho-Corasick automaton, so evaluating a command costs
+one pass over its text no matter how many patterns the rule set contains.
+
+Rules are loaded from a JSON file::
+
+    {
+      "version": "2025-12-08.1",
+      "blocked_patterns": ["rm -rf", "drop table"],
+      "destructive_keywords": ["delete", "rm", "drop"],
+      "learned_patterns": [{"pattern": "lesen:/etc/shadow", "count": 42}]
+    }
+
+``learned_patterns`` are candidates from ``impfstoff.py`` that a maintainer
+approved; they are enforced like ``blocked_patterns`` and carry their mining
+statistics for review.
+
+The file is re-checked at most every ``reload_interval`` seconds and swapped
+in atomically when it changed. The effective version is the declared
+``version`` plus a hash of the rule content (``2025-12-08.1+3f2a…``), or just
+the hash without one, so edited patterns get a new version (and ETag) even if
+nobody bumped the declared one.
+"""
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+DEFAULT_BLOCKED_PATTERNS = ["rm -rf", "drop table", "delete from", "chmod 777", "curl | bash"]
+DEFAULT_DESTRUCTIVE_KEYWORDS = ["delete", "rm", "drop"]
+DEFAULT_RULES_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "policy_rules.json")
+# Reasons of rule-based denials; consumers (impfstoff.py) recognize engine decisions by these prefixes
+BLOCKED_REASON = "Blocked pattern detected"
+GUEST_REASON = "Guests are not allowed to run destructive commands"
+
+
+class PatternMatcher:
+    """Aho-Corasick automaton over a fixed list of lowercase substrings."""
+
+    def __init__(self, patterns: Iterable[str]):
+        self.patterns: List[str] = [p.lower() for p in patterns if p]
+        goto: List[Dict[str, int]] = [{}]
+        output: List[List[int]] = [[]]
+
+        for index, pattern in enumerate(self.patterns):
+            state = 0
+            for char in pattern:
+                nxt = goto[state].get(char)
+                if nxt is None:
+                    nxt = len(goto)
+                    goto[state][char] = nxt
+                    goto.append({})
+                    output.append([])
+                state = nxt
+            output[state].append(index)
+
+        # Breadth-first pass: failure links and merged outputs
+        fail = [0] * len(goto)
+        queue = list(goto[0].values())
+        for state in queue:
+            for char, nxt in goto[state].items():
+                queue.append(nxt)
+                f = fail[state]
+                while f and char not in goto[f]:
+                    f = fail[f]
+                fail[nxt] = goto[f].get(char, 0)
+                output[nxt].extend(output[fail[nxt]])
+
+        self._goto = goto
+        self._fail = fail
+        self._output = [tuple(o) for o in output]
+
+    def find_all(self, text: str) -> List[int]:
+        """Indices of all patterns occurring in ``text`` (already lowercased)."""
+        goto, fail, output = self._goto, self._fail, self._output
+        found = set()
+        state = 0
+        for char in text:
+            while state and char not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(char, 0)
+            if output[state]:
+                found.update(output[state])
+        return sorted(found)
+
+    def first(self, text: str) -> Optional[str]:
+        """The matching pattern that comes first in rule order, if any."""
+        found = self.find_all(text)
+        return self.patterns[found[0]] if found else None
+
+
+class RuleSet:
+    """An immutable, compiled version of the policy rules."""
+
+    def __init__(self, blocked_patterns: List[str], destructive_keywords: List[str],
+                 version: Optional[str] = None, source: Optional[str] = None,
+                 learned_patterns: Optional[List[Dict[str, Any]]] = None):
+        self.blocked_patterns = list(blocked_patterns)
+        self.destructive_keywords = list(destructive_keywords)
+        # Patterns mined from flight records (see impfstoff.py); enforced like blocked patterns
+        self.learned_patterns = [dict(p) for p in (learned_patterns or []) if p.get("pattern")]
+        all_blocked = self.blocked_patterns + [p["pattern"] for p in self.learned_patterns]
+        self.declared_version = version
+        digest = self.content_hash(all_blocked, self.destructive_keywords)
+        self.version = f"{version}+{digest}" if version else digest
+        self.source = source
+        self.blocked = PatternMatcher(all_blocked)
+        self.destructive = PatternMatcher(self.destructive_keywords)
+
+    @staticmethod
+    def content_hash(blocked: List[str], destructive: List[str]) -> str:
+        return hashlib.sha1("\n".join(blocked + ["--"] + destructive).encode("utf-8")).hexdigest()[:12]
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any], source: Optional[str] = None) -> "RuleSet":
+        return cls(
+            blocked_patterns=data.get("blocked_patterns", DEFAULT_BLOCKED_PATTERNS),
+            destructive_keywords=data.get("destructive_keywords", DEFAULT_DESTRUCTIVE_KEYWORDS),
+            version=data.get("version"),
+            source=source,
+            learned_patterns=data.get("learned_patterns"),
+        )
+
+    def to_dict(self) -> Dict[str, Any]:
+        data = {
+            "blocked_patterns": self.blocked_patterns,
+            "destructive_keywords": self.destructive_keywords,
+        }
+        if self.declared_version:
+            data = dict(version=self.declared_version, **data)
+        if self.learned_patterns:
+            data["learned_patterns"] = self.learned_patterns
+        return data
+
+
+class PolicyEngine:
+    """Evaluates commands against a hot-reloadable, compiled rule set."""
+
+    def __init__(self, rules_file: Optional[str] = None, reload_interval: float = 2.0):
+        self.rules_file = rules_file
+        self.reload_interval = reload_interval
+        self._lock = threading.Lock()
+        self._file_stamp: Optional[Tuple[int, int]] = None
+        self._next_check = 0.0
+        self._rules = RuleSet(DEFAULT_BLOCKED_PATTERNS, DEFAULT_DESTRUCTIVE_KEYWORDS)
+        self.reload(force=True)
+
+    @property
+    def rules(self) -> RuleSet:
+        if self.rules_file and time.monotonic() >= self._next_check:
+            self.reload()
+        return self._rules
+
+    @property
+    def version(self) -> str:
+        return self.rules.version
+
+    def reload(self, force: bool = False) -> bool:
+        """Loads the rule file if it changed; returns True when new rules were swapped in."""
+        if not self.rules_file:
+            return False
+        with self._lock:
+            self._next_check = time.monotonic() + self.reload_interval
+            try:
+                st = os.stat(self.rules_file)
+            except OSError:
+                return False
+            stamp = (st.st_mtime_ns, st.st_size)
+            if not force and stamp == self._file_stamp:
+                return False
+            try:
+                with open(self.rules_file, "r", encoding="utf-8") as fp:
+                    rules = RuleSet.from_dict(json.load(fp), source=self.rules_file)
+            except (OSError, ValueError) as exc:
+                logging.error("Could not load policy rules from %s: %s", self.rules_file, exc)
+                return False
+            self._file_stamp = stamp
+            changed = rules.version != self._rules.version
+            self._rules = rules
+        if changed:
+            logging.info("Policy rules version %s loaded (%d patterns)", rules.version, len(rules.blocked_patterns))
+        return changed
+
+    def replace(self, rules: RuleSet) -> bool:
+        """Swaps in rules obtained elsewhere (e.g. synced from the policy service)."""
+        with self._lock:
+            changed = rules.version != self._rules.version
+            self._rules = rules
+        if changed:
+            logging.info("Policy rules version %s installed from %s", rules.version, rules.source or "memory")
+        return changed
+
+    def decide(self, command: str, context: Dict[str, Any]) -> Tuple[str, str]:
+        """Returns ``(policy_status, reason)`` for a command."""
+        return _decide(self.rules, command, context)
+
+    def evaluate(self, command: str, context: Dict[str, Any], service: str = "policy-engine",
+                 max_age: Optional[float] = None) -> Dict[str, Any]:
+        """The full decision document, as returned by ``POST /policy_check``.
+
+        Used by ``policy_service`` and by clients that evaluate in-process,
+        so both produce identical decisions.
+        """
+        rules = self.rules
+        status, reason = _decide(rules, command, context)
+        return build_decision(command, context, status, reason, rules.version, service, max_age)
+
+
+def normalize_command(command: str) -> str:
+    """The form of a command that rules are matched against.
+
+    Anything that caches or mines decisions must key on this, so that two
+    commands share a key only if the engine cannot tell them apart.
+    """
+    return command.lower()
+
+
+def _decide(rules: RuleSet, command: str, context: Dict[str, Any]) -> Tuple[str, str]:
+    command_lower = normalize_command(command)
+
+    pattern = rules.blocked.first(command_lower)
+    if pattern is not None:
+        return "denied", f"{BLOCKED_REASON}: {pattern}"
+
+    role = context.get("user_role", "guest")
+    if role == "guest" and rules.destructive.first(command_lower) is not None:
+        return "denied", GUEST_REASON
+
+    return "approved", "Command approved"
+
+
+def build_decision(command: str, context: Dict[str, Any], status: str, reason: str, version: str,
+                   service: str, max_age: Optional[float] = None) -> Dict[str, Any]:
+    now = datetime.utcnow().isoformat() + "Z"
+    decision: Dict[str, Any] = {
+        "policy_status": status,
+        "timestamp": now,
+        "command": command,
+        "reason": reason,
+        "rules_version": version,
+        "metadata": {
+            "service": service,
+            "checked_at": now,
+            "user_role": context.get("user_role", "guest"),
+            "trace_id": context.get("trace_id"),
+        },
+    }
+    if max_age is not None:
+        decision["cache"] = {"max_age": max_age}
+    return decision
@@ -3,49 +3,54 @@
 Run with:
     FLASK_ENV=production python policy_service.py
 """
-from datetime import datetime
 import logging
-from typing import Dict, Any
+import os
+import time
+from typing import Dict, Any, List
 
 from flask import Flask, jsonify, request
 from flask_cors import CORS
 
+import metrics
+from policy_engine import (
+    DEFAULT_BLOCKED_PATTERNS,
+    DEFAULT_DESTRUCTIVE_KEYWORDS,
+    DEFAULT_RULES_FILE,
+    PolicyEngine,
+)
+
 app = Flask(__name__)
 CORS(app)
+metrics.instrument_flask(app, "policy")
 logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
 
 ALLOWED_COMMAND_PREFIXES = ("analyse", "lesen", "speichern", "zeit", "hilfe", "wetter")
-BLOCKED_PATTERNS = ["rm -rf", "drop table", "delete from", "chmod 777", "curl | bash"]
-
-
-def _evaluate_command(command: str, context: Dict[str, Any]) -> Dict[str, Any]:
-    command_lower = command.lower()
-    status = "approved"
-    reason = "Command approved"
-
-    for pattern in BLOCKED_PATTERNS:
-        if pattern in command_lower:
-            status = "denied"
-            reason = f"Blocked pattern detected: {pattern}"
-            break
-
-    if status == "approved":
-        role = context.get("user_role", "guest")
-        if role == "guest" and any(k in command_lower for k in ("delete", "rm", "drop")):
-            status = "denied"
-            reason = "Guests are not allowed to run destructive commands"
-
-    return {
-        "policy_status": status,
-        "timestamp": datetime.utcnow().isoformat() + "Z",
-        "command": command,
-        "reason": reason,
-        "metadata": {
-            "service": "policy-check-flask",
-            "checked_at": datetime.utcnow().isoformat() + "Z",
-            "user_role": context.get("user_role", "guest"),
-        },
-    }
+BLOCKED_PATTERNS = DEFAULT_BLOCKED_PATTERNS
+DESTRUCTIVE_KEYWORDS = DEFAULT_DESTRUCTIVE_KEYWORDS
+# How long (seconds) clients may reuse a decision for the same command and context.
+DECISION_MAX_AGE = int(os.environ.get("POLICY_DECISION_MAX_AGE", "60"))
+# Upper bound for the number of commands in one /policy_check/batch call.
+BATCH_LIMIT = int(os.environ.get("POLICY_BATCH_LIMIT", "10000"))
+
+DECISIONS = metrics.counter("policy_decisions_total", "Policy decisions by status and endpoint", ("status", "endpoint"))
+DECISION_DURATION = metrics.histogram(
+    "policy_decision_duration_seconds", "Rule evaluation time per decision", ("status",))
+BATCH_SIZE = metrics.histogram(
+    "policy_batch_size", "Commands per batch check", buckets=metrics.SIZE_BUCKETS)
+
+ENGINE = PolicyEngine(
+    rules_file=os.environ.get("POLICY_RULES_FILE", DEFAULT_RULES_FILE),
+    reload_interval=float(os.environ.get("POLICY_RULES_RELOAD_INTERVAL", "2")),
+)
+
+
+def _evaluate_command(command: str, context: Dict[str, Any], endpoint: str = "single") -> Dict[str, Any]:
+    started = time.perf_counter()
+    decision = ENGINE.evaluate(command, context, service="policy-check-flask", max_age=DECISION_MAX_AGE)
+    status = decision["policy_status"]
+    DECISION_DURATION.observe(time.perf_counter() - started, status)
+    DECISIONS.inc(status, endpoint)
+    return decision
 
 
 @app.post("/policy_check")
@@ -58,10 +63,61 @@ def policy_check():
         return jsonify({"policy_status": "error", "reason": "Missing command"}), 400
 
     decision = _evaluate_command(command, context)
-    logging.info("Policy check %s for command '%s'", decision["policy_status"], command[:80])
+    logging.info("Policy check %s for command '%s' (trace %s)", decision["policy_status"], command[:80],
+                 context.get("trace_id", "-"))
     return jsonify(decision)
 
 
+@app.post("/policy_check/batch")
+def policy_check_batch():
+    """Evaluates many commands in one call.
+
+    ``commands`` is a list of strings or ``{"command": ..., "context": ...}``
+    objects; a top-level ``context`` applies to entries without their own.
+    Results are returned in request order.
+    """
+    payload: Dict[str, Any] = request.json or {}
+    commands: List[Any] = payload.get("commands") or []
+    default_context: Dict[str, Any] = payload.get("context", {})
+
+    if not isinstance(commands, list) or not commands:
+        return jsonify({"policy_status": "error", "reason": "Missing commands"}), 400
+    if len(commands) > BATCH_LIMIT:
+        return jsonify({"policy_status": "error", "reason": f"Batch exceeds {BATCH_LIMIT} commands"}), 413
+
+    BATCH_SIZE.observe(len(commands))
+    results = []
+    for item in commands:
+        if isinstance(item, dict):
+            command, context = item.get("command", ""), item.get("context", default_context)
+        else:
+            command, context = str(item), default_context
+        if not command:
+            results.append({"policy_status": "error", "reason": "Missing command"})
+            continue
+        results.append(_evaluate_command(command, context, "batch"))
+
+    denied = sum(1 for r in results if r["policy_status"] != "approved")
+    logging.info("Policy batch check: %d commands, %d not approved", len(results), denied)
+    return jsonify({"results": results, "rules_version": ENGINE.version})
+
+
+@app.get("/policy_rules")
+def policy_rules():
+    """The active rule set, for clients that evaluate in-process (``[Policy] mode = hybrid``).
+
+    The rules version (declared version plus content hash) is the ETag;
+    ``If-None-Match`` with the current version answers ``304 Not Modified``.
+    """
+    rules = ENGINE.rules
+    etag = f'"{rules.version}"'
+    if request.headers.get("If-None-Match") == etag:
+        return "", 304, {"ETag": etag}
+    response = jsonify(rules.to_dict())
+    response.headers["ETag"] = etag
+    return response
+
+
 @app.get("/health")
 def health():
     return jsonify({"status": "healthy", "service": "policy-check"})
@@ -0,0 +1,709 @@
+"""Segmented, group-committed storage for flight records.
+
+Every worker process appends to its own segment files, so several gunicorn
+workers never interleave writes in one file. Segments are named::
+
+    seg-<start_ms>-<pid>-<seq>.ndjson      (active or sealed)
+    seg-<start_ms>-<pid>-<seq>.ndjson.gz   (sealed and compressed)
+
+Sorting the names orders segments by the time they were opened.
+
+Writes use group commit: request threads hand their encoded lines to the
+writer, and whichever thread gets the commit lock first writes everything
+pending in one ``write`` (and ``fsync``, depending on the cadence) while
+the others wait for it instead of issuing their own syscalls. If that write
+or sync fails, every caller whose data was in the batch gets the exception,
+and the next commit starts a new segment. With ``fsync="interval"`` a
+background timer syncs data left unsynced, so no committed record stays
+unsynced for much longer than ``fsync_interval``, even without further appends.
+
+A segment is sealed once it reaches ``segment_bytes`` or ``segment_seconds``.
+Sealed segments can be compressed in the background.
+
+Each segment has a sparse index next to it (``<segment>.idx``, one JSON
+line per block of roughly ``index_block_bytes``). A block entry records its
+byte range, record count, timestamp range, command names and policy
+statuses, so queries read only the blocks that can contain matches.
+Compressed segments store each block as its own gzip member and the index
+points at the compressed offsets. Data written after the last indexed
+block (the open block of an active segment) is scanned directly.
+"""
+import atexit
+import base64
+import gzip
+import json
+import logging
+import os
+import re
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+FSYNC_MODES = ("always", "interval", "never")
+SEGMENT_PATTERN = re.compile(r"^seg-(\d{13})-(\d+)-(\d{6})\.ndjson(\.gz)?$")
+GZIP_MEMBER_BYTES = 256 * 1024
+INDEX_SUFFIX = ".idx"
+# Above this many distinct command names a block stops listing them (and is never skipped by command)
+MAX_BLOCK_COMMANDS = 64
+
+
+def _env_float(name: str, default: float) -> float:
+    try:
+        return float(os.environ.get(name, default))
+    except ValueError:
+        return default
+
+
+class StorageConfig:
+    """Storage settings, read from ``FLIGHT_RECORDER_*`` environment variables."""
+
+    def __init__(self, directory: str, fsync: str = "interval", fsync_interval: float = 1.0,
+                 segment_bytes: int = 64 * 1024 * 1024, segment_seconds: float = 3600.0,
+                 compress: bool = False, index_block_bytes: int = 64 * 1024):
+        if fsync not in FSYNC_MODES:
+            raise ValueError(f"Unknown fsync mode {fsync!r}, expected one of {FSYNC_MODES}")
+        self.directory = directory
+        self.fsync = fsync
+        self.fsync_interval = fsync_interval
+        self.segment_bytes = segment_bytes
+        self.segment_seconds = segment_seconds
+        self.compress = compress
+        self.index_block_bytes = index_block_bytes
+
+    @classmethod
+    def from_env(cls) -> "StorageConfig":
+        return cls(
+            directory=os.environ.get("FLIGHT_RECORDER_DIR", "flight_records"),
+            fsync=os.environ.get("FLIGHT_RECORDER_FSYNC", "interval"),
+            fsync_interval=_env_float("FLIGHT_RECORDER_FSYNC_INTERVAL", 1.0),
+            segment_bytes=int(_env_float("FLIGHT_RECORDER_SEGMENT_BYTES", 64 * 1024 * 1024)),
+            segment_seconds=_env_float("FLIGHT_RECORDER_SEGMENT_SECONDS", 3600.0),
+            compress=os.environ.get("FLIGHT_RECORDER_COMPRESS", "none").lower() == "gzip",
+            index_block_bytes=int(_env_float("FLIGHT_RECORDER_INDEX_BLOCK_BYTES", 64 * 1024)),
+        )
+
+
+def parse_timestamp(value: Any) -> Optional[float]:
+    """ISO-8601 timestamp (``Z`` or offset, naive means UTC) as epoch seconds."""
+    if not isinstance(value, str) or not value.strip():
+        return None
+    text = value.strip()
+    if text[-1] in "Zz":
+        text = text[:-1] + "+00:00"
+    try:
+        parsed = datetime.fromisoformat(text)
+    except ValueError:
+        return None
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return parsed.timestamp()
+
+
+def command_name(command: Any) -> str:
+    """The command word of a recorded command (``"Wetter:Berlin"`` -> ``"wetter"``)."""
+    text = str(command or "").strip()
+    return re.split(r"[:\s]", text, maxsplit=1)[0].casefold()
+
+
+def encode_entries(entries: Iterable[Dict[str, Any]]) -> bytes:
+    return "".join(json.dumps(entry, ensure_ascii=False) + "\n" for entry in entries).encode("utf-8")
+
+
+class _Block:
+    """Index statistics of the block currently being written."""
+
+    __slots__ = ("offset", "size", "count", "min_ts", "max_ts", "commands", "statuses")
+
+    def __init__(self, offset: int):
+        self.offset = offset
+        self.size = 0
+        self.count = 0
+        self.min_ts: Optional[float] = None
+        self.max_ts: Optional[float] = None
+        self.commands: Optional[set] = set()
+        self.statuses: set = set()
+
+    def add(self, length: int, entry: Dict[str, Any]) -> None:
+        self.size += length
+        self.count += 1
+        ts = parse_timestamp(entry.get("timestamp"))
+        if ts is not None:
+            self.min_ts = ts if self.min_ts is None else min(self.min_ts, ts)
+            self.max_ts = ts if self.max_ts is None else max(self.max_ts, ts)
+        if self.commands is not None:
+            self.commands.add(command_name(entry.get("command")))
+            if len(self.commands) > MAX_BLOCK_COMMANDS:
+                self.commands = None
+        self.statuses.add(str(entry.get("policy_status", "")))
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "offset": self.offset,
+            "end": self.offset + self.size,
+            "count": self.count,
+            "min_ts": self.min_ts,
+            "max_ts": self.max_ts,
+            "commands": sorted(self.commands) if self.commands is not None else None,
+            "statuses": sorted(self.statuses),
+        }
+
+
+def _read_index_file(path: str) -> List[Dict[str, Any]]:
+    blocks = []
+    with open(path, "rb") as fp:
+        for line in fp:
+            if not line.endswith(b"\n"):
+                break  # partially written last entry
+            try:
+                blocks.append(json.loads(line))
+            except ValueError:
+                break
+    return blocks
+
+
+def _write_index_file(path: str, blocks: List[Dict[str, Any]]) -> None:
+    tmp = path + ".tmp"
+    with open(tmp, "wb") as fp:
+        fp.write(encode_entries(blocks))
+        fp.flush()
+        os.fsync(fp.fileno())
+    os.replace(tmp, path)
+
+
+def compress_segment(path: str, member_bytes: int = GZIP_MEMBER_BYTES) -> str:
+    """Compresses a sealed segment into gzip members; returns the new path.
+
+    Each indexed block becomes one member and the index is rewritten with
+    the compressed offsets. Unindexed data is split into line-aligned
+    members of about ``member_bytes`` that are indexed without statistics.
+    """
+    target = path + ".gz"
+    tmp = target + ".tmp"
+    index_path = path + INDEX_SUFFIX
+    blocks = _read_index_file(index_path) if os.path.exists(index_path) else []
+    compressed: List[Dict[str, Any]] = []
+    with open(path, "rb") as src, open(tmp, "wb") as dst:
+        out = 0
+
+        def member(raw: bytes, stats: Dict[str, Any]) -> None:
+            nonlocal out
+            data = gzip.compress(raw)
+            dst.write(data)
+            compressed.append(dict(stats, offset=out, end=out + len(data)))
+            out += len(data)
+
+        pos = 0
+        for block in blocks:
+            src.seek(block["offset"])
+            member(src.read(block["end"] - block["offset"]), block)
+            pos = block["end"]
+        src.seek(pos)
+        while True:
+            raw = src.read(member_bytes)
+            if not raw:
+                break
+            if not raw.endswith(b"\n"):
+                # Keep members line-aligned so each one decodes to whole records
+                raw += src.readline()
+            member(raw, {})
+        dst.flush()
+        os.fsync(dst.fileno())
+    # Index first: whenever the .gz exists, its index does too
+    _write_index_file(target + INDEX_SUFFIX, compressed)
+    os.replace(tmp, target)
+    os.remove(path)
+    if os.path.exists(index_path):
+        os.remove(index_path)
+    return target
+
+
+class SegmentWriter:
+    """Per-process appender with group commit, segment rotation and block index."""
+
+    def __init__(self, config: StorageConfig):
+        self.config = config
+        self.pid = os.getpid()
+        os.makedirs(config.directory, exist_ok=True)
+        self._lock = threading.Lock()          # guards the pending buffer
+        self._commit_lock = threading.Lock()   # held by the current group-commit leader
+        self._pending: List[List[Tuple[bytes, Dict[str, Any]]]] = []
+        self._appended = 0
+        self._committed = 0
+        self._seq = 0
+        self._fp = None
+        self._index_fp = None
+        self._block: Optional[_Block] = None
+        self._path: Optional[str] = None
+        self._opened_at = 0.0
+        self._size = 0
+        self._last_fsync = time.monotonic()
+        self._dirty = False
+        self._sync_timer: Optional[threading.Timer] = None
+        # ticket -> exception of the failed group commit that carried its data
+        self._errors: Dict[int, BaseException] = {}
+        self._compressor: Optional[ThreadPoolExecutor] = None
+        self._compressions: List[Future] = []
+        self.commits = 0
+        self.records = 0
+
+    @property
+    def path(self) -> Optional[str]:
+        return self._path
+
+    def append(self, entries: List[Dict[str, Any]]) -> None:
+        """Appends entries; returns once they are written (and synced, if configured)."""
+        if not entries:
+            return
+        lines = [((json.dumps(entry, ensure_ascii=False) + "\n").encode("utf-8"), entry) for entry in entries]
+        with self._lock:
+            self._pending.append(lines)
+            self._appended += 1
+            ticket = self._appended
+            self.records += len(entries)
+        with self._commit_lock:
+            if self._committed >= ticket:
+                # An earlier leader already wrote our data, or failed to
+                error = self._errors.pop(ticket, None)
+                if error is not None:
+                    raise error
+                return
+            with self._lock:
+                batch, self._pending = self._pending, []
+                upto = self._appended
+            first = self._committed + 1
+            try:
+                self._write([line for lines in batch for line in lines])
+            except BaseException as exc:
+                for other in range(first, upto + 1):
+                    if other != ticket:
+                        self._errors[other] = exc
+                self._abandon()
+                raise
+            finally:
+                self._committed = upto
+            self.commits += 1
+
+    def _abandon(self) -> None:
+        """Drops the active segment after a failed write; it may end in a torn line."""
+        for handle in (self._fp, self._index_fp):
+            if handle is not None:
+                try:
+                    handle.close()
+                except OSError:
+                    pass
+        self._fp = self._index_fp = self._path = None
+        self._block = None
+        self._dirty = False
+
+    def _write(self, lines: List[Tuple[bytes, Dict[str, Any]]]) -> None:
+        now = time.time()
+        if self._fp is not None and (
+            self._size >= self.config.segment_bytes
+            or now - self._opened_at >= self.config.segment_seconds
+        ):
+            self._seal()
+        if self._fp is None:
+            self._open(now)
+        self._fp.write(b"".join(line for line, _ in lines))
+        self._fp.flush()
+        self._size += sum(len(line) for line, _ in lines)
+
+        # Index only after the data is written, so an index entry never points past it
+        finished = []
+        for line, entry in lines:
+            self._block.add(len(line), entry)
+            if self._block.size >= self.config.index_block_bytes:
+                finished.append(self._block.to_dict())
+                self._block = _Block(self._block.offset + self._block.size)
+        if finished:
+            self._index_fp.write(encode_entries(finished))
+            self._index_fp.flush()
+        self._sync()
+
+    def _sync(self, force: bool = False) -> None:
+        mode = self.config.fsync
+        if self._fp is None or mode == "never":
+            return
+        now = time.monotonic()
+        if force or mode == "always" or now - self._last_fsync >= self.config.fsync_interval:
+            os.fsync(self._fp.fileno())
+            self._last_fsync = now
+            self._dirty = False
+            return
+        self._dirty = True
+        if self._sync_timer is None:
+            self._sync_timer = threading.Timer(self.config.fsync_interval, self.flush)
+            self._sync_timer.daemon = True
+            self._sync_timer.start()
+
+    def flush(self) -> None:
+        """Syncs data that an ``interval`` commit left unsynced (runs from the sync timer)."""
+        with self._commit_lock:
+            self._sync_timer = None
+            if not self._dirty:
+                return
+            try:
+                self._sync(force=True)
+            except OSError as exc:
+                logging.error("Could not sync segment %s: %s", self._path, exc)
+
+    def _open(self, now: float) -> None:
+        self._seq += 1
+        name = f"seg-{int(now * 1000):013d}-{self.pid}-{self._seq:06d}.ndjson"
+        self._path = os.path.join(self.config.directory, name)
+        self._fp = open(self._path, "ab")
+        self._index_fp = open(self._path + INDEX_SUFFIX, "ab")
+        self._block = _Block(0)
+        self._opened_at = now
+        self._size = 0
+
+    def _seal(self) -> None:
+        fp, index_fp, path = self._fp, self._index_fp, self._path
+        self._fp = self._index_fp = self._path = None
+        if fp is None:
+            return
+        if self._block is not None and self._block.count:
+            index_fp.write(encode_entries([self._block.to_dict()]))
+        self._block = None
+        self._dirty = False
+        for handle in (fp, index_fp):
+            handle.flush()
+            if self.config.fsync != "never":
+                os.fsync(handle.fileno())
+            handle.close()
+        if self.config.compress and path is not None:
+            if self._compressor is None:
+                self._compressor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="segment-gzip")
+            self._compressions = [f for f in self._compressions if not f.done()]
+            self._compressions.append(self._compressor.submit(self._compress, path))
+
+    @staticmethod
+    def _compress(path: str) -> None:
+        try:
+            compress_segment(path)
+        except OSError as exc:
+            logging.error("Could not compress segment %s: %s", path, exc)
+
+    def rotate(self) -> None:
+        """Seals the active segment now; the next append opens a new one."""
+        with self._commit_lock:
+            self._seal()
+
+    def close(self) -> None:
+        with self._commit_lock:
+            self._seal()
+            timer, self._sync_timer = self._sync_timer, None
+        if timer is not None:
+            timer.cancel()
+        if self._compressor is not None:
+            for future in self._compressions:
+                future.result()
+            self._compressor.shutdown(wait=True)
+            self._compressor = None
+
+    def stats(self) -> Dict[str, Any]:
+        return {"records": self.records, "commits": self.commits, "segment": self._path, "pid": self.pid}
+
+
+def list_segments(directory: str) -> List[str]:
+    """Segment paths in time order (sealed and active, compressed or not)."""
+    try:
+        names = os.listdir(directory)
+    except FileNotFoundError:
+        return []
+    segments: Dict[str, str] = {}
+    for name in names:
+        match = SEGMENT_PATTERN.match(name)
+        if match is None:
+            continue
+        base = name[:-3] if match.group(4) else name
+        # During compression both files exist briefly; the .gz is complete once visible
+        if base not in segments or match.group(4):
+            segments[base] = name
+    return [os.path.join(directory, segments[base]) for base in sorted(segments)]
+
+
+def open_segment(path: str):
+    return gzip.open(path, "rb") if path.endswith(".gz") else open(path, "rb")
+
+
+def iter_records(directory: str) -> Iterator[Dict[str, Any]]:
+    """All stored records, segment by segment."""
+    for path in list_segments(directory):
+        try:
+            with open_segment(path) as fp:
+                for line in fp:
+                    if line.strip():
+                        yield json.loads(line)
+        except FileNotFoundError:
+            # Compressed and replaced while we were listing
+            continue
+
+
+# ---------------------------------------------------------------------------
+# Queries
+
+_index_cache: Dict[str, Tuple[Tuple[int, int], List[Dict[str, Any]]]] = {}
+_index_cache_lock = threading.Lock()
+
+
+def load_index(path: str) -> List[Dict[str, Any]]:
+    """Block index of a segment, cached until the index file changes."""
+    index_path = path + INDEX_SUFFIX
+    try:
+        st = os.stat(index_path)
+    except FileNotFoundError:
+        return []
+    stamp = (st.st_mtime_ns, st.st_size)
+    with _index_cache_lock:
+        cached = _index_cache.get(index_path)
+        if cached is not None and cached[0] == stamp:
+            return cached[1]
+    blocks = _read_index_file(index_path)
+    with _index_cache_lock:
+        if len(_index_cache) > 4096:
+            _index_cache.clear()
+        _index_cache[index_path] = (stamp, blocks)
+    return blocks
+
+
+def _units(path: str) -> List[Dict[str, Any]]:
+    """Indexed blocks plus a trailing, unindexed region if there is one."""
+    blocks = load_index(path)
+    size = os.path.getsize(path)
+    end = blocks[-1]["end"] if blocks else 0
+    if size > end:
+        return blocks + [{"offset": end, "end": size}]
+    return blocks
+
+
+def _read_unit(fp, path: str, unit: Dict[str, Any]) -> List[bytes]:
+    fp.seek(unit["offset"])
+    raw = fp.read(unit["end"] - unit["offset"])
+    if path.endswith(".gz"):
+        # gzip.decompress handles the concatenated members of a block range
+        raw = gzip.decompress(raw)
+    # The last element is empty or a line that is still being written
+    return raw.split(b"\n")[:-1]
+
+
+class RecordQuery:
+    """Filter for ``query_records``.
+
+    ``since`` is inclusive, ``until`` exclusive. ``command`` is a
+    case-insensitive prefix of the recorded command, ``status`` an exact
+    policy status.
+    """
+
+    def __init__(self, since: Optional[str] = None, until: Optional[str] = None,
+                 command: Optional[str] = None, status: Optional[str] = None):
+        self.since = self._bound(since, "since")
+        self.until = self._bound(until, "until")
+        self.command = command.strip().casefold() if command and command.strip() else None
+        self.status = status or None
+        self._exact_name = None
+        if self.command and re.search(r"[:\s]", self.command):
+            self._exact_name = command_name(self.command)
+
+    @staticmethod
+    def _bound(value: Optional[str], name: str) -> Optional[float]:
+        if not value:
+            return None
+        parsed = parse_timestamp(value)
+        if parsed is None:
+            raise ValueError(f"Invalid '{name}' timestamp: {value}")
+        return parsed
+
+    def may_match(self, block: Dict[str, Any]) -> bool:
+        """False when the block's index entry rules out any match."""
+        if (self.since is not None or self.until is not None) and "min_ts" in block:
+            if block["min_ts"] is None:
+                return False
+            if self.since is not None and block["max_ts"] < self.since:
+                return False
+            if self.until is not None and block["min_ts"] >= self.until:
+                return False
+        if self.status is not None and block.get("statuses") is not None:
+            if self.status not in block["statuses"]:
+                return False
+        if self.command is not None and block.get("commands") is not None:
+            names = block["commands"]
+            if self._exact_name is not None:
+                return self._exact_name in names
+            return any(name.startswith(self.command) for name in names)
+        return True
+
+    def matches(self, record: Dict[str, Any]) -> bool:
+        if self.since is not None or self.until is not None:
+            ts = parse_timestamp(record.get("timestamp"))
+            if ts is None:
+                return False
+            if self.since is not None and ts < self.since:
+                return False
+            if self.until is not None and ts >= self.until:
+                return False
+        if self.status is not None and str(record.get("policy_status", "")) != self.status:
+            return False
+        if self.command is not None and not str(record.get("command", "")).strip().casefold().startswith(self.command):
+            return False
+        return True
+
+
+def encode_cursor(segment: str, block: int, skip: int) -> str:
+    raw = json.dumps([segment, block, skip]).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[str, int, int]:
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        segment, block, skip = json.loads(raw)
+        return str(segment), int(block), int(skip)
+    except (ValueError, TypeError) as exc:
+        raise ValueError("Invalid cursor") from exc
+
+
+def segment_base(path: str) -> str:
+    """Segment name without directory and ``.gz`` (stable across compression)."""
+    name = os.path.basename(path)
+    return name[:-3] if name.endswith(".gz") else name
+
+
+def scan_segment(path: str, block: int = 0, line: int = 0,
+                 unit_filter: Optional[Callable[[Dict[str, Any]], bool]] = None,
+                 stats: Optional[Dict[str, int]] = None) -> Iterator[Tuple[int, int, Dict[str, Any]]]:
+    """Yields ``(block, line, record)`` from position ``(block, line)`` onward.
+
+    Blocks rejected by ``unit_filter`` are not read. Positions refer to the
+    block numbering of the index, so they stay valid after compression.
+    """
+    stats = stats if stats is not None else {}
+    try:
+        units = _units(path)
+        fp = open(path, "rb")
+    except FileNotFoundError:
+        # Compressed in the meantime: same blocks, now in the .gz
+        path += ".gz"
+        units = _units(path)
+        fp = open(path, "rb")
+    with fp:
+        carry = 0
+        for number in range(block, len(units)):
+            unit = units[number]
+            first, carry = (line if number == block else 0) + carry, 0
+            if unit_filter is not None and not first and not unit_filter(unit):
+                stats["blocks_skipped"] = stats.get("blocks_skipped", 0) + 1
+                continue
+            stats["blocks_read"] = stats.get("blocks_read", 0) + 1
+            lines = _read_unit(fp, path, unit)
+            if first > len(lines):
+                # The position was taken in a tail region that has since been split into blocks
+                carry = first - len(lines)
+                continue
+            for position in range(first, len(lines)):
+                if lines[position].strip():
+                    yield number, position, json.loads(lines[position])
+
+
+def query_records(directory: str, query: RecordQuery, limit: int = 100,
+                  cursor: Optional[str] = None) -> Dict[str, Any]:
+    """Returns up to ``limit`` matching records in storage order.
+
+    Only index files are read for blocks the index rules out; the cursor in
+    the result resumes right after the last returned record.
+    """
+    start = decode_cursor(cursor) if cursor else None
+    records: List[Dict[str, Any]] = []
+    stats = {"segments_read": 0, "blocks_read": 0, "blocks_skipped": 0}
+
+    for path in list_segments(directory):
+        base = segment_base(path)
+        if start is not None and base < start[0]:
+            continue
+        block, line = start[1:] if start is not None and base == start[0] else (0, 0)
+        read_before = stats["blocks_read"]
+        for number, position, record in scan_segment(path, block, line, query.may_match, stats):
+            if not query.matches(record):
+                continue
+            records.append(record)
+            if len(records) >= limit:
+                stats["segments_read"] += 1
+                return {"records": records, "next_cursor": encode_cursor(base, number, position + 1), "stats": stats}
+        stats["segments_read"] += stats["blocks_read"] > read_before
+
+    return {"records": records, "next_cursor": None, "stats": stats}
+
+
+def stage_report(directory: str, query: RecordQuery, limit: int = 10000, slowest: int = 10) -> Dict[str, Any]:
+    """Stage durations from ``metadata.trace`` of up to ``limit`` matching records.
+
+    Per stage: count, mean, p95 and max in milliseconds, plus the ``slowest``
+    traces by total time. ``next_cursor`` is set when more records matched
+    than were analysed.
+    """
+    page = query_records(directory, query, limit=limit)
+    durations: Dict[str, List[float]] = {}
+    traces: List[Dict[str, Any]] = []
+    for record in page["records"]:
+        trace = (record.get("metadata") or {}).get("trace")
+        if not isinstance(trace, dict) or not isinstance(trace.get("stages"), dict):
+            continue
+        for stage, ms in trace["stages"].items():
+            if isinstance(ms, (int, float)):
+                durations.setdefault(stage, []).append(float(ms))
+        traces.append({
+            "trace_id": trace.get("trace_id"),
+            "timestamp": record.get("timestamp"),
+            "command": record.get("command"),
+            "total_ms": trace.get("total_ms"),
+            "stages": trace["stages"],
+        })
+
+    stages = {}
+    for stage, values in durations.items():
+        values.sort()
+        stages[stage] = {
+            "count": len(values),
+            "mean_ms": round(sum(values) / len(values), 3),
+            "p95_ms": round(values[min(len(values) - 1, int(len(values) * 0.95))], 3),
+            "max_ms": round(values[-1], 3),
+        }
+    traces.sort(key=lambda t: t["total_ms"] if isinstance(t["total_ms"], (int, float)) else 0.0, reverse=True)
+    return {
+        "records": len(page["records"]),
+        "traced": len(traces),
+        # Most expensive stage first
+        "stages": dict(sorted(stages.items(), key=lambda item: item[1]["mean_ms"], reverse=True)),
+        "slowest": traces[:slowest],
+        "next_cursor": page["next_cursor"],
+    }
+
+
+_writer: Optional[SegmentWriter] = None
+_writer_lock = threading.Lock()
+
+
+def get_writer(config: Optional[StorageConfig] = None) -> SegmentWriter:
+    """The writer for this process.
+
+    A new one is created after a fork (e.g. gunicorn with ``--preload``) or
+    when the configured directory changes.
+    """
+    global _writer
+    config = config or StorageConfig.from_env()
+    with _writer_lock:
+        writer = _writer
+        if writer is None or writer.pid != os.getpid() or writer.config.directory != config.directory:
+            if writer is not None and writer.pid == os.getpid():
+                writer.close()
+            writer = _writer = SegmentWriter(config)
+        return writer
+
+
+@atexit.register
+def _close_writer() -> None:
+    writer = _writer
+    if writer is not None and writer.pid == os.getpid():
+        writer.close()
@@ -5,7 +5,7 @@ setup(
     version='1.0.0',
     author='harrie19',
     description='Eine interaktive, erweiterbare Kommandozeilenanwendung.',
-    py_modules=["main", "config", "commands", "command_processor"],
+    py_modules=["main", "config", "commands", "command_processor", "http_client", "flight_recorder_shipper", "cache", "policy_client", "policy_engine", "file_ops", "text_analysis", "command_registry", "expression_engine", "web_server", "metrics", "tracing", "circuit_breaker", "pipeline"],
     entry_points={
         'console_scripts': [
             'cli-app=main:run',
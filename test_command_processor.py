@@ -1,4 +1,5 @@
 import pytest
+import pytest_asyncio
 import asyncio
 from unittest.mock import patch, MagicMock
 
@@ -54,24 +55,23 @@ async def test_process_wetter_command_success(processor):
             return False
 
     class DummySession:
+        closed = False
+
         def __init__(self, response):
             self._response = response
 
-        async def __aenter__(self):
-            return self
-
-        async def __aexit__(self, exc_type, exc, tb):
-            return False
-
-        def get(self, url):
+        def request(self, method, url, **kwargs):
             return DummyResponseCtx(self._response)
 
+        async def close(self):
+            self.closed = True
+
     dummy_payload = {
         "weather": [{"description": "klarer Himmel"}],
         "main": {"temp": 25.0}
     }
 
-    with patch('commands.aiohttp.ClientSession', return_value=DummySession(DummyResponse(200, dummy_payload))):
+    with patch.object(processor.http, '_new_session', return_value=DummySession(DummyResponse(200, dummy_payload))):
         result = await processor.process("Wetter:Teststadt")
 
     assert result['status'] == 'success'
@@ -116,3 +116,341 @@ async def test_process_time_command(processor):
     result = await processor.process("Zeit")
     assert result['status'] == 'success'
     assert result['result'].startswith("Aktuelle Zeit:")
+
+@pytest.mark.asyncio
+async def test_process_many_preserves_order_and_overlaps(processor):
+    """Batch-Verarbeitung liefert Ergebnisse in Eingabereihenfolge und läuft nebenläufig."""
+    running = 0
+    peak = 0
+
+    async def slow_handler(command):
+        nonlocal running, peak
+        running += 1
+        peak = max(peak, running)
+        await asyncio.sleep(0.01 if command.endswith('1') else 0.02)
+        running -= 1
+        return {"status": "success", "result": command}
+
+    commands = [f"Zeit {i}" for i in range(12)]
+    results = await processor.process_many(commands, concurrency=4, handler=slow_handler)
+    assert [r['result'] for r in results] == commands
+    assert peak == 4
+
+@pytest.mark.asyncio
+async def test_process_many_uses_process_by_default(processor):
+    results = await processor.process_many(["Zeit", "Unbekannt", "Rechner:1+1"])
+    assert [r['status'] for r in results] == ['success', 'error', 'success']
+    assert results[2]['result'] == "Ergebnis: 2"
+
+@pytest_asyncio.fixture
+async def local_server():
+    """Lokaler HTTP-Server als Gegenstelle für Netzwerk-Befehle."""
+    from aiohttp import web
+
+    async def ok(request):
+        await asyncio.sleep(0.05)
+        return web.Response(body=b"x" * 1234)
+
+    async def missing(request):
+        return web.Response(status=404)
+
+    app = web.Application()
+    app.router.add_get('/ok', ok)
+    app.router.add_get('/missing', missing)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    site = web.TCPSite(runner, '127.0.0.1', 0)
+    await site.start()
+    port = site._server.sockets[0].getsockname()[1]
+    yield f"http://127.0.0.1:{port}"
+    await runner.cleanup()
+
+@pytest.mark.asyncio
+async def test_netzwerk_fetches_urls_concurrently(processor, local_server):
+    """Mehrere URLs werden nebenläufig abgefragt und einzeln berichtet."""
+    urls = ",".join([f"{local_server}/ok"] * 5 + [f"{local_server}/missing"])
+    started = asyncio.get_running_loop().time()
+    result = await processor.process(f"Netzwerk:{urls}")
+    elapsed = asyncio.get_running_loop().time() - started
+    await processor.close()
+
+    assert result['status'] == 'success'
+    lines = result['result'].splitlines()
+    assert lines[0] == "Netzwerk: 6/6 URLs erreichbar"
+    assert "Status 200, 1234 Bytes" in lines[1]
+    assert "Status 404" in lines[6]
+    assert elapsed < 0.2
+
+@pytest.mark.asyncio
+async def test_netzwerk_reports_unreachable_url(processor):
+    result = await processor.process("Netzwerk:http://127.0.0.1:1/nirgends")
+    await processor.close()
+    assert result['status'] == 'error'
+    assert result['result'].startswith("Netzwerkfehler bei http://127.0.0.1:1/nirgends")
+
+@pytest.mark.asyncio
+async def test_lesen_tail_with_cap(processor, tmp_path):
+    """Lesen liefert Ausschnitte und kürzt große Ausgaben."""
+    path = tmp_path / "gross.log"
+    path.write_text("".join(f"{i}\n" for i in range(1000)), encoding="utf-8")
+
+    result = await processor.process(f"Lesen:{path}:tail=2")
+    assert result == {"status": "success", "result": "998\n999\n"}
+
+    result = await processor.process(f"Lesen:{path}:max=4")
+    assert result['result'] == "0\n1\n\n[... Ausgabe auf 4 Bytes gekürzt]"
+
+    result = await processor.process(f"Lesen:{path}:lines=abc")
+    assert result['status'] == 'error'
+
+@pytest.mark.asyncio
+async def test_speichern_anhaengen_atomic(processor, tmp_path):
+    """Speichern ersetzt Dateien atomar, Anhängen erweitert sie."""
+    path = tmp_path / "notiz.txt"
+    result = await processor.process(f"Speichern:{path}:Hallo")
+    assert result == {"status": "success", "result": f"Datei '{path}' erfolgreich gespeichert."}
+    result = await processor.process(f"Anhängen:{path}: Welt")
+    assert result['status'] == 'success'
+    await processor.close()
+    assert path.read_text(encoding="utf-8") == "Hallo Welt"
+    # Keine temporären Dateien zurückgelassen
+    assert [p.name for p in tmp_path.iterdir()] == ["notiz.txt"]
+
+@pytest.mark.asyncio
+async def test_loeschen_glob_and_multiple(processor, tmp_path):
+    """Löschen entfernt Dateien per Glob-Muster und Liste in einem Befehl."""
+    for i in range(20):
+        (tmp_path / f"scratch{i}.tmp").write_text("x")
+    (tmp_path / "behalten.txt").write_text("x")
+
+    result = await processor.process(f"Löschen:{tmp_path}/*.tmp,{tmp_path}/fehlt.txt")
+    assert result['status'] == 'success'
+    assert result['result'].splitlines()[0] == "20 Datei(en) gelöscht."
+    assert "Nicht gefunden:" in result['result']
+    assert [p.name for p in tmp_path.iterdir()] == ["behalten.txt"]
+
+    result = await processor.process(f"Löschen:{tmp_path}/behalten.txt")
+    assert result['result'] == f"Datei '{tmp_path}/behalten.txt' erfolgreich gelöscht."
+    result = await processor.process(f"Löschen:{tmp_path}/behalten.txt")
+    assert result == {"status": "error", "result": "Fehler: Datei nicht gefunden."}
+    await processor.close()
+
+@pytest.mark.asyncio
+async def test_analyse_file_reports_top_terms(processor, tmp_path):
+    """Analyse einer Datei liefert Zählungen und häufigste Begriffe."""
+    path = tmp_path / "text.txt"
+    path.write_text("rot grün rot blau rot grün\n", encoding="utf-8")
+    result = await processor.process(f"Analyse:{path}:top=2")
+    await processor.close()
+    assert result['status'] == 'success'
+    assert result['result'].splitlines() == [
+        "Analyse: 6 Wörter, 27 Zeichen in 1 Datei(en).",
+        "Häufigste Begriffe: rot (3), grün (2)",
+    ]
+
+
+@pytest.mark.asyncio
+async def test_command_abbreviation_and_suggestion(processor):
+    """Eindeutige Abkürzungen werden aufgelöst, Tippfehler bekommen Vorschläge."""
+    result = await processor.process("ze:")
+    assert result['status'] == 'success'
+
+    result = await processor.process("Zeitt:")
+    assert result == {"status": "error", "result": "Befehl 'Zeitt' nicht gefunden. Meinten Sie: Zeit?"}
+
+    result = await processor.process("L:datei.txt")
+    assert result == {"status": "error", "result": "Befehl 'L' ist mehrdeutig: Lesen, Löschen."}
+
+
+@pytest_asyncio.fixture
+async def weather_server():
+    """Lokale OpenWeatherMap-Attrappe, die ihre Aufrufe mitzählt."""
+    from aiohttp import web
+
+    calls = []
+
+    async def weather(request):
+        city = request.query['q']
+        calls.append(city)
+        await asyncio.sleep(0.05)
+        if city == "Nirgendwo":
+            return web.json_response({"message": "city not found"}, status=404)
+        return web.json_response({"weather": [{"description": "sonnig"}], "main": {"temp": 21.5}})
+
+    app = web.Application()
+    app.router.add_get('/weather', weather)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    site = web.TCPSite(runner, '127.0.0.1', 0)
+    await site.start()
+    port = site._server.sockets[0].getsockname()[1]
+    yield f"http://127.0.0.1:{port}/weather", calls
+    await runner.cleanup()
+
+@pytest.mark.asyncio
+async def test_wetter_coalesces_and_caches(config, weather_server):
+    """Gleichzeitige Anfragen teilen sich einen API-Aufruf, Folgeanfragen kommen aus dem Cache."""
+    url, calls = weather_server
+    config.openweathermap_url = url
+    processor = CommandProcessor(config)
+    try:
+        results = await asyncio.gather(*(processor.process("Wetter:Berlin") for _ in range(5)))
+        assert {r['result'] for r in results} == {"Wetter in Berlin: sonnig, Temperatur: 21.5°C"}
+        assert calls == ["Berlin"]
+
+        await processor.process("Wetter:berlin")
+        assert calls == ["Berlin"]
+        assert processor.status()["wetter"]["coalesced"] == 4
+
+        # Fehlerantworten werden nicht zwischengespeichert
+        await processor.process("Wetter:Nirgendwo")
+        await processor.process("Wetter:Nirgendwo")
+        assert calls.count("Nirgendwo") == 2
+    finally:
+        await processor.close()
+
+@pytest.mark.asyncio
+async def test_wetter_multiple_cities(config, weather_server):
+    """Mehrere Städte werden nebenläufig abgefragt und in Eingabereihenfolge berichtet."""
+    url, calls = weather_server
+    config.openweathermap_url = url
+    processor = CommandProcessor(config)
+    try:
+        result = await processor.process("Wetter:Berlin, München,Nirgendwo")
+    finally:
+        await processor.close()
+    assert result['status'] == 'success'
+    assert result['result'].splitlines() == [
+        "Wetter: 2/3 Städte abgerufen",
+        "Wetter in Berlin: sonnig, Temperatur: 21.5°C",
+        "Wetter in München: sonnig, Temperatur: 21.5°C",
+        "Fehler beim Abrufen der Wetterdaten: city not found",
+    ]
+    assert sorted(calls) == ["Berlin", "München", "Nirgendwo"]
+
+
+@pytest.mark.asyncio
+async def test_rechner_variables_ranges_and_rejected_syntax(processor):
+    """Rechner wertet Variablen und Bereiche aus und lehnt unsichere Ausdrücke ab."""
+    result = await processor.process("Rechner:x**2 + 3*x; x=2")
+    assert result == {"status": "success", "result": "Ergebnis: 10"}
+
+    result = await processor.process("Rechner:2*x; x=1..4")
+    assert result == {"status": "success", "result": "Ergebnis: 3 Werte, min=2, max=6, Summe=12, Mittelwert=4"}
+
+    result = await processor.process("Rechner:().__class__")
+    assert result['status'] == 'error'
+    assert result['result'].startswith("Fehler bei der Auswertung:")
+
+
+@pytest.mark.asyncio
+async def test_pure_commands_are_cached_until_the_file_changes(processor, tmp_path):
+    """Lesen/Analyse/Rechner landen im Ergebnis-Cache; Lesen erkennt geänderte Dateien."""
+    path = tmp_path / "notiz.txt"
+    path.write_text("eins", encoding="utf-8")
+
+    assert (await processor.process(f"Lesen:{path}"))["result"] == "eins"
+    assert (await processor.process(f"Lesen:{path}"))["result"] == "eins"
+    assert processor.results.hits == 1
+
+    path.write_text("zwei, jetzt länger", encoding="utf-8")
+    assert (await processor.process(f"Lesen:{path}"))["result"] == "zwei, jetzt länger"
+
+    results = await asyncio.gather(*(processor.process("Analyse:ein kleiner Test") for _ in range(5)))
+    assert {r["result"] for r in results} == {"Analyse: 3 Wörter, 16 Zeichen."}
+    stats = processor.status()["result_cache"]
+    assert stats["coalesced"] + stats["hits"] >= 4 and stats["bytes"] > 0
+
+    # Nicht reine Befehle und Fehler werden nicht gecacht
+    await processor.process("Zeit")
+    await processor.process("Rechner:1/0")
+    assert len(processor.results) == 3
+    await processor.close()
+
+
+@pytest.mark.asyncio
+async def test_pipeline_streams_file_through_filter_and_analysis(processor, tmp_path):
+    """Lesen | Filtern | Analyse läuft abschnittsweise, ohne die Datei als Ganzes zu halten."""
+    path = tmp_path / "app.log"
+    path.write_text("".join(f"{'ERROR' if i % 10 == 0 else 'INFO'} Zeile {i}\n" for i in range(50000)),
+                    encoding="utf-8")
+
+    chunks = [chunk async for chunk in processor.process_stream(f"Lesen:{path} | Filtern:^ERROR")]
+    assert len(chunks) > 1
+    lines = "".join(chunks).splitlines()
+    assert len(lines) == 5000 and lines[1] == "ERROR Zeile 10"
+
+    result = await processor.process(f"Lesen:{path} | Filtern:^ERROR | Analyse:top=1")
+    assert result == {"status": "success",
+                      "result": "Analyse: 15000 Wörter, 88889 Zeichen.\nHäufigste Begriffe: error (5000)"}
+
+    result = await processor.process(f"Lesen:{tmp_path / 'fehlt.log'} | Filtern:x")
+    assert result == {"status": "error", "result": "Fehler: Datei nicht gefunden."}
+    assert processor.is_read_only(f"Lesen:{path} | Filtern:x")
+    assert not processor.is_read_only("Speichern:b:x | Filtern:x")
+    await processor.close()
+
+
+@pytest.mark.asyncio
+async def test_pipe_in_an_argument_is_not_a_pipeline(processor, tmp_path):
+    """`` | `` ist nur dann ein Trenner, wenn jede weitere Stufe ein Befehl ist, der Eingabe verarbeitet."""
+    target = tmp_path / "a.txt"
+    result = await processor.process(f"Speichern:{target}:foo | bar")
+    assert result["status"] == "success"
+    assert target.read_text(encoding="utf-8") == "foo | bar"
+
+    assert await processor.process("Analyse:Hallo | Welt") == {"status": "success",
+                                                              "result": "Analyse: 3 Wörter, 12 Zeichen."}
+    # Abkürzungen zählen nicht als Stufe, Befehle ohne Eingabe ebenso wenig
+    assert not processor.is_pipeline("Analyse:Hallo | an")
+    assert not processor.is_pipeline("Lesen:a.txt | Rechner")
+    assert processor.is_pipeline("Lesen:a.txt | filtern:x | ANALYSE")
+    await processor.close()
+
+
+@pytest.mark.asyncio
+async def test_rechner_powers_run_off_the_event_loop_with_a_timeout(config):
+    """Teure Potenzen blockieren die Event-Loop nicht und brechen nach dem Zeitlimit ab."""
+    import time as _time
+
+    config.rechner_timeout = 0.05
+    processor = CommandProcessor(config)
+    rechner = processor._find_command_case_insensitive("Rechner")
+    original = rechner.engine.compile
+
+    def slow_compile(source):
+        compiled = original(source)
+        evaluate = compiled.evaluate
+
+        class Slow:
+            def evaluate(self, scalars, deadline=None):
+                _time.sleep(0.2)
+                return evaluate(scalars, deadline)
+        return Slow()
+
+    rechner.engine.compile = slow_compile
+    ticks = 0
+
+    async def ticker():
+        nonlocal ticks
+        while True:
+            await asyncio.sleep(0.01)
+            ticks += 1
+
+    task = asyncio.ensure_future(ticker())
+    result = await processor.process("Rechner:2**10")
+    task.cancel()
+    assert result == {"status": "error", "result": "Fehler bei der Auswertung: Zeitlimit von 0.05 s überschritten"}
+    assert ticks >= 2
+
+    rechner.engine.compile = original
+    result = await processor.process("Rechner:(10**10000)**10000")
+    assert result["status"] == "error" and "Ergebnis zu groß" in result["result"]
+
+    # Auch ohne Potenz: lange Produkte und riesige Belegungen werden vor der Auswertung abgelehnt
+    result = await processor.process("Rechner:" + "*".join(["x"] * 300) + "; x=9")
+    assert result["status"] == "error" and "verschachtelt" in result["result"]
+    result = await processor.process("Rechner:x*x; x=" + "9" * 4299)
+    assert result["status"] == "error" and "Zahl zu lang" in result["result"]
+    await processor.close()
+    await processor.close()
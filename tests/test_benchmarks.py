@@ -0,0 +1,40 @@
+import asyncio
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'benchmarks'))
+
+import bench_suite  # noqa: E402
+from stand_ins import StandIns  # noqa: E402
+
+
+def test_compare_flags_slower_latency_and_lower_throughput():
+    baseline = {"results": {
+        "process": {"zeit": {"median_ms": 1.0, "runs": 100}},
+        "ingest": {"shipper": {"records_per_s": 1000.0}},
+        "policy": {"cached": {"median_ms": 0.01}},
+    }}
+    current = {"results": {
+        "process": {"zeit": {"median_ms": 1.5, "runs": 10}},
+        "ingest": {"shipper": {"records_per_s": 700.0}},
+        # Below the noise floor: not a regression although three times slower
+        "policy": {"cached": {"median_ms": 0.03}},
+    }}
+
+    comparison = bench_suite.compare(current, baseline, tolerance=0.2)
+
+    assert [r[0] for r in comparison["regressions"]] == [
+        "ingest.shipper.records_per_s",
+        "process.zeit.median_ms",
+    ]
+    assert bench_suite.compare(baseline, current, tolerance=0.2)["regressions"] == []
+
+
+def test_suite_runs_against_stand_ins():
+    with StandIns(weather_latency=0) as services:
+        results = asyncio.run(bench_suite.run_suite(services, runs=3, records=50))
+
+    assert results["process"]["wetter_uncached"]["runs"] == 3
+    assert results["policy"]["cached"]["median_ms"] <= results["policy"]["uncached"]["median_ms"]
+    assert results["ingest"]["shipper"]["records"] == 50
+    assert set(results["repl"]) >= {"zeit", "zeit_policy_uncached"}
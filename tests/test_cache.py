@@ -0,0 +1,106 @@
+import asyncio
+
+import pytest
+
+from cache import RefreshingCache, ResultCache, TTLCache
+
+
+def test_ttl_cache_evicts_least_recently_used():
+    cache = TTLCache(max_size=2)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    cache.get("a")
+    cache.set("c", 3)
+    assert cache.get("b") is None
+    assert cache.get("a") == 1
+    assert cache.stats()["evictions"] == 1
+
+
+@pytest.mark.asyncio
+async def test_refreshing_cache_serves_stale_and_refreshes_once():
+    calls = []
+
+    async def fetch():
+        calls.append(1)
+        await asyncio.sleep(0.01)
+        return len(calls)
+
+    cache = RefreshingCache(ttl=0.05, stale_ttl=10)
+    assert await cache.get("k", fetch) == 1
+    await asyncio.sleep(0.06)
+
+    # Abgelaufen, aber innerhalb von stale_ttl: alter Wert sofort, eine Aktualisierung
+    assert await asyncio.gather(cache.get("k", fetch), cache.get("k", fetch)) == [1, 1]
+    await asyncio.sleep(0.03)
+    assert len(calls) == 2
+    assert await cache.get("k", fetch) == 2
+    assert cache.stats()["refreshes"] == 1
+
+
+@pytest.mark.asyncio
+async def test_refreshing_cache_does_not_store_uncacheable_values():
+    async def fetch():
+        return "fehler"
+
+    cache = RefreshingCache(cacheable=lambda value: value != "fehler")
+    assert await cache.get("k", fetch) == "fehler"
+    assert len(cache) == 0
+
+
+@pytest.mark.asyncio
+async def test_result_cache_coalesces_and_bounds_bytes():
+    calls = []
+
+    async def compute(value):
+        calls.append(value)
+        await asyncio.sleep(0.01)
+        return value
+
+    cache = ResultCache(max_bytes=200, weigh=len)
+    results = await asyncio.gather(*(cache.get("a", lambda: compute("x" * 80)) for _ in range(5)))
+    assert results == ["x" * 80] * 5 and len(calls) == 1
+    assert cache.stats()["coalesced"] == 4
+
+    await cache.get("b", lambda: compute("y" * 80))
+    await cache.get("c", lambda: compute("z" * 80))
+    assert cache.bytes == 160 and len(cache) == 2
+    assert cache.stats()["evictions"] == 1
+
+    # Einzelne Werte über max_bytes werden nie gespeichert, kurze TTLs verfallen
+    await cache.get("d", lambda: compute("w" * 300))
+    await cache.get("e", lambda: compute("v"), ttl=0.01)
+    await asyncio.sleep(0.02)
+    await cache.get("e", lambda: compute("v"))
+    assert calls.count("v") == 2 and "d" not in cache._data
+
+
+@pytest.mark.asyncio
+async def test_result_cache_cancels_compute_without_waiters_and_skips_speculative_values():
+    started, finished = asyncio.Event(), []
+
+    async def slow():
+        started.set()
+        await asyncio.sleep(1)
+        finished.append(1)
+        return "x"
+
+    cache = ResultCache()
+    first = asyncio.ensure_future(cache.get("k", slow))
+    second = asyncio.ensure_future(cache.get("k", slow))
+    await started.wait()
+    first.cancel()
+    await asyncio.sleep(0)
+    # Ein anderer Aufrufer wartet noch: die Berechnung läuft weiter
+    assert cache._inflight and not cache._inflight["k"].done()
+    second.cancel()
+    await asyncio.gather(first, second, return_exceptions=True)
+    await asyncio.sleep(0)
+    assert cache._inflight == {} and cache._waiters == {} and finished == []
+
+    async def fast():
+        return "y"
+
+    assert await cache.get("s", fast, store=False) == "y"
+    assert len(cache) == 0
+    assert await cache.get("s", fast) == "y"
+    assert await cache.get("s", fast, store=False) == "y" and cache.stats()["hits"] == 1
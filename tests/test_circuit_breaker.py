@@ -0,0 +1,100 @@
+import asyncio
+
+import pytest
+import pytest_asyncio
+from aiohttp import web
+
+from circuit_breaker import CLOSED, HALF_OPEN, OPEN, SHORT_CIRCUITS, CircuitBreaker, health_url
+
+
+class _Config:
+    circuit_failure_threshold = 2
+    circuit_probe_interval = 0.01
+    circuit_probe_timeout = 0.5
+    circuit_reset_timeout = 0.05
+    http_total_timeout = 0.05
+
+
+@pytest_asyncio.fixture
+async def health_server():
+    state = {"healthy": False, "probes": 0}
+
+    async def health(request):
+        state["probes"] += 1
+        if not state["healthy"]:
+            return web.json_response({"status": "down"}, status=503)
+        return web.json_response({"status": "healthy"})
+
+    app = web.Application()
+    app.router.add_get('/health', health)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    site = web.TCPSite(runner, '127.0.0.1', 0)
+    await site.start()
+    port = site._server.sockets[0].getsockname()[1]
+    state["url"] = f"http://127.0.0.1:{port}/health"
+    yield state
+    await runner.cleanup()
+
+
+def test_health_url_replaces_the_endpoint():
+    assert health_url("http://h:8080/policy_check", "/policy_check") == "http://h:8080/health"
+    assert health_url("http://h:8090/flight_record/batch/", "/flight_record/batch") == "http://h:8090/health"
+    assert health_url(None) is None
+
+
+@pytest.mark.asyncio
+async def test_opens_after_consecutive_failures_and_closes_after_health_probe(health_server):
+    breaker = CircuitBreaker("test-probe", _Config(), probe_url=health_server["url"])
+    breaker.record_failure("timeout")
+    breaker.record_success()
+    breaker.record_failure("timeout")
+    assert breaker.state == CLOSED
+
+    breaker.record_failure("timeout")
+    assert breaker.state == OPEN
+    assert not breaker.allow()
+    assert SHORT_CIRCUITS.value("test-probe") >= 1
+
+    await asyncio.sleep(0.05)
+    assert breaker.state == OPEN and health_server["probes"] >= 1
+
+    health_server["healthy"] = True
+    for _ in range(100):
+        if breaker.state != OPEN:
+            break
+        await asyncio.sleep(0.01)
+    assert breaker.state == HALF_OPEN and breaker.allow()
+    # Solange der Versuch läuft, scheitern weitere Aufrufe sofort
+    short_circuited = breaker.stats()["short_circuited"]
+    assert not breaker.allow() and breaker.stats()["short_circuited"] == short_circuited + 1
+
+    # Erster echter Fehler im halb offenen Zustand öffnet sofort wieder
+    breaker.record_failure("still broken")
+    assert breaker.state == OPEN and breaker.stats()["trips"] == 2
+    for _ in range(100):
+        if breaker.state != OPEN:
+            break
+        await asyncio.sleep(0.01)
+    breaker.record_success()
+    assert breaker.stats()["state"] == CLOSED
+    await breaker.close()
+    await breaker._http.close()
+
+
+def test_without_health_url_a_trial_call_is_allowed_after_reset_timeout():
+    import time
+
+    breaker = CircuitBreaker("test-timeout", _Config())
+    breaker.record_failure()
+    breaker.record_failure()
+    assert not breaker.allow()
+    time.sleep(0.06)
+    assert breaker.allow() and breaker.state == HALF_OPEN
+    assert not breaker.allow()
+
+    # Ein Versuch ohne Ergebnis gibt nach http_total_timeout den nächsten frei
+    time.sleep(0.06)
+    assert breaker.allow() and not breaker.allow()
+    breaker.record_success()
+    assert breaker.state == CLOSED and breaker.allow() and breaker.allow()
@@ -0,0 +1,108 @@
+import os
+
+import command_registry
+from command_registry import CommandRegistry
+
+
+class _FakeEntryPoint:
+    name = "Echo"
+    value = "tests.test_command_registry:EchoCommand"
+
+    def load(self):
+        return EchoCommand
+
+
+class EchoCommand:
+    description = "Gibt den Wert zurück."
+
+    def __init__(self, config=None):
+        self.config = config
+
+    async def execute(self, value):
+        return {"status": "success", "result": value}
+
+
+def test_manifest_lists_commands_without_instantiating(tmp_path):
+    registry = CommandRegistry({"config": None}, manifest_path=str(tmp_path / "manifest.json"))
+    assert "wetter" in registry
+    assert registry.spec("Wetter").description.startswith("Ruft das Wetter")
+    assert registry.loaded() == []
+
+    instance = registry.get("WETTER")
+    assert type(instance).__name__ == "WetterCommand"
+    assert registry.get("wetter") is instance
+    assert registry.loaded() == [instance]
+
+
+def test_manifest_is_cached(tmp_path, monkeypatch):
+    manifest = tmp_path / "manifest.json"
+    CommandRegistry({}, manifest_path=str(manifest))
+    assert manifest.exists()
+
+    def fail(*args, **kwargs):
+        raise AssertionError("Quelltext sollte nicht erneut gescannt werden")
+
+    monkeypatch.setattr(command_registry, "scan_module_source", fail)
+    assert "zeit" in CommandRegistry({}, manifest_path=str(manifest))
+
+
+def test_entry_points_are_only_scanned_when_sys_path_changes(tmp_path, monkeypatch):
+    manifest = str(tmp_path / "manifest.json")
+    site = tmp_path / "site-packages"
+    site.mkdir()
+    monkeypatch.setattr(command_registry.sys, "path", [str(site)])
+    scans = []
+
+    def entry_points():
+        scans.append(1)
+        return [_FakeEntryPoint()] if (site / "echo.dist-info").exists() else []
+
+    monkeypatch.setattr(command_registry, "_plugin_entry_points", entry_points)
+    CommandRegistry({}, manifest_path=manifest)
+    assert "echo" not in CommandRegistry({}, manifest_path=manifest)
+    assert len(scans) == 1
+
+    # Eine Installation ändert die mtime von site-packages
+    (site / "echo.dist-info").mkdir()
+    os.utime(site, ns=(0, 1))
+    assert "echo" in CommandRegistry({}, manifest_path=manifest)
+    assert "echo" in CommandRegistry({}, manifest_path=manifest)
+    assert len(scans) == 2
+
+
+def test_plugin_commands_from_entry_points(tmp_path, monkeypatch):
+    monkeypatch.setattr(command_registry, "_plugin_entry_points", lambda: [_FakeEntryPoint()])
+    registry = CommandRegistry({"config": "cfg", "http": object()}, manifest_path=str(tmp_path / "m.json"))
+    assert registry.spec("echo").description == "Gibt den Wert zurück."
+    instance = registry.get("Echo")
+    assert type(instance).__name__ == "EchoCommand"
+    assert instance.config == "cfg"
+
+
+def test_normalized_lookup_and_abbreviations(tmp_path):
+    registry = CommandRegistry({}, manifest_path=str(tmp_path / "manifest.json"))
+    assert registry.spec("loeschen").name == "Löschen"
+    assert registry.spec("LÖSCHEN").name == "Löschen"
+    assert registry.spec("We").name == "Wetter"
+    assert registry.spec("Lö").name == "Löschen"
+    # "L" passt auf Lesen und Löschen
+    assert registry.resolve("L") is None
+    assert registry.suggestions("L") == (["Lesen", "Löschen"], True)
+
+
+def test_completion_and_suggestions(tmp_path):
+    registry = CommandRegistry({}, manifest_path=str(tmp_path / "manifest.json"))
+    assert registry.complete("an") == ["Analyse", "Anhängen"]
+    assert registry.complete("x") == []
+    assert registry.suggestions("Wettr") == (["Wetter"], False)
+    assert registry.suggestions("Unbekannt") == ([], False)
+
+
+def test_all_commands_share_the_processor_resources(tmp_path):
+    http, files = object(), object()
+    registry = CommandRegistry({"config": None, "http": http, "files": files},
+                               manifest_path=str(tmp_path / "manifest.json"))
+    for name in ("Rechner", "Hilfe", "Wetter", "Lesen"):
+        instance = registry.get(name)
+        assert instance._http is http and instance._files is files
+    assert "Rechner" in registry.get("Hilfe").all_commands
@@ -0,0 +1,107 @@
+import time
+
+import pytest
+
+import expression_engine
+from expression_engine import ExpressionEngine, ExpressionError, parse_request
+
+
+def test_evaluates_arithmetic_functions_and_variables():
+    engine = ExpressionEngine()
+    assert engine.compile("2*3+1").evaluate() == 7
+    assert engine.compile("sqrt(16) + pi*0").evaluate() == 4.0
+    assert engine.compile("x**2 + 3*x").evaluate({"x": 2}) == 10
+
+
+@pytest.mark.parametrize("source", [
+    "__import__('os')",
+    "().__class__",
+    "(lambda: 1)()",
+    "[1, 2][0]",
+    "'text'",
+    "open('x')",
+    "_pow(2, 3)",
+])
+def test_rejects_non_whitelisted_syntax(source):
+    with pytest.raises(ExpressionError):
+        ExpressionEngine().compile(source)
+
+
+def test_rejects_huge_exponents_and_missing_variables():
+    engine = ExpressionEngine()
+    with pytest.raises(ExpressionError):
+        engine.compile("9**9**9").evaluate()
+    with pytest.raises(ExpressionError, match="y"):
+        engine.compile("x + y").evaluate({"x": 1})
+
+
+def test_compiled_expressions_are_cached():
+    engine = ExpressionEngine(cache_size=2)
+    first = engine.compile("1+1")
+    assert engine.compile(" 1+1 ") is first
+    engine.compile("2+2")
+    engine.compile("3+3")
+    assert engine.compile("1+1") is not first
+    assert engine.stats()["hits"] == 1
+
+
+def test_parse_request_ranges_lists_and_scalars():
+    source, scalars, columns = parse_request("a*x + b; x=0..5; a=2; b=[1,2,3,4,5]", 100)
+    assert source == "a*x + b"
+    assert scalars == {"a": 2}
+    assert list(columns["x"]) == [0, 1, 2, 3, 4]
+    assert columns["b"] == [1, 2, 3, 4, 5]
+
+    with pytest.raises(ExpressionError):
+        parse_request("x; x=0..1000", 100)
+    with pytest.raises(ExpressionError):
+        parse_request("x+y; x=[1,2]; y=[1,2,3]", 100)
+
+
+@pytest.mark.parametrize("vectorize", [True, False])
+def test_evaluate_many_matches_scalar_results(vectorize):
+    compiled = ExpressionEngine().compile("x**2 + 3*x")
+    values = compiled.evaluate_many({"x": [0, 1, 2, 3]}, vectorize=vectorize)
+    assert [float(v) for v in values] == [0, 4, 10, 18]
+
+
+@pytest.mark.skipif(expression_engine.numpy is None, reason="NumPy nicht installiert")
+def test_million_points_are_vectorized():
+    _, scalars, columns = parse_request("x**2+3*x; x=0..1000000", 10_000_000)
+    compiled = ExpressionEngine().compile("x**2+3*x")
+    started = time.perf_counter()
+    values = compiled.evaluate_many(columns, scalars)
+    assert time.perf_counter() - started < 1.0
+    assert len(values) == 1_000_000
+    assert expression_engine.summarize(values).startswith("1000000 Werte, min=0, max=1000000999998")
+
+
+def test_nested_powers_are_bounded_by_result_size():
+    engine = ExpressionEngine()
+    assert engine.compile("(2**100)**100").evaluate() == 2 ** 10000
+    started = time.perf_counter()
+    with pytest.raises(ExpressionError, match="Ergebnis zu groß"):
+        engine.compile("(10**10000)**10000").evaluate()
+    assert time.perf_counter() - started < 1.0
+
+
+def test_products_literals_depth_and_deadline_are_bounded():
+    engine = ExpressionEngine(max_length=10_000)
+    nines = "9" * 4299
+    product = engine.compile("*".join(["x"] * 98))
+    started = time.perf_counter()
+    with pytest.raises(ExpressionError, match="Ergebnis zu groß"):
+        product.evaluate({"x": int(nines)})
+    assert time.perf_counter() - started < 2.0
+
+    with pytest.raises(ExpressionError, match="Zahl zu lang"):
+        parse_request("x*x; x=" + nines, 100)
+    with pytest.raises(ExpressionError, match="verschachtelt"):
+        engine.compile("*".join(["x"] * 450))
+    with pytest.raises(ExpressionError, match="verschachtelt"):
+        engine.compile("-" * 5000 + "1")
+
+    with pytest.raises(expression_engine.EvaluationTimeout):
+        engine.compile("2**100 * 3").evaluate(deadline=time.monotonic() - 1)
+    with pytest.raises(expression_engine.EvaluationTimeout):
+        engine.compile("x * 2").evaluate_many({"x": [1, 2]}, vectorize=False, deadline=time.monotonic() - 1)
@@ -0,0 +1,52 @@
+import pytest
+
+import file_ops
+
+
+@pytest.fixture
+def log_file(tmp_path):
+    path = tmp_path / "log.txt"
+    path.write_text("".join(f"zeile {i} {'denied' if i % 3 == 0 else 'approved'}\n" for i in range(1, 11)),
+                    encoding="utf-8")
+    return path
+
+
+def test_split_read_spec_keeps_colons_in_filenames():
+    assert file_ops.split_read_spec("Wetter:Berlin") == ("Wetter:Berlin", {})
+    assert file_ops.split_read_spec("a:b.log:tail=5;grep=x;y") == ("a:b.log", {"tail": "5", "grep": "x;y"})
+
+
+def test_tail_and_head(log_file):
+    text, truncated = file_ops.read_file(str(log_file), {"tail": "2"}, 1024)
+    assert text == "zeile 9 denied\nzeile 10 approved\n"
+    assert truncated is None
+    text, _ = file_ops.read_file(str(log_file), {"head": "1"}, 1024)
+    assert text == "zeile 1 approved\n"
+
+
+def test_line_and_byte_ranges(log_file):
+    text, _ = file_ops.read_file(str(log_file), {"lines": "2-3"}, 1024)
+    assert text == "zeile 2 approved\nzeile 3 denied\n"
+    text, _ = file_ops.read_file(str(log_file), {"bytes": "0-4"}, 1024)
+    assert text == "zeile"
+
+
+def test_grep_within_window(log_file):
+    text, _ = file_ops.read_file(str(log_file), {"grep": "denied"}, 1024)
+    assert text.splitlines() == ["zeile 3 denied", "zeile 6 denied", "zeile 9 denied"]
+    text, _ = file_ops.read_file(str(log_file), {"grep": "denied", "tail": "5"}, 1024)
+    assert text.splitlines() == ["zeile 6 denied", "zeile 9 denied"]
+
+
+def test_payload_cap(log_file):
+    text, truncated = file_ops.read_file(str(log_file), {}, 10)
+    assert text == "zeile 1 ap"
+    assert truncated == 10
+    _, truncated = file_ops.read_file(str(log_file), {"grep": "zeile", "max": "20"}, 1024)
+    assert truncated == 20
+
+
+def test_empty_file(tmp_path):
+    path = tmp_path / "leer.txt"
+    path.write_bytes(b"")
+    assert file_ops.read_file(str(path), {"tail": "3"}, 1024) == ("", None)
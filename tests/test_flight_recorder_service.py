@@ -1,13 +1,12 @@
 import json
 import pytest
-from pathlib import Path
-import os
+import recorder_storage
+import flight_recorder_service
 from flight_recorder_service import app
 
 @pytest.fixture
 def client(tmp_path, monkeypatch):
-    log_path = tmp_path / "flight_recorder.log"
-    monkeypatch.setenv("FLIGHT_RECORDER_LOG", str(log_path))
+    monkeypatch.setenv("FLIGHT_RECORDER_DIR", str(tmp_path / "segments"))
     app.config['TESTING'] = True
     with app.test_client() as client:
         yield client
@@ -29,9 +28,80 @@ def test_record_event(client, tmp_path):
     assert response.status_code == 200
     assert response.get_json()["status"] == "recorded"
 
-    log_path = tmp_path / "flight_recorder.log"
-    assert log_path.exists()
-    lines = log_path.read_text(encoding="utf-8").strip().splitlines()
-    assert len(lines) == 1
-    entry = json.loads(lines[0])
-    assert entry["command"] == "Zeit"
+    segments = recorder_storage.list_segments(str(tmp_path / "segments"))
+    assert len(segments) == 1
+    records = list(recorder_storage.iter_records(str(tmp_path / "segments")))
+    assert len(records) == 1
+    assert records[0]["command"] == "Zeit"
+
+def test_record_batch_ndjson(client, tmp_path):
+    events = [
+        {"command": f"Zeit {i}", "policy_status": "approved", "timestamp": f"2025-01-01T00:00:0{i}Z"}
+        for i in range(3)
+    ]
+    body = "".join(json.dumps(e) + "\n" for e in events)
+
+    response = client.post('/flight_record/batch', data=body, content_type='application/x-ndjson')
+    assert response.status_code == 200
+    assert response.get_json() == {"status": "recorded", "count": 3}
+
+    records = recorder_storage.iter_records(str(tmp_path / "segments"))
+    assert [r["timestamp"] for r in records] == [e["timestamp"] for e in events]
+
+def test_record_batch_rejects_invalid_line(client):
+    response = client.post('/flight_record/batch', data='{"command": "Zeit"}\nkein json\n',
+                           content_type='application/x-ndjson')
+    assert response.status_code == 400
+
+def test_query_records_filters_and_paginates(client):
+    events = [
+        {"command": "Wetter:Berlin" if i % 2 else "Zeit", "policy_status": "denied" if i % 3 == 0 else "approved",
+         "timestamp": f"2025-01-01T00:00:{i:02d}Z"}
+        for i in range(20)
+    ]
+    client.post('/flight_record/batch', json=events)
+
+    response = client.get('/flight_records', query_string={"command": "wetter:b", "limit": 3})
+    page = response.get_json()
+    assert response.status_code == 200
+    assert [r["timestamp"][-3:-1] for r in page["records"]] == ["01", "03", "05"]
+
+    page = client.get('/flight_records', query_string={"command": "wetter:b", "cursor": page["next_cursor"]}).get_json()
+    assert [r["timestamp"][-3:-1] for r in page["records"]] == ["07", "09", "11", "13", "15", "17", "19"]
+    assert page["next_cursor"] is None
+
+    page = client.get('/flight_records', query_string={
+        "since": "2025-01-01T00:00:05Z", "until": "2025-01-01T00:00:15Z", "status": "denied",
+    }).get_json()
+    assert [r["timestamp"][-3:-1] for r in page["records"]] == ["06", "09", "12"]
+
+def test_query_records_rejects_bad_parameters(client):
+    assert client.get('/flight_records', query_string={"since": "gestern"}).status_code == 400
+    assert client.get('/flight_records', query_string={"cursor": "kaputt"}).status_code == 400
+    assert client.get('/flight_records', query_string={"limit": "0"}).status_code == 400
+
+def test_metrics_count_ingested_records(client):
+    before = flight_recorder_service.INGESTED.value("batch")
+    body = "".join(json.dumps({"command": f"Zeit {i}"}) + "\n" for i in range(4))
+    client.post('/flight_record/batch', data=body, content_type='application/x-ndjson')
+
+    assert flight_recorder_service.INGESTED.value("batch") == before + 4
+    text = client.get('/metrics').get_data(as_text=True)
+    assert 'flight_recorder_persist_duration_seconds_count{endpoint="batch"}' in text
+    assert "flight_recorder_storage_records" in text
+
+def test_stage_report_aggregates_traces(client):
+    events = [
+        {"command": "Wetter:Berlin", "metadata": {"trace": {
+            "trace_id": f"t{i}", "total_ms": 10.0 * i, "stages": {"policy": 1.0, "execute": 9.0 * i}}}}
+        for i in range(1, 4)
+    ] + [{"command": "Zeit", "metadata": {"source": "cli-app"}}]
+    body = "".join(json.dumps(e) + "\n" for e in events)
+    client.post('/flight_record/batch', data=body, content_type='application/x-ndjson')
+
+    report = client.get('/flight_records/stages?slowest=2').get_json()
+
+    assert report["records"] == 4 and report["traced"] == 3
+    assert list(report["stages"]) == ["execute", "policy"]
+    assert report["stages"]["execute"] == {"count": 3, "mean_ms": 18.0, "p95_ms": 27.0, "max_ms": 27.0}
+    assert [t["trace_id"] for t in report["slowest"]] == ["t3", "t2"]
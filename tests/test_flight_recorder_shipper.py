@@ -0,0 +1,143 @@
+import json
+
+import pytest
+import pytest_asyncio
+from aiohttp import web
+
+from flight_recorder_shipper import FlightRecorderShipper
+
+
+class _Config:
+    def __init__(self, url, spool):
+        self.flight_recorder_url = url
+        self.flight_recorder_spool = str(spool)
+        self.flight_recorder_flush_interval = 0.05
+
+
+@pytest_asyncio.fixture
+async def recorder_server():
+    state = {"batches": [], "up": True}
+
+    async def batch(request):
+        if not state["up"]:
+            return web.json_response({"status": "down"}, status=503)
+        body = await request.read()
+        state["batches"].append([json.loads(l) for l in body.splitlines()])
+        return web.json_response({"status": "recorded"})
+
+    app = web.Application()
+    app.router.add_post('/flight_record/batch', batch)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    site = web.TCPSite(runner, '127.0.0.1', 0)
+    await site.start()
+    port = site._server.sockets[0].getsockname()[1]
+    state["url"] = f"http://127.0.0.1:{port}/flight_record"
+    yield state
+    await runner.cleanup()
+
+
+@pytest.mark.asyncio
+async def test_entries_are_spooled_and_shipped_in_batches(recorder_server, tmp_path):
+    spool = tmp_path / "spool.log"
+    shipper = FlightRecorderShipper(_Config(recorder_server["url"], spool))
+    for i in range(50):
+        assert shipper.submit({"command": f"Zeit {i}"})
+    await shipper.close()
+
+    shipped = [e["command"] for b in recorder_server["batches"] for e in b]
+    assert shipped == [f"Zeit {i}" for i in range(50)]
+    assert len(recorder_server["batches"]) < 50
+    assert len(spool.read_text(encoding="utf-8").splitlines()) == 50
+    assert int((tmp_path / "spool.log.offset").read_text()) == spool.stat().st_size
+
+
+@pytest.mark.asyncio
+async def test_backfill_after_outage(recorder_server, tmp_path):
+    spool = tmp_path / "spool.log"
+    recorder_server["up"] = False
+    shipper = FlightRecorderShipper(_Config(recorder_server["url"], spool))
+    shipper.submit({"command": "Zeit"})
+    await shipper.close()
+    assert recorder_server["batches"] == []
+
+    recorder_server["up"] = True
+    shipper = FlightRecorderShipper(_Config(recorder_server["url"], spool))
+    shipper.submit({"command": "Hilfe"})
+    await shipper.close()
+    shipped = [e["command"] for b in recorder_server["batches"] for e in b]
+    assert shipped == ["Zeit", "Hilfe"]
+
+
+@pytest.mark.asyncio
+async def test_full_queue_drops_without_blocking(tmp_path):
+    cfg = _Config(None, tmp_path / "spool.log")
+    cfg.flight_recorder_queue_size = 1
+    shipper = FlightRecorderShipper(cfg)
+    assert shipper.submit({"command": "a"})
+    assert not shipper.submit({"command": "b"})
+    assert shipper.dropped == 1
+    await shipper.close()
+
+
+@pytest.mark.asyncio
+async def test_per_process_spools_adopt_records_of_finished_workers(recorder_server, tmp_path):
+    import os
+    import subprocess
+    import sys
+
+    finished = subprocess.run([sys.executable, "-c", "import os; print(os.getpid())"],
+                              capture_output=True, text=True, check=True)
+    orphan = tmp_path / f"spool.log.{finished.stdout.strip()}"
+    orphan.write_text('{"command": "alt"}\n{"command": "offen 1"}\n{"command": "offen 2"}\n', encoding="utf-8")
+    (tmp_path / f"{orphan.name}.offset").write_text(str(len('{"command": "alt"}\n')))
+
+    cfg = _Config(recorder_server["url"], tmp_path / "spool.log")
+    cfg.flight_recorder_spool_per_process = True
+    shipper = FlightRecorderShipper(cfg)
+    assert shipper.spool_path == str(tmp_path / f"spool.log.{os.getpid()}")
+    shipper.submit({"command": "neu"})
+    await shipper.close()
+
+    shipped = [e["command"] for b in recorder_server["batches"] for e in b]
+    assert shipped == ["offen 1", "offen 2", "neu"]
+    assert sorted(p.name for p in tmp_path.iterdir()) == [f"spool.log.{os.getpid()}", f"spool.log.{os.getpid()}.offset"]
+
+
+@pytest.mark.asyncio
+async def test_torn_and_rejected_lines_are_set_aside_and_spool_is_compacted(recorder_server, tmp_path):
+    spool = tmp_path / "spool.log"
+    # Abgerissene Zeile nach einem Absturz mitten im Anhängen
+    spool.write_text('{"command": "alt"}\n{"comm', encoding="utf-8")
+    (tmp_path / "spool.log.offset").write_text("0")
+    cfg = _Config(recorder_server["url"], spool)
+    cfg.flight_recorder_spool_compact_bytes = 1
+    shipper = FlightRecorderShipper(cfg)
+    shipper.submit({"command": "neu"})
+    await shipper.close()
+
+    shipped = [e["command"] for b in recorder_server["batches"] for e in b]
+    assert shipped == ["alt", "neu"]
+    assert (tmp_path / "spool.log.rejected").read_text(encoding="utf-8") == '{"comm\n'
+    assert shipper.rejected == 1
+    assert spool.stat().st_size == 0 and (tmp_path / "spool.log.offset").read_text() == "0"
+
+    # Ein 4xx wird nicht endlos wiederholt
+    async def reject(request):
+        return web.json_response({"status": "error"}, status=400)
+
+    recorder_server["batches"].clear()
+    app = web.Application()
+    app.router.add_post('/flight_record/batch', reject)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    site = web.TCPSite(runner, '127.0.0.1', 0)
+    await site.start()
+    port = site._server.sockets[0].getsockname()[1]
+    shipper = FlightRecorderShipper(_Config(f"http://127.0.0.1:{port}/flight_record", spool))
+    shipper.submit({"command": "abgelehnt"})
+    await shipper.close()
+    await runner.cleanup()
+    assert shipper.rejected == 1 and shipper.breaker.state == "closed"
+    assert (tmp_path / "spool.log.rejected").read_text(encoding="utf-8").endswith('{"command": "abgelehnt"}\n')
+    assert int((tmp_path / "spool.log.offset").read_text()) == spool.stat().st_size
@@ -0,0 +1,48 @@
+import pytest
+import pytest_asyncio
+from aiohttp import web
+
+from http_client import HttpClient
+
+
+@pytest_asyncio.fixture
+async def server_url():
+    async def ping(request):
+        return web.json_response({"status": "ok"})
+
+    app = web.Application()
+    app.router.add_get('/ping', ping)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    site = web.TCPSite(runner, '127.0.0.1', 0)
+    await site.start()
+    port = site._server.sockets[0].getsockname()[1]
+    yield f"http://127.0.0.1:{port}/ping"
+    await runner.cleanup()
+
+
+@pytest.mark.asyncio
+async def test_session_is_reused(server_url):
+    client = HttpClient()
+    async with client.get(server_url) as resp:
+        assert resp.status == 200
+    first = client._session
+    async with client.get(server_url) as resp:
+        assert (await resp.json())["status"] == "ok"
+    assert client._session is first
+    await client.close()
+    assert client._session is None
+
+
+@pytest.mark.asyncio
+async def test_pool_settings_from_config(server_url):
+    class Cfg:
+        http_limit_per_host = 3
+        http_total_timeout = 1.5
+
+    client = HttpClient(Cfg())
+    async with client.get(server_url):
+        pass
+    assert client._session.connector.limit_per_host == 3
+    assert client._session.timeout.total == 1.5
+    await client.close()
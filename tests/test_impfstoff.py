@@ -0,0 +1,135 @@
+import json
+
+import pytest
+
+import impfstoff
+from impfstoff import Impfstoff, ThreatCounter, next_version
+from policy_engine import GUEST_REASON, PolicyEngine, normalize_command
+from recorder_storage import SegmentWriter, StorageConfig
+
+
+def _record(command, status="approved", result="ok", role="cli_user"):
+    return {"timestamp": "2025-12-08T10:00:00Z", "command": command, "policy_status": status, "result": result,
+            "metadata": {"user_role": role}}
+
+
+def _setup(tmp_path):
+    rules = tmp_path / "policy_rules.json"
+    rules.write_text(json.dumps({"version": "2025-12-08.1", "blocked_patterns": ["rm -rf"],
+                                 "destructive_keywords": ["rm"]}), encoding="utf-8")
+    writer = SegmentWriter(StorageConfig(str(tmp_path / "records"), fsync="never", index_block_bytes=500))
+    miner = lambda: Impfstoff(str(tmp_path / "records"), str(rules), str(tmp_path / "state.json"), threshold=5,
+                              review_file=str(tmp_path / "review.json"))
+    return rules, writer, miner
+
+
+def test_only_rule_denials_become_candidates_for_review(tmp_path):
+    rules, writer, miner = _setup(tmp_path)
+    for _ in range(6):
+        writer.append([
+            _record("Löschen:rm /srv/data", status="denied", result=GUEST_REASON, role="guest"),
+            _record("Lesen:/etc/shadow", result="Fehler: Zugriff verweigert"),
+            _record("Lesen:/etc/passwd", status="unavailable", result="Policy-Service nicht erreichbar"),
+            _record("Lesen:/etc/hosts", status="denied", result="Nicht erlaubt"),
+        ])
+    writer.append([_record("Löschen:rm -rf /", status="denied", result="Blocked pattern detected: rm -rf")] * 10)
+
+    report = miner().run()
+    assert report["records"] == 34
+    assert report["threats"] == 16
+    assert [(c["pattern"], c["roles"]) for c in report["candidates"]] == [("löschen:rm /srv/data", ["guest"])]
+
+    # Vorschläge landen nur in der Review-Datei, die Regeln bleiben unverändert
+    review = json.loads((tmp_path / "review.json").read_text(encoding="utf-8"))
+    assert [c["pattern"] for c in review["candidates"]] == ["löschen:rm /srv/data"]
+    assert "learned_patterns" not in json.loads(rules.read_text(encoding="utf-8"))
+    writer.close()
+
+
+def test_approved_candidates_are_enforced(tmp_path):
+    rules, writer, miner = _setup(tmp_path)
+    for _ in range(6):
+        writer.append([_record("Löschen:rm /srv/data", status="denied", result=GUEST_REASON, role="guest")])
+    miner().run()
+
+    with pytest.raises(ValueError):
+        miner().approve(["Lesen:/etc/shadow"])
+    # Nur für Gäste abgelehnt: die Freigabe sperrt den Befehl für alle Rollen und muss bestätigt werden
+    with pytest.raises(ValueError, match="--all-roles"):
+        miner().approve(["Löschen:rm /srv/data"])
+    assert "learned_patterns" not in json.loads(rules.read_text(encoding="utf-8"))
+    report = miner().approve(["Löschen:rm /srv/data"], all_roles=True)
+    assert [c["pattern"] for c in report["approved"]] == ["löschen:rm /srv/data"]
+
+    data = json.loads(rules.read_text(encoding="utf-8"))
+    assert data["version"] == next_version("2025-12-08.1")
+    assert data["learned_patterns"][0]["roles"] == ["guest"]
+    engine = PolicyEngine(str(rules))
+    assert engine.decide("LÖSCHEN:rm /srv/data", {"user_role": "cli_user"})[0] == "denied"
+    assert engine.decide("LÖSCHEN:rm /srv/data", {"user_role": "admin"})[0] == "denied"
+    assert json.loads((tmp_path / "review.json").read_text(encoding="utf-8"))["candidates"] == []
+    writer.close()
+
+
+def test_runs_only_process_new_records(tmp_path):
+    rules, writer, miner = _setup(tmp_path)
+    denied = _record("Löschen:rm /root/.ssh", status="denied", result=GUEST_REASON, role="guest")
+    for _ in range(3):
+        writer.append([denied])
+    assert miner().run()["candidates"] == []
+
+    assert miner().run()["records"] == 0
+
+    for _ in range(3):
+        writer.append([denied])
+    report = miner().run()
+    assert report["records"] == 3
+    assert [c["pattern"] for c in report["candidates"]] == ["löschen:rm /root/.ssh"]
+
+    # Freigegebene Muster werden nicht erneut vorgeschlagen
+    miner().approve(["Löschen:rm /root/.ssh"], all_roles=True)
+    writer.append([denied])
+    assert miner().run()["candidates"] == []
+    writer.close()
+
+
+def test_sealed_segments_are_marked_done(tmp_path):
+    _, writer, miner = _setup(tmp_path)
+    writer.append([_record("Zeit")])
+    writer.rotate()
+    writer.append([_record("Zeit")])
+    miner().run()
+    state = json.loads((tmp_path / "state.json").read_text(encoding="utf-8"))
+    assert [s["done"] for _, s in sorted(state["segments"].items())] == [True, False]
+    writer.close()
+
+
+def test_counter_is_bounded_and_decays():
+    counter = ThreatCounter(capacity=10, half_life=100)
+    for i in range(50):
+        for _ in range(i):
+            counter.add(f"sig{i}", 0)
+    assert len(counter.entries) <= 10
+    assert "sig49" in counter.entries
+
+    counter.updated_at = 0
+    counter.decay(100)
+    assert counter.entries["sig49"][0] == 24.5
+
+
+def test_next_version():
+    assert next_version("2025-12-08.1", today="2025-12-08") == "2025-12-08.2"
+    assert next_version("2025-12-08.3", today="2025-12-09") == "2025-12-09.1"
+    assert next_version(None, today="2025-12-09") == "2025-12-09.1"
+
+
+def test_signature_uses_the_engine_normalization():
+    assert impfstoff.signature(">  Lesen:/ETC/Shadow ") == "lesen:/etc/shadow"
+    # Die Engine unterscheidet Leerzeichen; ein Muster mit zusammengefassten Leerzeichen träfe "rm  -rf" nicht
+    assert impfstoff.signature("rm  -rf /") == normalize_command("rm  -rf /")
+
+
+def test_old_checkpoint_entries_get_a_role_list():
+    counter = ThreatCounter.from_dict({"entries": {"sig": [3.0, 0, 0]}}, capacity=10, half_life=100)
+    counter.add("sig", 1, "guest")
+    assert counter.entries["sig"] == [4.0, 0, 1, ["guest", "unknown"]]
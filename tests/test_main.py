@@ -0,0 +1,202 @@
+from unittest.mock import MagicMock
+
+import pytest
+
+import main
+from command_processor import CommandProcessor
+from config import Configuration
+
+
+@pytest.fixture
+def processor(tmp_path):
+    config = MagicMock(spec=Configuration)
+    config.openweathermap_key = None
+    config.flight_recorder_spool = str(tmp_path / "spool.log")
+    return CommandProcessor(config)
+
+
+@pytest.mark.asyncio
+async def test_run_script_prints_results_in_order(processor, tmp_path, capsys):
+    lines = ["# Kommentar", "", "Rechner:2*3", "> Analyse:ein kleiner Test", "Rechner:1+1"]
+    exit_code = await main.run_script(processor, lines)
+    assert exit_code == 0
+    out = capsys.readouterr().out.splitlines()
+    assert out == ["Ergebnis: 6", "Analyse: 3 Wörter, 16 Zeichen.", "Ergebnis: 2"]
+    assert len((tmp_path / "spool.log").read_text(encoding="utf-8").splitlines()) == 3
+
+
+@pytest.mark.asyncio
+async def test_run_script_reports_failures(processor, capsys):
+    exit_code = await main.run_script(processor, ["Zeit", "Unbekannt"])
+    assert exit_code == 1
+    assert capsys.readouterr().out.splitlines()[-1] == "Fehler: Befehl 'Unbekannt' nicht gefunden."
+
+
+def test_command_batch_endpoint(processor):
+    main.processor = processor
+    main.app.config['TESTING'] = True
+    with main.app.test_client() as client:
+        response = client.post('/command/batch', json={"commands": ["Rechner:1+2", "Unbekannt"]})
+        assert response.status_code == 200
+        results = response.get_json()["results"]
+        assert results[0] == {"status": "success", "result": "Ergebnis: 3"}
+        assert results[1]["status"] == "error"
+        assert client.post('/command/batch', json={}).status_code == 400
+    main._on_processor_loop(processor.close())
+
+
+def test_flask_requests_share_one_long_lived_processor_loop(processor, monkeypatch):
+    import asyncio
+
+    loops = []
+
+    async def execute(proc, command, **kwargs):
+        loops.append(asyncio.get_running_loop())
+        # Timer wie FileOps._mark_dirty müssen nach dem Request weiterlaufen
+        fired = asyncio.Event()
+        asyncio.get_running_loop().call_later(0.01, fired.set)
+        await fired.wait()
+        return {"status": "success", "result": command}
+
+    monkeypatch.setattr(main, "execute_command", execute)
+    main.processor = processor
+    with main.app.test_client() as client:
+        assert client.post('/command', json={"command": "a"}).get_json()["result"] == "a"
+        assert client.post('/command/batch', json={"commands": ["b", "c"]}).status_code == 200
+    assert len(loops) == 3 and len(set(map(id, loops))) == 1
+    assert loops[0] is main._processor_loop() and loops[0].is_running()
+    main._on_processor_loop(processor.close())
+
+
+def test_completer_lists_commands_and_builtins(processor):
+    complete = main.make_completer(processor)
+    assert complete("we", 0) == "Wetter:"
+    assert complete("we", 1) is None
+    assert [complete("s", i) for i in range(3)] == ["Speichern:", "status", None]
+
+
+@pytest.mark.asyncio
+async def test_execute_command_traces_stages_into_flight_record(processor, tmp_path):
+    import json
+
+    contexts = []
+
+    async def approve(command, context):
+        contexts.append(context)
+        return True, {"policy_status": "approved"}
+
+    processor.policy.check = approve
+    result = await main.execute_command(processor, "Rechner:1+1")
+    await processor.close()
+
+    assert result["result"] == "Ergebnis: 2"
+    record = json.loads((tmp_path / "spool.log").read_text(encoding="utf-8"))
+    trace = record["metadata"]["trace"]
+    assert record["metadata"]["source"] == "cli-app"
+    assert contexts[0]["trace_id"] == trace["trace_id"]
+    assert contexts[0]["user_role"] == "cli_user"
+    assert set(trace["stages"]) == {"parse", "lookup", "policy", "execute"}
+    assert trace["total_ms"] >= sum(trace["stages"].values()) - 0.01
+
+
+@pytest.mark.asyncio
+async def test_read_only_command_runs_during_policy_check(processor):
+    import asyncio
+
+    events = []
+
+    async def slow_approve(command, context):
+        events.append("policy:start")
+        await asyncio.sleep(0.05)
+        events.append("policy:done")
+        return True, {"policy_status": "approved"}
+
+    original = processor.process
+
+    async def process(command, **kwargs):
+        events.append("process")
+        return await original(command, **kwargs)
+
+    processor.policy.check = slow_approve
+    processor.process = process
+    assert processor.is_read_only("Rechner:1+1") and not processor.is_read_only("Speichern:x:y")
+
+    # Ohne Policy-Service (bzw. bei Cache-Treffer) wartet nichts, es wird nicht spekuliert
+    assert (await main.execute_command(processor, "Rechner:1+1"))["result"] == "Ergebnis: 2"
+    assert events == ["policy:start", "policy:done", "process"]
+
+    events.clear()
+    processor.policy.url = "http://127.0.0.1:9/policy_check"
+    assert (await main.execute_command(processor, "Rechner:1+1"))["result"] == "Ergebnis: 2"
+    assert events.index("process") < events.index("policy:done")
+
+    events.clear()
+    processor.policy.cache.set(processor.policy._cache_key("Rechner:1+1", main.CLI_CONTEXT), {})
+    await main.execute_command(processor, "Rechner:1+1")
+    assert events == ["policy:start", "policy:done", "process"]
+
+    events.clear()
+    await main.execute_command(processor, f"Speichern:{processor.config.flight_recorder_spool}.txt:x")
+    assert events == ["policy:start", "policy:done", "process"]
+    await processor.close()
+
+
+@pytest.mark.asyncio
+async def test_speculative_result_is_discarded_on_denial(processor, tmp_path):
+    import json
+
+    async def deny(command, context):
+        return False, {"policy_status": "denied", "reason": "Nicht erlaubt"}
+
+    processor.policy.check = deny
+    processor.policy.url = "http://127.0.0.1:9/policy_check"
+    result = await main.execute_command(processor, "Lesen:geheim.txt")
+    await processor.close()
+
+    assert result == {"status": "error", "result": "Nicht erlaubt"}
+    record = json.loads((tmp_path / "spool.log").read_text(encoding="utf-8"))
+    assert record["policy_status"] == "denied"
+    assert record["metadata"]["speculative"] is True
+    assert main.SPECULATIONS.value("discarded") >= 1
+
+
+@pytest.mark.asyncio
+async def test_unreachable_policy_service_uses_fail_mode_per_command_class(processor, tmp_path):
+    import json
+
+    async def unavailable(command, context):
+        return False, {"policy_status": "unavailable", "reason": "Policy-Service nicht erreichbar"}
+
+    processor.policy.check = unavailable
+    processor.policy.fail_mode_read_only = "open"
+    assert (await main.execute_command(processor, "Rechner:1+1"))["result"] == "Ergebnis: 2"
+    result = await main.execute_command(processor, f"Speichern:{tmp_path / 'x.txt'}:x")
+    await processor.close()
+
+    assert result == {"status": "error", "result": "Policy-Service nicht erreichbar"}
+    assert not (tmp_path / "x.txt").exists()
+    records = [json.loads(line) for line in (tmp_path / "spool.log").read_text(encoding="utf-8").splitlines()]
+    assert [r["policy_status"] for r in records] == ["fail-open", "unavailable"]
+
+
+@pytest.mark.asyncio
+async def test_stream_command_writes_pipeline_output_and_records_a_summary(processor, tmp_path):
+    import io
+    import json
+
+    async def approve(command, context):
+        return True, {"policy_status": "approved"}
+
+    path = tmp_path / "app.log"
+    path.write_text("ok\nERROR eins\nok\nERROR zwei\n", encoding="utf-8")
+    processor.policy.check = approve
+    out = io.StringIO()
+    assert await main.stream_command(processor, f"Lesen:{path} | Filtern:ERROR", out)
+    assert not await main.stream_command(processor, f"Lesen:{path} | Filtern:(", out)
+    await processor.close()
+
+    assert out.getvalue() == ("ERROR eins\nERROR zwei\n"
+                              "Fehler: Fehler: Ungültiger regulärer Ausdruck: missing ), unterminated subpattern at position 0\n")
+    records = [json.loads(line) for line in (tmp_path / "spool.log").read_text(encoding="utf-8").splitlines()]
+    assert records[0]["result"] == "Pipeline: 1 Abschnitt(e), 22 Zeichen ausgegeben"
+    assert "stages" in records[0]["metadata"]["trace"]
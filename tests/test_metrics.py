@@ -0,0 +1,82 @@
+import pytest
+from flask import Flask
+
+import metrics
+
+
+def test_counter_and_gauge_render_in_prometheus_format():
+    registry = metrics.Registry()
+    checks = registry.counter("checks_total", "Checks", ("status",))
+    checks.inc("approved")
+    checks.inc("approved", amount=2)
+    checks.inc('de"nied')
+    depth = registry.gauge("queue_depth", "Queue depth")
+    depth.set_function(lambda: 7)
+
+    text = registry.render()
+
+    assert "# TYPE checks_total counter" in text
+    assert 'checks_total{status="approved"} 3' in text
+    assert 'checks_total{status="de\\"nied"} 1' in text
+    assert "queue_depth 7" in text
+    assert text.endswith("\n")
+
+
+def test_histogram_buckets_are_cumulative():
+    registry = metrics.Registry()
+    latency = registry.histogram("latency_seconds", "Latency", ("command",), buckets=(0.01, 0.1, 1))
+    for value in (0.005, 0.05, 0.05, 5):
+        latency.observe(value, "zeit")
+
+    lines = registry.render().splitlines()
+
+    assert 'latency_seconds_bucket{command="zeit",le="0.01"} 1' in lines
+    assert 'latency_seconds_bucket{command="zeit",le="0.1"} 3' in lines
+    assert 'latency_seconds_bucket{command="zeit",le="1"} 3' in lines
+    assert 'latency_seconds_bucket{command="zeit",le="+Inf"} 4' in lines
+    assert 'latency_seconds_count{command="zeit"} 4' in lines
+    assert latency.count("zeit") == 4
+
+
+def test_observe_many_and_non_string_labels():
+    registry = metrics.Registry()
+    latency = registry.histogram("stage_seconds", "Stage", ("stage",), buckets=(0.01, 0.1))
+    latency.observe_many([(0.005, ("parse",)), (0.05, ("execute",)), (0.5, ("parse",))])
+    assert latency.count("parse") == 2 and latency.count("execute") == 1
+
+    codes = registry.counter("codes_total", "Codes", ("code",))
+    codes.inc(1)
+    codes.inc("1")
+    codes.inc(True)
+    assert codes.value("1") == 2 and codes.value("True") == 1
+    with pytest.raises(ValueError):
+        codes.inc()
+
+
+def test_registry_returns_existing_metric_and_checks_labels():
+    registry = metrics.Registry()
+    first = registry.counter("requests_total", "Requests", ("route",))
+    assert registry.counter("requests_total", "Requests", ("route",)) is first
+    with pytest.raises(ValueError):
+        registry.gauge("requests_total", "Requests")
+    with pytest.raises(ValueError):
+        first.inc("a", "b")
+
+
+def test_instrument_flask_times_routes_and_serves_metrics():
+    registry = metrics.Registry()
+    app = Flask(__name__)
+
+    @app.get("/items/<int:item>")
+    def item(item):
+        return {"item": item}
+
+    metrics.instrument_flask(app, "test", registry)
+    client = app.test_client()
+    client.get("/items/1")
+    client.get("/items/2")
+
+    response = client.get("/metrics")
+    assert response.content_type == metrics.CONTENT_TYPE
+    assert 'test_http_request_duration_seconds_count{route="/items/<int:item>",method="GET",status="200"} 2' \
+        in response.get_data(as_text=True)
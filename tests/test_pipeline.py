@@ -0,0 +1,45 @@
+import asyncio
+
+import pytest
+
+import pipeline
+
+
+def test_split_requires_whitespace_around_the_pipe():
+    assert pipeline.split("Lesen:app.log | Filtern:ERROR|WARN |  Analyse") == [
+        "Lesen:app.log", "Filtern:ERROR|WARN", "Analyse"]
+    assert not pipeline.is_pipeline("Lesen:app.log:grep=a|b")
+
+
+@pytest.mark.asyncio
+async def test_buffered_applies_backpressure_and_stops_the_producer():
+    produced = []
+    closed = asyncio.Event()
+
+    async def producer():
+        try:
+            for i in range(1000):
+                produced.append(i)
+                yield f"{i}\n"
+        finally:
+            closed.set()
+
+    stream = pipeline.buffered(producer(), 2)
+    assert await stream.__anext__() == "0\n"
+    await asyncio.sleep(0.01)
+    # Puffer (2) + ein wartendes put + der gelieferte Abschnitt
+    assert len(produced) <= 4
+
+    await stream.aclose()
+    await asyncio.wait_for(closed.wait(), 1)
+    assert len(produced) <= 4
+
+
+@pytest.mark.asyncio
+async def test_line_blocks_rejoins_lines_split_across_chunks():
+    async def chunks():
+        for chunk in ("eins\nzw", "ei\ndr", "ei"):
+            yield chunk
+
+    blocks = [block async for block in pipeline.line_blocks(chunks())]
+    assert blocks == [["eins\n"], ["zwei\n"], ["drei"]]
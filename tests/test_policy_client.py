@@ -0,0 +1,200 @@
+import pytest
+import pytest_asyncio
+from aiohttp import web
+
+from cache import TTLCache
+from policy_client import PolicyClient
+from policy_engine import RuleSet
+
+
+def _served_version(state):
+    # Wie policy_service: deklarierte Version plus Hash des Inhalts
+    return RuleSet.from_dict({"version": state["version"], "blocked_patterns": state["blocked"]}).version
+
+
+@pytest_asyncio.fixture
+async def policy_server():
+    state = {"calls": 0, "version": "v1", "max_age": 60, "rule_fetches": 0, "blocked": ["rm -rf"]}
+
+    async def policy_check(request):
+        state["calls"] += 1
+        payload = await request.json()
+        # Wie policy_engine: Abgleich auf dem kleingeschriebenen, sonst unveränderten Befehl
+        status = "denied" if "rm -rf" in payload["command"].lower() else "approved"
+        return web.json_response({
+            "policy_status": status,
+            "reason": "test",
+            "rules_version": _served_version(state),
+            "cache": {"max_age": state["max_age"]},
+        })
+
+    async def policy_rules(request):
+        state["rule_fetches"] += 1
+        etag = f'"{_served_version(state)}"'
+        if request.headers.get("If-None-Match") == etag:
+            return web.Response(status=304)
+        return web.json_response({"version": state["version"], "blocked_patterns": state["blocked"]},
+                                 headers={"ETag": etag})
+
+    app = web.Application()
+    app.router.add_post('/policy_check', policy_check)
+    app.router.add_get('/policy_rules', policy_rules)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    site = web.TCPSite(runner, '127.0.0.1', 0)
+    await site.start()
+    port = site._server.sockets[0].getsockname()[1]
+    state["url"] = f"http://127.0.0.1:{port}/policy_check"
+    yield state
+    await runner.cleanup()
+
+
+def _client(url, **settings):
+    class Cfg:
+        policy_url = url
+    cfg = Cfg()
+    for key, value in settings.items():
+        setattr(cfg, key, value)
+    return PolicyClient(cfg)
+
+
+@pytest.mark.asyncio
+async def test_repeated_commands_hit_the_cache(policy_server):
+    client = _client(policy_server["url"])
+    ctx = {"user_role": "cli_user"}
+    assert (await client.check("Zeit", ctx))[0]
+    assert (await client.check("zeit", ctx))[0]
+    assert not (await client.check("rm -rf /", ctx))[0]
+    assert not (await client.check("rm -rf /", ctx))[0]
+    assert policy_server["calls"] == 2
+    assert client.stats()["hits"] == 2
+    await client._http.close()
+
+
+@pytest.mark.asyncio
+async def test_denied_command_is_never_served_from_an_approved_variant(policy_server):
+    client = _client(policy_server["url"])
+    ctx = {"user_role": "cli_user"}
+    assert (await client.check("Lesen:x rm  -rf /", ctx))[0]
+    assert not (await client.check("Lesen:x rm -rf /", ctx))[0]
+    assert not (await client.check("Lesen:x RM -RF /", ctx))[0]
+    assert (await client.check("Lesen:STRASSE", ctx))[0]
+    await client.check("Lesen:straße", ctx)
+    assert policy_server["calls"] == 4
+    await client._http.close()
+
+
+@pytest.mark.asyncio
+async def test_context_is_part_of_the_key(policy_server):
+    client = _client(policy_server["url"])
+    await client.check("Zeit", {"user_role": "cli_user"})
+    await client.check("Zeit", {"user_role": "guest"})
+    assert policy_server["calls"] == 2
+    await client._http.close()
+
+
+@pytest.mark.asyncio
+async def test_trace_ids_are_not_part_of_the_key(policy_server):
+    client = _client(policy_server["url"])
+    await client.check("Zeit", {"user_role": "cli_user", "trace_id": "a", "session_id": "s"})
+    await client.check("Zeit", {"user_role": "cli_user", "trace_id": "b", "session_id": "s"})
+    assert policy_server["calls"] == 1
+    await client._http.close()
+
+
+@pytest.mark.asyncio
+async def test_max_age_zero_disables_caching(policy_server):
+    policy_server["max_age"] = 0
+    client = _client(policy_server["url"])
+    await client.check("Zeit", {})
+    await client.check("Zeit", {})
+    assert policy_server["calls"] == 2
+    await client._http.close()
+
+
+@pytest.mark.asyncio
+async def test_new_rules_version_clears_cache(policy_server):
+    client = _client(policy_server["url"])
+    await client.check("Zeit", {})
+    policy_server["version"] = "v2"
+    await client.check("Hilfe", {})
+    assert len(client.cache) == 1
+    assert client.rules_version == _served_version(policy_server)
+    await client._http.close()
+
+
+def test_ttl_cache_evicts_least_recently_used():
+    cache = TTLCache(max_size=2)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    assert cache.get("a") == 1
+    cache.set("c", 3)
+    assert cache.get("b") is None
+    assert cache.get("a") == 1
+    assert cache.stats()["evictions"] == 1
+
+
+@pytest.mark.asyncio
+async def test_embedded_mode_evaluates_rule_file_in_process(tmp_path):
+    import json
+
+    rules = tmp_path / "rules.json"
+    rules.write_text(json.dumps({"version": "local-1", "blocked_patterns": ["format c:"]}), encoding="utf-8")
+    client = _client(None, policy_mode="embedded", policy_rules_file=str(rules))
+
+    allowed, data = await client.check("Zeit", {"user_role": "cli_user"})
+    assert allowed and data["rules_version"].startswith("local-1+")
+    allowed, data = await client.check("Format C:", {"user_role": "cli_user", "trace_id": "t1"})
+    assert not allowed
+    assert data["reason"] == "Blocked pattern detected: format c:"
+    assert data["metadata"]["trace_id"] == "t1"
+    await client.close()
+
+
+@pytest.mark.asyncio
+async def test_hybrid_mode_syncs_rules_and_evaluates_locally(policy_server):
+    client = _client(policy_server["url"], policy_mode="hybrid", policy_sync_interval=3600)
+
+    # Vor dem ersten Abgleich entscheidet der Service
+    assert (await client.check("Zeit", {"user_role": "cli_user"}))[0]
+    assert policy_server["calls"] == 1
+    assert await client.sync_rules()
+
+    assert not (await client.check("rm -rf /", {"user_role": "cli_user"}))[0]
+    assert (await client.check("drop it", {"user_role": "cli_user"}))[0]
+    assert policy_server["calls"] == 1
+
+    # Geänderte Muster ohne neue deklarierte Version werden trotzdem übernommen
+    policy_server["blocked"] = ["drop it"]
+    assert await client.sync_rules()
+    assert not (await client.check("drop it", {"user_role": "cli_user"}))[0]
+    assert client.stats()["rules_version"] == _served_version(policy_server)
+    fetches = policy_server["rule_fetches"]
+    assert await client.sync_rules()  # 304, Regeln unverändert
+    assert policy_server["rule_fetches"] == fetches + 1
+    assert client.engine.rules.version == _served_version(policy_server)
+    await client.close()
+    await client._http.close()
+
+
+@pytest.mark.asyncio
+async def test_outage_trips_the_circuit_and_fails_fast():
+    import socket
+
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        port = sock.getsockname()[1]
+    client = _client(f"http://127.0.0.1:{port}/policy_check", circuit_failure_threshold=2,
+                     circuit_probe_interval=3600, policy_fail_mode_read_only="open")
+
+    for _ in range(2):
+        allowed, data = await client.check("Zeit", {"user_role": "cli_user"})
+        assert not allowed and data["policy_status"] == "unavailable"
+    assert client.breaker.state == "open"
+
+    allowed, data = await client.check("Zeit", {"user_role": "cli_user"})
+    assert not allowed and "Circuit offen" in data["reason"]
+    assert client.breaker.stats()["short_circuited"] == 1
+    assert client.fails_open(read_only=True) and not client.fails_open(read_only=False)
+    await client.close()
+    await client._http.close()
@@ -0,0 +1,56 @@
+import json
+import os
+
+from policy_engine import PatternMatcher, PolicyEngine
+
+
+def test_matcher_reports_first_pattern_in_rule_order():
+    matcher = PatternMatcher(["drop table", "rm -rf", "rm"])
+    assert matcher.first("please rm -rf / and drop table x") == "drop table"
+    assert matcher.find_all("xx rm yy") == [2]
+    assert matcher.first("zeit anzeigen") is None
+
+
+def test_matcher_handles_overlapping_patterns():
+    matcher = PatternMatcher(["he", "she", "his", "hers"])
+    assert matcher.find_all("ushers") == [0, 1, 3]
+
+
+def test_engine_defaults_match_legacy_rules():
+    engine = PolicyEngine()
+    assert engine.decide("rm -rf /", {"user_role": "admin"})[0] == "denied"
+    assert engine.decide("drop it", {"user_role": "guest"})[0] == "denied"
+    assert engine.decide("drop it", {"user_role": "admin"})[0] == "approved"
+
+
+def test_engine_hot_reloads_rule_file(tmp_path):
+    rules_file = tmp_path / "rules.json"
+    rules_file.write_text(json.dumps({"version": "1", "blocked_patterns": ["foo"]}), encoding="utf-8")
+    engine = PolicyEngine(str(rules_file), reload_interval=0)
+    assert engine.decide("foo bar", {})[0] == "denied"
+    assert engine.version.startswith("1+")
+
+    patterns = [f"pattern-{i}" for i in range(2000)]
+    rules_file.write_text(json.dumps({"version": "2", "blocked_patterns": patterns}), encoding="utf-8")
+    os.utime(rules_file, ns=(0, 10**18))
+    assert engine.decide("foo bar", {})[0] == "approved"
+    assert engine.decide("x pattern-1999 y", {})[0] == "denied"
+    assert engine.version.startswith("2+")
+
+    # Gleiche deklarierte Version, andere Muster: trotzdem eine neue Version
+    version = engine.version
+    rules_file.write_text(json.dumps({"version": "2", "blocked_patterns": ["bar"]}), encoding="utf-8")
+    os.utime(rules_file, ns=(0, 2 * 10**18))
+    assert engine.decide("bar", {})[0] == "denied"
+    assert engine.version.startswith("2+") and engine.version != version
+
+
+def test_engine_keeps_rules_on_broken_file(tmp_path):
+    rules_file = tmp_path / "rules.json"
+    rules_file.write_text(json.dumps({"blocked_patterns": ["foo"]}), encoding="utf-8")
+    engine = PolicyEngine(str(rules_file), reload_interval=0)
+    version = engine.version
+    rules_file.write_text("{kaputt", encoding="utf-8")
+    os.utime(rules_file, ns=(0, 10**18))
+    assert engine.decide("foo", {})[0] == "denied"
+    assert engine.version == version
@@ -32,3 +32,47 @@ def test_policy_denied(client):
     data = response.get_json()
     assert data["policy_status"] == "denied"
 
+
+
+def test_policy_decision_carries_cache_hint(client):
+    payload = {"command": "Zeit", "context": {"user_role": "admin"}}
+    data = client.post('/policy_check', json=payload).get_json()
+    assert data["rules_version"]
+    assert data["cache"]["max_age"] >= 0
+
+
+def test_policy_batch_preserves_order(client):
+    payload = {
+        "commands": ["Zeit", {"command": "rm -rf /", "context": {"user_role": "admin"}}, "delete x"],
+        "context": {"user_role": "guest"},
+    }
+    response = client.post('/policy_check/batch', json=payload)
+    assert response.status_code == 200
+    data = response.get_json()
+    assert [r["policy_status"] for r in data["results"]] == ["approved", "denied", "denied"]
+    assert data["results"][1]["reason"] == "Blocked pattern detected: rm -rf"
+    assert data["rules_version"]
+
+
+def test_policy_batch_requires_commands(client):
+    response = client.post('/policy_check/batch', json={"commands": []})
+    assert response.status_code == 400
+
+
+def test_metrics_count_decisions(client):
+    client.post('/policy_check', json={"command": "rm -rf /", "context": {}})
+
+    text = client.get('/metrics').get_data(as_text=True)
+    assert 'policy_decisions_total{status="denied",endpoint="single"}' in text
+    assert 'policy_decision_duration_seconds_bucket{status="denied",le="+Inf"}' in text
+
+
+def test_policy_rules_are_served_with_etag(client):
+    response = client.get('/policy_rules')
+    assert response.status_code == 200
+    rules = response.get_json()
+    assert "rm -rf" in rules["blocked_patterns"]
+    assert response.headers["ETag"].startswith(f'"{rules["version"]}+')
+
+    cached = client.get('/policy_rules', headers={"If-None-Match": response.headers["ETag"]})
+    assert cached.status_code == 304
@@ -0,0 +1,177 @@
+import os
+
+import pytest
+import threading
+
+import recorder_storage
+from recorder_storage import RecordQuery, SegmentWriter, StorageConfig
+
+
+def _entries(prefix, count):
+    return [{"command": f"{prefix} {i}", "policy_status": "approved"} for i in range(count)]
+
+
+def test_concurrent_appends_are_group_committed(tmp_path):
+    writer = SegmentWriter(StorageConfig(str(tmp_path), fsync="always"))
+    threads = [threading.Thread(target=lambda n=n: [writer.append(_entries(f"t{n}", 2)) for _ in range(50)])
+               for n in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    writer.close()
+
+    records = list(recorder_storage.iter_records(str(tmp_path)))
+    assert len(records) == 8 * 50 * 2
+    assert writer.commits <= 8 * 50
+    for n in range(8):
+        # Jeder Aufrufer schreibt seine Einträge zusammenhängend
+        own = [r["command"] for r in records if r["command"].startswith(f"t{n} ")]
+        assert own == [f"t{n} 0", f"t{n} 1"] * 50
+
+
+def test_failed_group_commit_fails_every_caller_in_the_batch(tmp_path):
+    import time
+
+    writer = SegmentWriter(StorageConfig(str(tmp_path), fsync="never"))
+    writer.append(_entries("vorher", 1))
+    errors = []
+
+    def append(n):
+        try:
+            writer.append(_entries(f"t{n}", 1))
+        except OSError as exc:
+            errors.append((n, exc))
+
+    # Alle vier warten auf den Commit-Lock, dann schreibt einer für alle und scheitert
+    writer._commit_lock.acquire()
+    threads = [threading.Thread(target=append, args=(n,)) for n in range(4)]
+    for thread in threads:
+        thread.start()
+    while writer._appended < 5:
+        time.sleep(0.001)
+    original_write = writer._write
+
+    def failing_write(lines):
+        raise OSError("disk full")
+    writer._write = failing_write
+    writer._commit_lock.release()
+    for thread in threads:
+        thread.join()
+
+    assert sorted(n for n, _ in errors) == [0, 1, 2, 3]
+    assert all(str(exc) == "disk full" for _, exc in errors)
+    assert writer.path is None and writer._errors == {}
+
+    writer._write = original_write
+    writer.append(_entries("danach", 1))
+    writer.close()
+    assert [r["command"] for r in recorder_storage.iter_records(str(tmp_path))] == ["vorher 0", "danach 0"]
+
+
+def test_interval_fsync_syncs_without_further_appends(tmp_path, monkeypatch):
+    import time
+
+    synced = []
+    real_fsync = os.fsync
+    monkeypatch.setattr(recorder_storage.os, "fsync", lambda fd: (synced.append(fd), real_fsync(fd)))
+    writer = SegmentWriter(StorageConfig(str(tmp_path), fsync="interval", fsync_interval=0.05))
+    writer._last_fsync = time.monotonic()
+    writer.append(_entries("a", 1))
+    assert synced == [] and writer._dirty
+
+    for _ in range(100):
+        with writer._commit_lock:
+            if synced:
+                break
+        time.sleep(0.01)
+    assert synced and not writer._dirty
+    writer.close()
+
+
+def test_segments_rotate_by_size_and_are_per_process(tmp_path):
+    writer = SegmentWriter(StorageConfig(str(tmp_path), fsync="never", segment_bytes=200))
+    for i in range(10):
+        writer.append(_entries(f"c{i}", 2))
+    writer.close()
+
+    segments = recorder_storage.list_segments(str(tmp_path))
+    assert len(segments) > 1
+    assert all(f"-{os.getpid()}-" in os.path.basename(s) for s in segments)
+    assert [r["command"] for r in recorder_storage.iter_records(str(tmp_path))] == [
+        f"c{i} {j}" for i in range(10) for j in range(2)
+    ]
+
+
+def test_sealed_segments_are_compressed(tmp_path):
+    writer = SegmentWriter(StorageConfig(str(tmp_path), fsync="never", compress=True))
+    writer.append(_entries("a", 100))
+    writer.rotate()
+    writer.append(_entries("b", 1))
+    writer.close()
+
+    segments = recorder_storage.list_segments(str(tmp_path))
+    assert all(s.endswith(".ndjson.gz") for s in segments)
+    assert len(list(recorder_storage.iter_records(str(tmp_path)))) == 101
+
+
+def test_compressed_segment_members_are_line_aligned(tmp_path):
+    path = tmp_path / "seg-0000000000000-1-000001.ndjson"
+    path.write_bytes(recorder_storage.encode_entries(_entries("x", 500)))
+    compressed = recorder_storage.compress_segment(str(path), member_bytes=1000)
+    with recorder_storage.open_segment(compressed) as fp:
+        lines = fp.read().splitlines()
+    assert len(lines) == 500
+    assert not path.exists()
+
+
+def _timed(i, command, status="approved"):
+    return {"command": command, "policy_status": status, "timestamp": f"2025-01-{1 + i // 100:02d}T00:00:00Z"}
+
+
+def _fill(tmp_path, compress=False):
+    config = StorageConfig(str(tmp_path), fsync="never", index_block_bytes=2000, compress=compress,
+                           segment_bytes=20000)
+    writer = SegmentWriter(config)
+    for i in range(600):
+        writer.append([_timed(i, "Wetter:Berlin" if i % 100 == 7 else "Zeit", "denied" if i == 450 else "approved")])
+    writer.close()
+    return str(tmp_path)
+
+
+@pytest.mark.parametrize("compress", [False, True])
+def test_query_reads_only_matching_blocks(tmp_path, compress):
+    directory = _fill(tmp_path, compress)
+    assert all(s.endswith(".gz") == compress for s in recorder_storage.list_segments(directory))
+
+    page = recorder_storage.query_records(directory, RecordQuery(command="wetter"))
+    assert [r["timestamp"][:10] for r in page["records"]] == [f"2025-01-{d:02d}" for d in range(1, 7)]
+    assert page["stats"]["blocks_skipped"] > page["stats"]["blocks_read"]
+
+    page = recorder_storage.query_records(directory, RecordQuery(status="denied"))
+    assert len(page["records"]) == 1
+    assert page["stats"]["blocks_read"] == 1
+
+    page = recorder_storage.query_records(directory, RecordQuery(since="2025-01-03", until="2025-01-04"))
+    assert len(page["records"]) == 100
+    assert page["stats"]["segments_read"] < len(recorder_storage.list_segments(directory))
+
+
+def test_query_scans_unindexed_tail_of_active_segment(tmp_path):
+    writer = SegmentWriter(StorageConfig(str(tmp_path), fsync="never"))
+    writer.append([_timed(0, "Zeit")])
+    page = recorder_storage.query_records(str(tmp_path), RecordQuery(command="zeit"))
+    assert len(page["records"]) == 1
+    writer.close()
+
+
+def test_cursor_pagination_covers_all_records_once(tmp_path):
+    directory = _fill(tmp_path)
+    seen, cursor = [], None
+    while True:
+        page = recorder_storage.query_records(directory, RecordQuery(), limit=37, cursor=cursor)
+        seen.extend(page["records"])
+        cursor = page["next_cursor"]
+        if cursor is None:
+            break
+    assert len(seen) == 600
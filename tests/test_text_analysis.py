@@ -0,0 +1,49 @@
+from collections import Counter
+
+import pytest
+
+import text_analysis
+
+
+TEXT = "Der Hund, der Katze jagt. Die Katze jagt den Hund!\nStraße über Straße\n" * 50
+
+
+def test_chunked_counts_match_whole_text(tmp_path):
+    path = tmp_path / "text.txt"
+    path.write_text(TEXT, encoding="utf-8")
+    size = path.stat().st_size
+
+    words = chars = 0
+    terms, bigrams = Counter(), Counter()
+    for start in range(0, size, 37):
+        w, c, t, n = text_analysis.analyse_chunk(str(path), start, min(start + 37, size), 2)
+        words += w
+        chars += c
+        terms.update(t)
+        bigrams.update(n)
+
+    expected_terms = text_analysis._terms(TEXT.split())
+    assert words == len(TEXT.split())
+    assert chars == len(TEXT)
+    assert terms == Counter(expected_terms)
+    assert bigrams == Counter(" ".join(expected_terms[i:i + 2]) for i in range(len(expected_terms) - 1))
+
+
+@pytest.mark.asyncio
+async def test_analyse_directory_with_process_pool(tmp_path):
+    for i in range(3):
+        (tmp_path / f"teil{i}.txt").write_text(TEXT, encoding="utf-8")
+
+    class Cfg:
+        analyse_workers = 2
+        analyse_chunk_bytes = 512
+
+    analyzer = text_analysis.TextAnalyzer(Cfg())
+    try:
+        summary = await analyzer.analyse_path(str(tmp_path), top=2, ngram=2)
+    finally:
+        analyzer.close()
+    assert summary["files"] == 3
+    assert summary["words"] == 3 * len(TEXT.split())
+    assert summary["top_terms"][0][1] == 3 * 100
+    assert summary["top_ngrams"]
@@ -0,0 +1,43 @@
+import asyncio
+
+import pytest
+
+import tracing
+
+
+@pytest.mark.asyncio
+async def test_concurrent_traces_are_isolated():
+    async def traced(delay):
+        with tracing.start() as trace:
+            with tracing.span("execute"):
+                await asyncio.sleep(delay)
+            with tracing.span("execute"):
+                pass
+            assert tracing.current() is trace
+            return trace.to_dict()
+
+    slow, fast = await asyncio.gather(traced(0.05), traced(0))
+
+    assert slow["trace_id"] != fast["trace_id"]
+    assert slow["session_id"] == fast["session_id"] == tracing.SESSION_ID
+    assert slow["stages"]["execute"] >= 40 > fast["stages"]["execute"]
+    assert tracing.current() is None
+
+
+def test_span_without_trace_records_nothing():
+    before = tracing.STAGE_DURATION.count("parse")
+    with tracing.span("parse"):
+        pass
+    assert tracing.STAGE_DURATION.count("parse") == before
+
+
+def test_stages_are_observed_once_per_trace():
+    before = tracing.STAGE_DURATION.count("lookup")
+    with tracing.start() as trace:
+        with tracing.span("lookup"):
+            pass
+        with tracing.span("lookup"):
+            pass
+        assert tracing.STAGE_DURATION.count("lookup") == before
+    assert tracing.STAGE_DURATION.count("lookup") == before + 1
+    assert len(trace.trace_id) == 16 and trace.trace_id == trace.to_dict()["trace_id"]
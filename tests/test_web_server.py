@@ -0,0 +1,108 @@
+import asyncio
+from unittest.mock import MagicMock
+
+import pytest
+import pytest_asyncio
+
+import web_server
+from command_processor import CommandProcessor
+from config import Configuration
+
+
+@pytest_asyncio.fixture
+async def server(tmp_path):
+    import aiohttp
+
+    config = MagicMock(spec=Configuration)
+    config.openweathermap_key = None
+    config.flight_recorder_spool = str(tmp_path / "spool.log")
+    config.web_host = "127.0.0.1"
+    config.web_port = 0
+    proc = CommandProcessor(config)
+    runner = await web_server.start(proc, config)
+    port = runner.addresses[0][1]
+    async with aiohttp.ClientSession(f"http://127.0.0.1:{port}") as session:
+        yield proc, session
+    await runner.cleanup()
+    await proc.close()
+
+
+def _spool(proc):
+    with open(proc.recorder.spool_path, encoding="utf-8") as fp:
+        return fp.read()
+
+
+@pytest.mark.asyncio
+async def test_command_runs_policy_and_records(server):
+    proc, session = server
+    async with session.post("/command", json={"command": "Rechner:6*7"}) as response:
+        assert response.status == 200
+        assert await response.json() == {"status": "success", "result": "Ergebnis: 42"}
+
+    await proc.recorder.close()
+    assert '"source": "web"' in _spool(proc)
+
+
+@pytest.mark.asyncio
+async def test_command_denied_by_policy_is_not_executed(server):
+    proc, session = server
+
+    async def deny(command, context):
+        assert context["user_role"] == "web_user"
+        return False, {"policy_status": "denied", "reason": "Blocked pattern detected: rm -rf"}
+
+    proc.policy.check = deny
+    async with session.post("/command", json={"command": "Löschen:rm -rf"}) as response:
+        assert await response.json() == {"status": "error", "result": "Blocked pattern detected: rm -rf"}
+
+    await proc.recorder.close()
+    assert '"policy_status": "denied"' in _spool(proc)
+
+
+@pytest.mark.asyncio
+async def test_concurrent_requests_are_served_in_parallel(server):
+    proc, session = server
+
+    async def slow(command, context):
+        await asyncio.sleep(0.2)
+        return True, {"policy_status": "approved"}
+
+    proc.policy.check = slow
+
+    async def call():
+        async with session.post("/command", json={"command": "Zeit"}) as response:
+            return await response.json()
+
+    started = asyncio.get_running_loop().time()
+    results = await asyncio.gather(*(call() for _ in range(10)))
+    assert all(r["status"] == "success" for r in results)
+    assert asyncio.get_running_loop().time() - started < 1.0
+
+
+@pytest.mark.asyncio
+async def test_batch_status_and_bad_requests(server):
+    proc, session = server
+    async with session.post("/command/batch", json={"commands": ["Rechner:1+2", "Unbekannt"]}) as response:
+        results = (await response.json())["results"]
+    assert results[0] == {"status": "success", "result": "Ergebnis: 3"}
+    assert results[1]["status"] == "error"
+
+    async with session.post("/command", data="kein json") as response:
+        assert response.status == 400
+    async with session.post("/command/batch", json={}) as response:
+        assert response.status == 400
+    async with session.get("/status") as response:
+        assert "flight_recorder" in await response.json()
+
+
+@pytest.mark.asyncio
+async def test_metrics_include_command_latency(server):
+    proc, session = server
+    await session.post("/command", json={"command": "Zeit"})
+
+    async with session.get("/metrics") as response:
+        assert response.status == 200
+        text = await response.text()
+    assert 'cli_command_duration_seconds_bucket{command="zeit",le="+Inf"}' in text
+    assert 'cli_web_http_request_duration_seconds_count{route="/command",method="POST",status="200"}' in text
+    assert 'cli_http_pool_connections{state="idle"}' in text
@@ -0,0 +1,229 @@
+"""Streamende Textanalyse für den Analyse-Befehl.
+
+Dateien werden in Abschnitte (``chunk_bytes``) zerlegt, deren Grenzen auf
+Whitespace ausgerichtet sind, sodass kein Wort und kein UTF-8-Zeichen
+geteilt wird. Jeder Abschnitt wird in einem Worker-Prozess blockweise
+gelesen und gezählt; der Speicherbedarf pro Worker hängt nur von Blockgröße
+und Vokabular ab, nicht von der Dateigröße. Die Teilergebnisse werden beim
+Eintreffen zusammengeführt.
+
+Die optionale linguistische Analyse nutzt spaCy mit einem einmalig geladenen
+Modell und ``nlp.pipe`` in Batches.
+"""
+import asyncio
+import functools
+import os
+import string
+from collections import Counter, deque
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+ANALYSE_OPTIONS = ('top', 'ngram', 'nlp')
+BLOCK_BYTES = 1024 * 1024
+_LOOKAHEAD_BYTES = 64 * 1024
+_WHITESPACE = b' \t\n\r\x0b\x0c'
+_STRIP = string.punctuation + '„“”‚‘’«»…–—'
+
+
+def _terms(tokens: List[str]) -> List[str]:
+    terms = []
+    for token in tokens:
+        term = token.strip(_STRIP).lower()
+        if term:
+            terms.append(term)
+    return terms
+
+
+def _align(fp, pos: int, size: int) -> int:
+    """Erste Position >= ``pos``, vor der ein Whitespace-Byte steht (bzw. 0/Dateiende)."""
+    if pos <= 0:
+        return 0
+    if pos >= size:
+        return size
+    fp.seek(pos - 1)
+    offset = pos - 1
+    while True:
+        block = fp.read(4096)
+        if not block:
+            return size
+        for i, byte in enumerate(block):
+            if byte in _WHITESPACE:
+                return offset + i + 1
+        offset += len(block)
+
+
+def analyse_chunk(path: str, start: int, end: int, ngram: int) -> Tuple[int, int, Counter, Counter]:
+    """Zählt Wörter, Zeichen, Begriffe und n-Gramme in einem Dateiabschnitt.
+
+    Wird im Worker-Prozess ausgeführt. n-Gramme, die im Abschnitt beginnen,
+    werden mit den ersten Begriffen hinter dem Abschnitt vervollständigt.
+    """
+    words = chars = 0
+    terms: Counter = Counter()
+    ngrams: Counter = Counter()
+    window: deque = deque(maxlen=max(ngram, 1))
+
+    def count_ngrams(new_terms: List[str]) -> None:
+        for term in new_terms:
+            window.append(term)
+            if ngram > 1 and len(window) == ngram:
+                ngrams[' '.join(window)] += 1
+
+    with open(path, 'rb') as fp:
+        size = os.fstat(fp.fileno()).st_size
+        pos = _align(fp, start, size)
+        stop = _align(fp, end, size)
+        fp.seek(pos)
+        carry = b''
+        while pos < stop:
+            block = fp.read(min(BLOCK_BYTES, stop - pos))
+            if not block:
+                break
+            pos += len(block)
+            data = carry + block
+            if pos < stop:
+                # Unvollständiges letztes Wort in den nächsten Block übernehmen
+                cut = max(data.rfind(c) for c in (b' ', b'\n', b'\t', b'\r')) + 1
+                data, carry = data[:cut], data[cut:]
+            else:
+                carry = b''
+            text = data.decode('utf-8', errors='replace')
+            chars += len(text)
+            tokens = text.split()
+            words += len(tokens)
+            block_terms = _terms(tokens)
+            terms.update(block_terms)
+            count_ngrams(block_terms)
+
+        if ngram > 1 and stop < size and len(window) > 0:
+            # Nur n-Gramme zählen, die noch in diesem Abschnitt beginnen
+            fp.seek(stop)
+            following = _terms(fp.read(_LOOKAHEAD_BYTES).decode('utf-8', errors='ignore').split())
+            tail = list(window)[-(ngram - 1):]
+            for j in range(len(tail)):
+                gram = tail[j:] + following[:ngram - len(tail) + j]
+                if len(gram) == ngram:
+                    ngrams[' '.join(gram)] += 1
+
+    return words, chars, terms, ngrams
+
+
+class TermCounter:
+    """Zählt Wörter, Zeichen und Begriffe über nacheinander eintreffende Textabschnitte.
+
+    Abschnitte müssen an Whitespace enden (z. B. ganze Zeilen), damit kein
+    Wort doppelt gezählt wird; der Speicherbedarf hängt nur vom Vokabular ab.
+    """
+
+    def __init__(self):
+        self.words = 0
+        self.chars = 0
+        self.terms: Counter = Counter()
+
+    def update(self, text: str) -> None:
+        self.chars += len(text)
+        tokens = text.split()
+        self.words += len(tokens)
+        self.terms.update(_terms(tokens))
+
+
+def _iter_files(target: str) -> Iterator[str]:
+    if os.path.isdir(target):
+        for root, dirs, files in os.walk(target):
+            dirs[:] = sorted(d for d in dirs if not d.startswith('.'))
+            for name in sorted(files):
+                if not name.startswith('.'):
+                    yield os.path.join(root, name)
+    else:
+        yield target
+
+
+@functools.lru_cache(maxsize=2)
+def load_spacy_model(name: str):
+    """Lädt ein spaCy-Modell einmalig pro Prozess."""
+    import spacy
+    return spacy.load(name, disable=['lemmatizer'])
+
+
+def _iter_documents(files: List[str], doc_chars: int = 20000) -> Iterator[str]:
+    for path in files:
+        with open(path, 'r', encoding='utf-8', errors='replace') as fp:
+            buf: List[str] = []
+            size = 0
+            for line in fp:
+                buf.append(line)
+                size += len(line)
+                if size >= doc_chars:
+                    yield ''.join(buf)
+                    buf, size = [], 0
+            if buf:
+                yield ''.join(buf)
+
+
+def linguistic_summary(files: List[str], model: str, top: int, batch_size: int = 32) -> Dict[str, List[Tuple[str, int]]]:
+    """Zählt Wortarten und Entitäten mit ``nlp.pipe`` über alle Dateien."""
+    nlp = load_spacy_model(model)
+    pos: Counter = Counter()
+    entities: Counter = Counter()
+    for doc in nlp.pipe(_iter_documents(files), batch_size=batch_size):
+        pos.update(token.pos_ for token in doc if not token.is_space)
+        entities.update(f"{ent.text} ({ent.label_})" for ent in doc.ents)
+    return {"pos": pos.most_common(top), "entities": entities.most_common(top)}
+
+
+class TextAnalyzer:
+    """Verteilt die Analyse von Dateien und Verzeichnissen auf einen Prozess-Pool."""
+
+    def __init__(self, config: Any = None):
+        self.workers = getattr(config, 'analyse_workers', None) or os.cpu_count() or 1
+        self.chunk_bytes = getattr(config, 'analyse_chunk_bytes', 8 * 1024 * 1024)
+        self.spacy_model = getattr(config, 'analyse_spacy_model', 'de_core_news_sm')
+        self._pool: Optional[ProcessPoolExecutor] = None
+
+    def _chunks(self, files: List[str]) -> List[Tuple[str, int, int]]:
+        chunks = []
+        for path in files:
+            size = os.path.getsize(path)
+            for start in range(0, max(size, 1), self.chunk_bytes):
+                chunks.append((path, start, min(start + self.chunk_bytes, size)))
+        return chunks
+
+    async def analyse_path(self, target: str, top: int = 10, ngram: int = 1) -> Dict[str, Any]:
+        loop = asyncio.get_running_loop()
+        files = await loop.run_in_executor(None, lambda: list(_iter_files(target)))
+        chunks = await loop.run_in_executor(None, self._chunks, files)
+
+        if len(chunks) <= 1:
+            # Kleine Eingaben: Prozessstart würde länger dauern als die Analyse
+            run = lambda c: loop.run_in_executor(None, analyse_chunk, *c, ngram)
+        else:
+            if self._pool is None:
+                self._pool = ProcessPoolExecutor(max_workers=self.workers)
+            run = lambda c: loop.run_in_executor(self._pool, analyse_chunk, *c, ngram)
+
+        words = chars = 0
+        terms: Counter = Counter()
+        ngrams: Counter = Counter()
+        for finished in asyncio.as_completed([run(c) for c in chunks]):
+            w, c, t, n = await finished
+            words += w
+            chars += c
+            terms.update(t)
+            ngrams.update(n)
+
+        return {
+            "files": len(files),
+            "words": words,
+            "chars": chars,
+            "top_terms": terms.most_common(top),
+            "top_ngrams": ngrams.most_common(top) if ngram > 1 else [],
+            "paths": files,
+        }
+
+    async def linguistic(self, files: List[str], top: int) -> Dict[str, List[Tuple[str, int]]]:
+        return await asyncio.to_thread(linguistic_summary, files, self.spacy_model, top)
+
+    def close(self) -> None:
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
@@ -0,0 +1,109 @@
+"""Leichtgewichtiges Tracing der Stufen eines Befehls.
+
+``execute_command`` öffnet pro Befehl einen Trace; die Stufen (``parse``,
+``lookup``, ``policy``, ``execute``, ``record``) werden mit ``span`` gemessen
+und addiert. Der aktuelle Trace liegt in einer ``ContextVar`` und ist damit
+pro Task getrennt, auch wenn viele Befehle nebenläufig laufen. Ohne offenen
+Trace kostet ein ``span`` nur einen ``ContextVar``-Zugriff.
+
+Die Trace-ID geht im Kontext an den Policy-Service, die Stufendauern landen
+unter ``metadata.trace`` im Flight-Record und als Histogramm
+``cli_stage_duration_seconds`` in ``/metrics`` (eine Beobachtung je Stufe und
+Befehl, gesammelt beim Schließen des Traces).
+
+Der Trace liegt auf dem Pfad jedes Befehls und ist deshalb knapp gehalten:
+die Trace-ID entsteht erst beim ersten Zugriff (und ohne ``uuid``), ein
+``span`` liest nur die Uhr und addiert, und das Histogramm wird einmal pro
+Trace unter einem einzigen Lock gefüttert statt einmal pro ``span``.
+"""
+import random
+import time
+import uuid
+from contextvars import ContextVar
+from typing import Any, Dict, Optional
+
+import metrics
+
+STAGE_DURATION = metrics.histogram("cli_stage_duration_seconds", "Dauer je Stufe eines Befehls", ("stage",))
+
+# Eine Sitzung pro Prozess (REPL, Skriptlauf oder Web-Worker)
+SESSION_ID = uuid.uuid4().hex[:12]
+
+_current: ContextVar[Optional["Trace"]] = ContextVar("trace", default=None)
+
+
+def new_id() -> str:
+    # Eindeutig genug zur Zuordnung, nicht kryptografisch; ``random`` wird nach einem fork neu geseedet
+    return "%016x" % random.getrandbits(64)
+
+
+class Trace:
+    """Trace-ID, Sitzung und aufsummierte Stufendauern (Sekunden) eines Befehls."""
+
+    __slots__ = ("_trace_id", "session_id", "started", "stages")
+
+    def __init__(self, trace_id: Optional[str] = None, session_id: Optional[str] = None):
+        self._trace_id = trace_id
+        self.session_id = session_id or SESSION_ID
+        self.started = time.perf_counter()
+        self.stages: Dict[str, float] = {}
+
+    @property
+    def trace_id(self) -> str:
+        if self._trace_id is None:
+            self._trace_id = new_id()
+        return self._trace_id
+
+    def add(self, stage: str, seconds: float) -> None:
+        stages = self.stages
+        stages[stage] = stages.get(stage, 0.0) + seconds
+
+    def to_dict(self) -> Dict[str, Any]:
+        # Millisekunden auf drei Stellen; int() statt round(x, 3), das über eine Dezimaldarstellung rundet
+        return {
+            "trace_id": self.trace_id,
+            "session_id": self.session_id,
+            "total_ms": int((time.perf_counter() - self.started) * 1e6 + 0.5) / 1000,
+            "stages": {stage: int(seconds * 1e6 + 0.5) / 1000 for stage, seconds in self.stages.items()},
+        }
+
+
+def current() -> Optional[Trace]:
+    return _current.get()
+
+
+class start:
+    """Öffnet einen Trace für den aktuellen Task: ``with tracing.start() as trace: ...``"""
+
+    __slots__ = ("trace", "_token")
+
+    def __init__(self, trace_id: Optional[str] = None, session_id: Optional[str] = None):
+        self.trace = Trace(trace_id, session_id)
+
+    def __enter__(self) -> Trace:
+        self._token = _current.set(self.trace)
+        return self.trace
+
+    def __exit__(self, *exc) -> None:
+        _current.reset(self._token)
+        if self.trace.stages:
+            STAGE_DURATION.observe_many((seconds, (stage,)) for stage, seconds in self.trace.stages.items())
+
+
+class span:
+    """Misst eine Stufe des aktuellen Traces; ohne Trace wird nichts gemessen."""
+
+    __slots__ = ("stage", "_trace", "_started")
+
+    def __init__(self, stage: str):
+        self.stage = stage
+
+    def __enter__(self) -> "span":
+        self._trace = _current.get()
+        if self._trace is not None:
+            self._started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc) -> None:
+        if self._trace is not None:
+            self._trace.add(self.stage, time.perf_counter() - self._started)
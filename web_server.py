@@ -0,0 +1,156 @@
+"""Web-Interface der CLI auf Basis von aiohttp.
+
+Der Server läuft auf derselben Event-Loop wie der ``CommandProcessor``:
+gleichzeitige Anfragen werden parallel bedient, und alle Befehle teilen sich
+HTTP-Pool, Caches und Flight-Recorder-Queue mit der REPL. Jeder Befehl
+durchläuft dieselbe Pipeline wie in der CLI (Policy-Check, Ausführung,
+Flight-Record).
+
+Betriebsarten:
+
+- eingebettet in ``cli-app`` (Standard, ``[Web] server = aiohttp``),
+- eigenständig mit ``cli-app --serve``,
+- mit mehreren Workern über gunicorn::
+
+      gunicorn -c gunicorn.conf.py web_server:create_gunicorn_app
+"""
+import logging
+import os
+import time
+from typing import Any, Dict, Optional
+
+from command_processor import CommandProcessor
+from config import Configuration
+import metrics
+
+WEB_CONTEXT = {"user_role": "web_user", "user_id": "web"}
+
+
+def _context(request) -> Dict[str, Any]:
+    return dict(WEB_CONTEXT, user_id=f"web:{request.remote or 'unbekannt'}")
+
+
+def create_app(proc: CommandProcessor, close_processor: bool = False):
+    """Erzeugt die aiohttp-Anwendung für einen Prozessor.
+
+    Mit ``close_processor`` wird der Prozessor beim Herunterfahren der
+    Anwendung geschlossen (eigenständiger Betrieb, gunicorn).
+    """
+    from aiohttp import web
+
+    # Erst hier importieren: main importiert dieses Modul ebenfalls nur bei Bedarf
+    from main import execute_command
+
+    async def read_json(request) -> Optional[Dict[str, Any]]:
+        try:
+            data = await request.json()
+        except ValueError:
+            return None
+        return data if isinstance(data, dict) else None
+
+    async def handle_command(request):
+        data = await read_json(request)
+        if not data or not isinstance(data.get('command'), str):
+            return web.json_response({"status": "error", "result": "Kein Befehl angegeben."}, status=400)
+        result = await execute_command(proc, data['command'], context=_context(request), source="web")
+        return web.json_response(result)
+
+    async def handle_command_batch(request):
+        data = await read_json(request)
+        if not data or not isinstance(data.get('commands'), list):
+            return web.json_response({"status": "error", "result": "Keine Befehlsliste angegeben."}, status=400)
+        context = _context(request)
+        results = await proc.process_many(
+            data['commands'],
+            concurrency=data.get('concurrency'),
+            handler=lambda c: execute_command(proc, c, context=context, source="web"),
+        )
+        return web.json_response({"status": "success", "results": results})
+
+    async def handle_status(request):
+        return web.json_response(proc.status())
+
+    async def handle_health(request):
+        return web.json_response({"status": "healthy", "service": "cli-app"})
+
+    async def handle_metrics(request):
+        return web.Response(body=metrics.render().encode('utf-8'), headers={'Content-Type': metrics.CONTENT_TYPE})
+
+    # Gleiche Metrik wie beim Flask-Interface (metrics.instrument_flask)
+    duration = metrics.histogram("cli_web_http_request_duration_seconds",
+                                 "HTTP handler time per route, method and status", ("route", "method", "status"))
+
+    @web.middleware
+    async def observe_request(request, handler):
+        started = time.perf_counter()
+        status = 500
+        try:
+            response = await handler(request)
+            status = response.status
+            return response
+        except web.HTTPException as exc:
+            status = exc.status
+            raise
+        finally:
+            resource = request.match_info.route.resource
+            route = resource.canonical if resource is not None else "unmatched"
+            duration.observe(time.perf_counter() - started, route, request.method, status)
+
+    app = web.Application(middlewares=[observe_request])
+    app.router.add_post('/command', handle_command)
+    app.router.add_post('/command/batch', handle_command_batch)
+    app.router.add_get('/status', handle_status)
+    app.router.add_get('/health', handle_health)
+    app.router.add_get('/metrics', handle_metrics)
+
+    if close_processor:
+        async def on_cleanup(app):
+            await proc.close()
+        app.on_cleanup.append(on_cleanup)
+    return app
+
+
+async def start(proc: CommandProcessor, config: Any = None):
+    """Startet den Server auf der laufenden Event-Loop; liefert den ``AppRunner`` zum Beenden."""
+    from aiohttp import web
+
+    host = getattr(config, 'web_host', '127.0.0.1')
+    port = getattr(config, 'web_port', 5001)
+    runner = web.AppRunner(
+        create_app(proc),
+        keepalive_timeout=getattr(config, 'web_keepalive_timeout', 75.0),
+        access_log=None,
+    )
+    await runner.setup()
+    site = web.TCPSite(runner, host, port, backlog=getattr(config, 'web_backlog', 128))
+    try:
+        await site.start()
+    except OSError:
+        await runner.cleanup()
+        raise
+    logging.info("Web-Interface gestartet auf http://%s:%s", host, port)
+    return runner
+
+
+async def serve(proc: CommandProcessor, config: Any = None) -> None:
+    """Eigenständiger Betrieb ohne REPL, bis der Prozess beendet wird."""
+    import asyncio
+
+    runner = await start(proc, config)
+    try:
+        await asyncio.Event().wait()
+    finally:
+        await runner.cleanup()
+        await proc.close()
+
+
+def _config_path() -> str:
+    return os.environ.get('CLI_APP_CONFIG') or os.path.join(os.path.dirname(os.path.abspath(__file__)), 'config.ini')
+
+
+async def create_gunicorn_app():
+    """App-Factory für ``aiohttp.GunicornWebWorker``: ein Prozessor pro Worker."""
+    config = Configuration(_config_path())
+    # Worker teilen sich die Konfiguration, aber nicht Spool-Datei und Offset
+    config.flight_recorder_spool_per_process = True
+    return create_app(CommandProcessor(config), close_processor=True)